@@ -0,0 +1,17 @@
+from langgraph.types import Command
+from langchain_core.messages import HumanMessage
+from langgraph.prebuilt import create_react_agent
+from prompt import DAMASK_AGENT_PROMPT
+from app.tools import FILE_TOOLS
+from app.simulation_tools import SIMULATION_TOOLS
+
+def make_damask_agent(llm):
+    tools = SIMULATION_TOOLS + FILE_TOOLS
+    return create_react_agent(llm, tools=tools, prompt=DAMASK_AGENT_PROMPT)
+
+def damask_node(state, damask_agent) -> Command:
+    result = damask_agent.invoke(state)
+    return Command(
+        update={"messages": [HumanMessage(content=result["messages"][-1].content, name="simulator")]},
+        goto="supervisor",
+    )
@@ -4,16 +4,35 @@ from langchain_openai import ChatOpenAI
 from langgraph.types import Command
 from langgraph.graph import MessagesState, END
 from prompt import SUPERVISOR_PROMPT
+from app.limits import LLM_GATE
+from app.telemetry import record_llm
 
 class Router(TypedDict):
     next: Literal["simulator", "coder", "FINISH"]
 
+def _record_usage(result):
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    record_llm(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+               (result.llm_output or {}).get("model_name"))
+    return result
+
+class GatedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose completions share the process-wide LLM concurrency limit (and are metered, see app.telemetry)."""
+
+    def _generate(self, *args, **kwargs):
+        with LLM_GATE.slot():
+            return _record_usage(super()._generate(*args, **kwargs))
+
+    async def _agenerate(self, *args, **kwargs):
+        async with LLM_GATE.aslot():
+            return _record_usage(await super()._agenerate(*args, **kwargs))
+
 def make_supervisor_llm(model="gpt-4o"):
-    return ChatOpenAI(model=model, temperature=0.2, max_retries=40)
+    return GatedChatOpenAI(model=model, temperature=0.2, max_retries=40)
 
 def supervisor_node(state: MessagesState, llm) -> Command[Literal["simulator","coder","__end__"]]:
     workers = ["simulator", "coder"]
-    system_prompt = SUPERVISOR_PROMPT.format(workers=workers)
+    system_prompt = SUPERVISOR_PROMPT.format(members=workers)
     messages = [{"role": "system", "content": system_prompt}] + state["messages"]
     response = llm.with_structured_output(Router).invoke(messages)
     goto = response["next"]
@@ -1,15 +1,73 @@
 from app.config import apply_env, OPENAI_MODEL
 from app.graph import build_graph
 
-def run_query_through_graph(query: str, thread_id: int = 0):
+def run_query_through_graph(query: str, thread_id: int = 0, graph=None):
     config = {"configurable": {"thread_id": str(thread_id)}, "recursion_limit": 200}
-    graph = build_graph(openai_model=OPENAI_MODEL)
+    graph = graph or build_graph(openai_model=OPENAI_MODEL)
     for event in graph.stream({"messages": [("user", query)]}, subgraphs=True, config=config):
         print(event)
         print("----")
 
+def main_serve(argv):
+    import argparse
+    from app.config import SERVER_MAX_THREADS
+    from app.server import serve
+    parser = argparse.ArgumentParser(prog="python -m app.cli serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="Serve on a Unix socket instead of TCP.")
+    parser.add_argument("--max-threads", type=int, default=SERVER_MAX_THREADS)
+    args = parser.parse_args(argv)
+    serve(host=args.host, port=args.port, socket_path=args.socket, max_threads=args.max_threads)
+
+def main_report(argv):
+    import argparse
+    from app.telemetry import load, plot, summarize, table
+    parser = argparse.ArgumentParser(prog="python -m app.cli report",
+                                     description="Summarize a metrics file written with DAMASK_METRICS_FILE set.")
+    parser.add_argument("metrics_file")
+    parser.add_argument("--interval", type=float, default=None, help="Seconds per table row (default: ~24 rows).")
+    parser.add_argument("--plot", default=None, help="Also save the time series as an image (e.g. report.png).")
+    args = parser.parse_args(argv)
+    summary = summarize(load(args.metrics_file), args.interval)
+    print(table(summary))
+    if args.plot and summary["rows"]:
+        print(f"\nplot: {plot(summary, args.plot)}")
+
+def main_recipe(argv):
+    import argparse
+    import json
+    import yaml
+    from app.recipes import list_recipes, run_study
+    parser = argparse.ArgumentParser(prog="python -m app.cli recipe",
+                                     description="Run a calibration recipe from a study file.")
+    parser.add_argument("study_file", nargs="?")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a study key for this run (YAML value, e.g. maxiter=5 or bounds={xi_0_sl: [30, 60]}).")
+    parser.add_argument("--check", action="store_true", help="Only validate the study.")
+    parser.add_argument("--list", action="store_true", help="List the recipes and their study keys.")
+    args = parser.parse_args(argv)
+    if args.list or not args.study_file:
+        print(json.dumps(list_recipes(), indent=2))
+        return
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = yaml.safe_load(value)
+    result = run_study(args.study_file, overrides=overrides, dry_run=args.check)
+    print(json.dumps(result, indent=2, default=str))
+
 if __name__ == "__main__":
     import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "report":
+        main_report(sys.argv[2:])
+        sys.exit()
+    if len(sys.argv) > 1 and sys.argv[1] == "recipe":
+        main_recipe(sys.argv[2:])
+        sys.exit()
     apply_env()
-    q = sys.argv[1] if len(sys.argv) > 1 else "Hello"
-    run_query_through_graph(q, thread_id=0)
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        main_serve(sys.argv[2:])
+    else:
+        q = sys.argv[1] if len(sys.argv) > 1 else "Hello"
+        run_query_through_graph(q, thread_id=0)
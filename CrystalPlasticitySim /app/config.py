@@ -9,6 +9,18 @@ LANGSMITH_PROJECT = os.getenv("LANGCHAIN_PROJECT", "damask_agent")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")                   # set in env
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
+# Directory holding the DAMASK helper modules (damask_yaml, damask_simulation, ...)
+DAMASK_LIB_DIR = os.getenv("DAMASK_LIB_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workdir"))
+
+# Graph checkpoints (SQLite on disk; keep the newest K per thread, 0 = keep all)
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(os.getcwd(), ".checkpoints", "graph.sqlite"))
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+
+# Serving mode: concurrent graph threads, LLM calls and solver runs are bounded separately
+SERVER_MAX_THREADS = int(os.getenv("SERVER_MAX_THREADS", "16"))
+MAX_LLM_CALLS = int(os.getenv("MAX_LLM_CALLS", "8"))
+MAX_SOLVER_RUNS = int(os.getenv("MAX_SOLVER_RUNS", str(max(1, (os.cpu_count() or 2) // 2))))
+
 def apply_env():
     os.environ["LANGCHAIN_TRACING_V2"] = LANGSMITH_TRACING
     os.environ["LANGCHAIN_ENDPOINT"]  = LANGSMITH_ENDPOINT
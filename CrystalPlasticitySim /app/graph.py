@@ -1,23 +1,32 @@
 from langgraph.graph import StateGraph, START
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import MessagesState
 from agents.supervisor import make_supervisor_llm, supervisor_node
 from agents.simulation_agent import make_damask_agent, damask_node
 from agents.code_agent import make_code_agent, code_node
+from app.checkpoint import SqliteCheckpointSaver
+from app.config import CHECKPOINT_DB, CHECKPOINT_KEEP_LAST
+from app.telemetry import hop
 
 class State(MessagesState):
     next: str
 
-def build_graph(openai_model="gpt-4o"):
-    memory = MemorySaver()
+def make_checkpointer(path=CHECKPOINT_DB, keep_last=CHECKPOINT_KEEP_LAST):
+    return SqliteCheckpointSaver(path, keep_last=keep_last or None)
+
+def build_graph(openai_model="gpt-4o", checkpointer=None):
+    memory = checkpointer if checkpointer is not None else make_checkpointer()
 
     llm = make_supervisor_llm(model=openai_model)
     damask_agent = make_damask_agent(llm)
     code_agent = make_code_agent(llm)
 
-    def supervisor(s): return supervisor_node(s, llm)
-    def simulator(s):  return damask_node(s, damask_agent)
-    def coder(s):      return code_node(s, code_agent)
+    # Every node invocation is one hop of the LLM-token telemetry.
+    def supervisor(s):
+        with hop("supervisor"): return supervisor_node(s, llm)
+    def simulator(s):
+        with hop("simulator"): return damask_node(s, damask_agent)
+    def coder(s):
+        with hop("coder"): return code_node(s, code_agent)
 
     builder = StateGraph(State)
     builder.add_edge(START, "supervisor")
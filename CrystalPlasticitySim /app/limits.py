@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from app.config import MAX_LLM_CALLS, MAX_SOLVER_RUNS
+
+
+class Gate:
+    """Bounded concurrency slots shared by threads, with queue/latency counters.
+
+    A caller may take several slots at once (one per solver process it starts); they are
+    granted together, so two callers never deadlock holding part of what they need.
+    """
+
+    def __init__(self, name: str, limit: int, history: int = 1000):
+        self.name = name
+        self.limit = limit
+        self._free = limit
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.wait_times = deque(maxlen=history)
+        self.run_times = deque(maxlen=history)
+
+    def granted(self, count: int) -> int:
+        """Slots a request for `count` takes (at least one, at most the limit)."""
+        return min(max(1, count), self.limit)
+
+    def acquire(self, count: int = 1) -> float:
+        """Wait for granted(count) slots and take them together."""
+        count = self.granted(count)
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self._freed.wait_for(lambda: self._free >= count)
+            self._free -= count
+            now = time.perf_counter()
+            self.waiting -= 1
+            self.active += count
+            self.wait_times.append(now - start)
+        return now
+
+    def release(self, started: float, count: int = 1):
+        count = self.granted(count)
+        with self._lock:
+            self._free += count
+            self.active -= count
+            self.completed += 1
+            self.run_times.append(time.perf_counter() - started)
+            self._freed.notify_all()
+
+    @contextmanager
+    def slot(self, count: int = 1):
+        """Hold `count` slots (capped at the limit); yields the number held."""
+        count = self.granted(count)
+        started = self.acquire(count)
+        try:
+            yield count
+        finally:
+            self.release(started, count)
+
+    @asynccontextmanager
+    async def aslot(self, count: int = 1):
+        count = self.granted(count)
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire, count))
+        try:
+            started = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread still takes the slots; give them back once it has.
+            acquiring.add_done_callback(
+                lambda f: f.cancelled() or f.exception() is not None or self.release(f.result(), count))
+            raise
+        try:
+            yield count
+        finally:
+            self.release(started, count)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "waiting": self.waiting,
+                "active": self.active,
+                "completed": self.completed,
+                "wait_s": summarize(self.wait_times),
+                "run_s": summarize(self.run_times),
+            }
+
+
+def summarize(samples) -> dict:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0}
+    def pick(q): return values[min(len(values) - 1, int(q * len(values)))]
+    return {"count": len(values), "mean": sum(values) / len(values),
+            "p50": pick(0.50), "p95": pick(0.95), "max": values[-1]}
+
+
+LLM_GATE = Gate("llm", MAX_LLM_CALLS)
+SOLVER_GATE = Gate("solver", MAX_SOLVER_RUNS)
@@ -0,0 +1,9 @@
+import sys
+
+from app.config import DAMASK_LIB_DIR
+
+if DAMASK_LIB_DIR not in sys.path:
+    sys.path.insert(0, DAMASK_LIB_DIR)
+
+from damask_recipes import RECIPES, check_study, list_recipes, load_study, run_study, save_study  # noqa: E402,F401
+from damask_uq import run_uq  # noqa: E402,F401
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+
+from aiohttp import web
+from langchain_core.messages import BaseMessage
+
+from app.config import OPENAI_MODEL, SERVER_MAX_THREADS
+from app.limits import LLM_GATE, SOLVER_GATE, summarize
+
+
+def _jsonable(obj):
+    if isinstance(obj, BaseMessage):
+        return {"type": obj.type, "name": obj.name, "content": obj.content}
+    return str(obj)
+
+
+class GraphServer:
+    """Serves many conversation threads concurrently from one compiled graph.
+
+    POST /query  {"query": str, "thread_id": str?}  -> NDJSON stream of graph events
+    GET  /metrics                                   -> queue depth, gate usage, latencies
+    """
+
+    def __init__(self, graph, max_threads: int = SERVER_MAX_THREADS, recursion_limit: int = 200):
+        self.graph = graph
+        self.max_threads = max_threads
+        self.recursion_limit = recursion_limit
+        self.slots = asyncio.Semaphore(max_threads)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait = deque(maxlen=1000)
+        self.first_event = deque(maxlen=1000)
+        self.latency = deque(maxlen=1000)
+        self.started = time.time()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/query", self.handle_query)
+        app.router.add_get("/metrics", self.handle_metrics)
+        return app
+
+    async def handle_query(self, request: web.Request) -> web.StreamResponse:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="body is not valid JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="body must be a JSON object")
+        query = body.get("query")
+        if not query:
+            raise web.HTTPBadRequest(text="missing 'query'")
+        thread_id = body.get("thread_id")
+        thread_id = str(uuid.uuid4()) if thread_id is None else str(thread_id)
+        config = {"configurable": {"thread_id": thread_id}, "recursion_limit": self.recursion_limit}
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson", "X-Thread-Id": thread_id})
+        await response.prepare(request)
+
+        arrived = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        started = time.perf_counter()
+        self.queue_wait.append(started - arrived)
+        self.running += 1
+        first = True
+        try:
+            async for namespace, update in self.graph.astream(
+                {"messages": [("user", query)]}, config=config, subgraphs=True
+            ):
+                if first:
+                    self.first_event.append(time.perf_counter() - started)
+                    first = False
+                line = json.dumps({"thread_id": thread_id, "namespace": list(namespace), "update": update},
+                                  default=_jsonable)
+                await response.write(line.encode() + b"\n")
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            await response.write(json.dumps({"thread_id": thread_id, "error": repr(e)}).encode() + b"\n")
+        finally:
+            self.running -= 1
+            self.slots.release()
+            self.latency.append(time.perf_counter() - arrived)
+        await response.write_eof()
+        return response
+
+    def metrics(self) -> dict:
+        return {
+            "uptime_s": time.time() - self.started,
+            "threads": {"limit": self.max_threads, "queued": self.queued, "running": self.running,
+                        "completed": self.completed, "failed": self.failed},
+            "queue_wait_s": summarize(self.queue_wait),
+            "first_event_s": summarize(self.first_event),
+            "latency_s": summarize(self.latency),
+            "llm": LLM_GATE.snapshot(),
+            "solver": SOLVER_GATE.snapshot(),
+        }
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.json_response(self.metrics())
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, socket_path: str = None,
+          openai_model: str = OPENAI_MODEL, max_threads: int = SERVER_MAX_THREADS):
+    from app.graph import build_graph
+    # The graph (LLM clients, agents, checkpointer) is compiled once and shared by all threads.
+    server = GraphServer(build_graph(openai_model=openai_model), max_threads=max_threads)
+    if socket_path:
+        web.run_app(server.app(), path=socket_path)
+    else:
+        web.run_app(server.app(), host=host, port=port)
@@ -0,0 +1,275 @@
+import os
+import sys
+from typing import Annotated, Optional
+
+from langchain_core.tools import tool
+
+from app.config import DAMASK_LIB_DIR
+from app.limits import SOLVER_GATE
+
+if DAMASK_LIB_DIR not in sys.path:
+    sys.path.insert(0, DAMASK_LIB_DIR)
+
+import damask_archive  # noqa: E402
+import damask_coarsen  # noqa: E402
+import damask_optimize  # noqa: E402
+import damask_recipes  # noqa: E402
+import damask_results  # noqa: E402
+import damask_simulation  # noqa: E402
+import damask_yaml  # noqa: E402
+
+
+def _abs(path):
+    return os.path.abspath(path) if path else path
+
+
+def _recipe_runs(plan: dict) -> tuple:
+    """
+    Solver processes a recipe starts on this node and where their count is set: ('backend', n)
+    for the local/queue workers of its backend, ('workers', n) without a backend, and
+    (None, 1) for SSH hosts, whose runs use other nodes.
+    """
+    backend = plan.get("backend")
+    if not backend:
+        return "workers", int(plan["kwargs"].get("workers") or 1)
+    if backend.get("kind", "local") == "ssh":
+        return None, 1
+    return "backend", int(backend.get("workers") or os.cpu_count() or 1)
+
+
+@tool
+def update_material_tool(
+    material_file: Annotated[str, "Path to the DAMASK material YAML."],
+    values: Annotated[dict[str, float], "Plastic parameters to set, e.g. {'xi_0_sl': 30, 'n_sl': 20}; stresses in MPa."],
+    output_dir: Annotated[Optional[str], "Directory for the new file (default: next to the original)."] = None,
+) -> dict:
+    """Write a copy of the material file with updated slip parameters and return its path."""
+    try:
+        return {"material_file": damask_yaml.update_material_properties(_abs(material_file), values, _abs(output_dir))}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def update_load_tool(
+    load_file: Annotated[str, "Path to the DAMASK load YAML."],
+    F12: Annotated[float, "dot_F[0][1]"],
+    F13: Annotated[float, "dot_F[0][2]"],
+    F23: Annotated[float, "dot_F[1][2]"],
+    output_dir: Annotated[Optional[str], "Directory for the new file (default: next to the original)."] = None,
+) -> dict:
+    """Write a copy of the load file with new off-diagonal dot_F components and return its path."""
+    try:
+        return {"load_file": damask_yaml.update_load(_abs(load_file), F12, F13, F23, _abs(output_dir))}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def run_simulation_tool(
+    load_file: Annotated[str, "Path to the load YAML."],
+    grid_file: Annotated[str, "Path to the grid (.vti) file."],
+    material_file: Annotated[str, "Path to the material YAML."],
+) -> dict:
+    """Run DAMASK_grid once and return the path of the result HDF5 file. On failure, 'failure' is one of
+    config (fix the inputs), convergence (use more increments), timeout, launch or crash."""
+    try:
+        with SOLVER_GATE.slot():
+            result = damask_simulation.solve(_abs(load_file), _abs(grid_file), _abs(material_file))
+    except damask_simulation.SolverError as e:
+        return {"error": str(e), "failure": e.kind, "log_file": e.log_file, "log_tail": e.log_tail[-1500:]}
+    return {"result_file": result.result_file, "log_file": result.log_file, "elapsed_s": result.elapsed}
+
+
+@tool
+def stress_strain_tool(
+    result_file: Annotated[str, "Path to the DAMASK result HDF5 file."],
+    experimental_file: Annotated[Optional[str], "Experimental (true_stress, true_strain) file to compare against."] = None,
+) -> dict:
+    """Volume-averaged xx true strain/stress per increment, plus the MAPE against experiment if given."""
+    try:
+        strain, stress = damask_results.reduce_simulation_results(_abs(result_file))
+        out = {"strain_xx": strain.tolist(), "stress_xx": stress.tolist()}
+        if experimental_file:
+            exp_strain, exp_stress = damask_results.read_experimental_data(_abs(experimental_file))
+            out["mape"] = damask_results.curve_error(exp_strain, exp_stress, strain, stress)
+        return out
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def deviation_angle_tool(
+    result_file: Annotated[str, "Path to the DAMASK result HDF5 file."],
+    experimental_quaternion: Annotated[list[float], "Target orientation [w, x, y, z]."],
+) -> dict:
+    """Deviation angle (degrees) between the final simulated orientation and a target quaternion."""
+    try:
+        result = damask_results.deviation_angle(_abs(result_file), experimental_quaternion)
+        return {"deviation_angle": float(result["deviation_angle"]),
+                "simulated_quaternion": [float(q) for q in result["simulated_quaternion"]]}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def calibrate_slip_parameters_tool(
+    material_file: Annotated[str, "Path to the material YAML template."],
+    load_file: Annotated[str, "Path to the load YAML."],
+    grid_file: Annotated[str, "Path to the grid (.vti) file."],
+    experimental_file: Annotated[str, "Experimental (true_stress, true_strain) file."],
+    bounds: Annotated[dict[str, list[float]], "Parameter -> [low, high], e.g. {'xi_0_sl': [27, 90]}; stresses in MPa."],
+    maxiter: Annotated[int, "Differential evolution generations."] = 20,
+    popsize: Annotated[int, "Population size multiplier."] = 10,
+    workers: Annotated[int, "Parallel solver runs."] = 1,
+    seed: Annotated[Optional[int], "Random seed."] = None,
+    asynchronous: Annotated[bool, "Start a new trial whenever a run finishes instead of waiting for "
+                                  "each generation (better core use when run times vary)."] = False,
+    adaptive_steps: Annotated[bool, "Choose the increments of every trial from the convergence of nearby "
+                                    "trials (fewer increments where runs converge easily)."] = False,
+    coarsen: Annotated[float, "Run trials on a grid with this many times fewer cells per axis (1 = original)."] = 1,
+) -> dict:
+    """Calibrate slip parameters to an experimental stress-strain curve (differential evolution, MAPE).
+    Every trial is logged to optimization_results.csv next to the material file."""
+    try:
+        # One gate slot per solver process; `workers` is cut to the slots held.
+        with SOLVER_GATE.slot(workers) as workers:
+            return damask_optimize.calibrate_slip_parameters(
+                _abs(material_file), _abs(load_file), _abs(grid_file), _abs(experimental_file),
+                bounds, maxiter=maxiter, popsize=popsize, workers=workers, seed=seed, asynchronous=asynchronous,
+                adaptive_steps=adaptive_steps, coarsen=coarsen)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def fit_load_orientation_tool(
+    load_file: Annotated[str, "Path to the load YAML template."],
+    grid_file: Annotated[str, "Path to the grid (.vti) file."],
+    material_file: Annotated[str, "Path to the material YAML."],
+    target_quaternion: Annotated[list[float], "Target orientation [w, x, y, z]."],
+    bounds: Annotated[Optional[list[list[float]]], "[[low, high]] for F12, F13, F23 (default +-3e-3)."] = None,
+    method: Annotated[str, "'L-BFGS-B', 'differential_evolution' or 'surrogate' (fewest solver runs)."] = "L-BFGS-B",
+    maxiter: Annotated[int, "Iteration limit."] = 50,
+    workers: Annotated[int, "Parallel solver runs (differential_evolution only)."] = 1,
+) -> dict:
+    """Fit F12, F13, F23 of the load so that the final orientation matches a target quaternion.
+    Every trial is logged to optimization_results.csv next to the load file."""
+    try:
+        # L-BFGS-B runs one trial at a time; the other methods run `workers` at once.
+        with SOLVER_GATE.slot(1 if method == "L-BFGS-B" else workers) as workers:
+            return damask_optimize.fit_load_orientation(
+                _abs(load_file), _abs(grid_file), _abs(material_file), target_quaternion,
+                bounds=bounds, method=method, maxiter=maxiter, workers=workers)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def calibrate_experiments_tool(
+    material_file: Annotated[str, "Path to the material YAML template shared by all experiments."],
+    experiments: Annotated[list[dict], "One dict per experiment: name, load_file, grid_file, optional weight and "
+                                       "tolerance (error counted as 1; default MAPE 0.02 or 1 degree), and either "
+                                       "experimental_file (stress-strain) or target_quaternion [w, x, y, z]."],
+    bounds: Annotated[dict[str, list[float]], "Parameter -> [low, high], e.g. {'xi_0_sl': [27, 90]}; stresses in MPa."],
+    maxiter: Annotated[int, "Differential evolution generations."] = 20,
+    popsize: Annotated[int, "Population size multiplier."] = 10,
+    workers: Annotated[int, "Parallel solver runs (shared by all experiments)."] = 1,
+    seed: Annotated[Optional[int], "Random seed."] = None,
+    asynchronous: Annotated[bool, "Start a new trial whenever a run finishes instead of waiting for "
+                                  "each generation."] = False,
+    adaptive_steps: Annotated[bool, "Choose the increments of every run from the convergence of nearby runs."] = False,
+    coarsen: Annotated[float, "Run every case on a grid with this many times fewer cells per axis."] = 1,
+) -> dict:
+    """Calibrate one set of slip parameters against several experiments at once (weighted mean of
+    per-experiment MAPE / deviation angle, each divided by its tolerance). Every trial is logged to
+    joint_results.csv next to the material file."""
+    try:
+        experiments = [{k: _abs(v) if k.endswith("_file") else v for k, v in e.items()} for e in experiments]
+        with SOLVER_GATE.slot(workers) as workers:
+            return damask_optimize.calibrate_experiments(
+                _abs(material_file), experiments, bounds, maxiter=maxiter, popsize=popsize,
+                workers=workers, seed=seed, asynchronous=asynchronous, adaptive_steps=adaptive_steps,
+                coarsen=coarsen)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def coarsen_grid_tool(
+    grid_file: Annotated[str, "Path to the grid (.vti) file."],
+    factor: Annotated[float, "Divide the cells per axis by this."] = 2,
+    material_file: Annotated[Optional[str], "Material YAML; with it the orientation-distribution error is reported."] = None,
+) -> dict:
+    """Write a coarser copy of a grid that keeps the volume fraction of every grain, and report how faithful
+    it is (volume-fraction and ODF error, lost grains, grain size and boundary density of both grids)."""
+    try:
+        return damask_coarsen.coarsen_grid(_abs(grid_file), factor, material_file=_abs(material_file))
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def find_runs_tool(
+    directory: Annotated[str, "Directory with finished result (.hdf5) files and their inputs."],
+    ranges: Annotated[dict[str, list[Optional[float]]], "Parameter -> [low, high] (null for open), "
+                                                        "e.g. {'xi_0_sl': [30, 60]}; stresses in MPa."],
+    reduce: Annotated[Optional[str], "'stress_strain' or 'orientation' (default: both)."] = None,
+) -> dict:
+    """Find earlier runs by parameter ranges. New result files in the directory are archived first
+    (summaries go to study.sqlite there), so curves and final orientations come back without re-running."""
+    try:
+        directory = _abs(directory)
+        archived = damask_archive.archive_runs(directory)
+        rows = damask_archive.find_runs(os.path.join(directory, "study.sqlite"), ranges, reduce=reduce)
+        return {"archived": archived["archived"], "runs": [
+            {"params": r["params"], "reduce": r["reduce"], "reduced": r["reduced"], "files": r["files"]}
+            for r in rows]}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool
+def run_recipe_tool(
+    study_file: Annotated[Optional[str], "Study YAML naming a recipe and its inputs (paths relative to the file)."] = None,
+    study: Annotated[Optional[dict], "Study given directly instead: {'recipe': 'slip' | 'orientation' | 'joint' | "
+                                     "'sweep' | 'uq', absolute input file paths, bounds and options such as maxiter or "
+                                     "backend}; saved as <recipe>_study.yaml next to its first input file."] = None,
+    overrides: Annotated[Optional[dict], "Study keys replaced for this run only, e.g. {'maxiter': 5}."] = None,
+    check: Annotated[bool, "Only validate the study and show what would run."] = False,
+) -> dict:
+    """Run a calibration recipe from a study: slip-parameter fit, load-orientation fit, joint calibration,
+    parameter sweep or uncertainty of calibrated parameters, with parallel runs and the result cache. The trial log, result.json and trace/fit plots
+    go to the study's output directory. Call without arguments to list the recipes and their study keys."""
+    try:
+        if study_file is None and study is None:
+            return damask_recipes.list_recipes()
+        if check:
+            return damask_recipes.run_study(_abs(study_file), study, overrides, dry_run=True)
+        plan = damask_recipes.run_study(_abs(study_file), study, overrides, dry_run=True)
+        source, runs = _recipe_runs(plan)
+        with SOLVER_GATE.slot(runs) as slots:
+            if source == "workers" and slots < runs:
+                overrides = dict(overrides or {}, workers=slots)
+            elif source == "backend" and slots < runs:
+                overrides = dict(overrides or {}, backend=dict(plan["backend"], workers=slots))
+            result = damask_recipes.run_study(plan["study_file"], None, overrides)
+        # Curves and bands stay in result.json and the plots.
+        return {k: v for k, v in result.items() if k not in ("best_curve", "band", "verified_band")}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+SIMULATION_TOOLS = [
+    update_material_tool,
+    update_load_tool,
+    run_simulation_tool,
+    stress_strain_tool,
+    deviation_angle_tool,
+    calibrate_slip_parameters_tool,
+    fit_load_orientation_tool,
+    calibrate_experiments_tool,
+    coarsen_grid_tool,
+    find_runs_tool,
+    run_recipe_tool,
+]
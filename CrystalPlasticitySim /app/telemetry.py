@@ -0,0 +1,9 @@
+import sys
+
+from app.config import DAMASK_LIB_DIR
+
+if DAMASK_LIB_DIR not in sys.path:
+    sys.path.insert(0, DAMASK_LIB_DIR)
+
+# Events of the graph (LLM tokens per hop) go to the same metrics file as the solver runs.
+from damask_telemetry import configure, hop, load, plot, record_llm, summarize, table  # noqa: E402,F401
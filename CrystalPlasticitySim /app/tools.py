@@ -3,6 +3,7 @@ from langchain_experimental.utilities import PythonREPL
 from langchain_core.tools import tool
 from langchain_community.agent_toolkits import FileManagementToolkit
 import os
+from app.limits import SOLVER_GATE
 
 repl = PythonREPL()
 toolkit = FileManagementToolkit(root_dir=os.getcwd())
@@ -12,7 +13,9 @@ FILE_TOOLS = toolkit.get_tools()
 def python_repl_tool(code: Annotated[str, "Python code to execute."]):
     """Executes Python code and returns stdout."""
     try:
-        out = repl.run(code)
+        # Scripts launch DAMASK runs, so they share the solver concurrency limit.
+        with SOLVER_GATE.slot():
+            out = repl.run(code)
         return f"Successfully executed:\n```python\n{code}\n```\nStdout: {out}"
     except BaseException as e:
         return f"Failed to execute. Error: {repr(e)}"
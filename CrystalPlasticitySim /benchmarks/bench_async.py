@@ -0,0 +1,83 @@
+"""
+Slot utilization of generation-synchronous versus asynchronous differential evolution.
+
+Evaluations sleep for a time that grows with the first parameter (as solver run time
+grows with n_sl), so synchronous generations wait on their slowest member. No solver is run.
+
+    python -m benchmarks.bench_async --slots 8 --evaluations 400 --spread 10
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.optimize import differential_evolution
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workdir"))
+
+from damask_async import async_differential_evolution, utilization_report  # noqa: E402
+
+BOUNDS = [(1.0, 100.0), (10.0, 200.0), (-1.0, 1.0)]
+
+
+def make_objective(base, spread, spans):
+    lock = threading.Lock()
+
+    def objective(x):
+        start = time.perf_counter()
+        time.sleep(base * (1 + (spread - 1) * (x[0] - BOUNDS[0][0]) / (BOUNDS[0][1] - BOUNDS[0][0])))
+        with lock:
+            spans.append((start, time.perf_counter()))
+        # Shifted Rosenbrock-like valley in the unit box.
+        u = [(v - lo) / (hi - lo) for v, (lo, hi) in zip(x, BOUNDS)]
+        return (1 - u[0] - 0.3) ** 2 + 10 * (u[1] - u[0] ** 2) ** 2 + u[2] ** 2
+
+    return objective
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--popsize", type=int, default=5)
+    parser.add_argument("--evaluations", type=int, default=300)
+    parser.add_argument("--base", type=float, default=0.005, help="run time [s] at the low end")
+    parser.add_argument("--spread", type=float, default=10.0, help="slowest / fastest run time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    size = args.popsize * len(BOUNDS)
+    maxiter = max(1, args.evaluations // size - 1)
+    rows = []
+
+    spans = []
+    objective = make_objective(args.base, args.spread, spans)
+    with ThreadPoolExecutor(args.slots) as pool:
+        start = time.perf_counter()
+        result = differential_evolution(objective, BOUNDS, maxiter=maxiter, popsize=args.popsize, tol=0, seed=args.seed,
+                                        workers=lambda f, X: list(pool.map(f, X)), updating="deferred", polish=False)
+        wall = time.perf_counter() - start
+    report = utilization_report(spans, args.slots, size)
+    rows.append(("synchronous", result.fun, len(spans), wall, report["busy_s"] / (args.slots * wall)))
+
+    spans = []
+    objective = make_objective(args.base, args.spread, spans)
+    start = time.perf_counter()
+    result = async_differential_evolution(objective, BOUNDS, args.slots, popsize=args.popsize,
+                                          max_evaluations=rows[0][2], tol=0, seed=args.seed)
+    wall = time.perf_counter() - start
+    report = result["report"]
+    rows.append(("async", result["fun"], report["evaluations"], wall, report["utilization"]))
+
+    print(f"{'optimizer':>12} {'best':>10} {'evals':>6} {'wall [s]':>9} {'slot util':>10}")
+    for name, best, evaluations, wall, utilization in rows:
+        print(f"{name:>12} {best:>10.3g} {evaluations:>6} {wall:>9.2f} {utilization:>10.2%}")
+    print(f"predicted synchronous utilization of the async run times: {report['synchronous_utilization']:.2%}")
+    if not np.isfinite(rows[1][1]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
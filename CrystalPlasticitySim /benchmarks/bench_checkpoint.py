@@ -0,0 +1,74 @@
+"""
+Checkpoint write latency versus thread history length.
+
+Writes a growing message history to one thread and reports the mean ``put``
+latency per history bucket for the in-memory saver and the SQLite saver with
+and without pruning.
+
+    python -m benchmarks.bench_checkpoint --steps 500 --keep-last 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.checkpoint import SqliteCheckpointSaver
+
+
+def write_history(saver, steps, message_chars=2000, bucket=50):
+    config = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+    messages = []
+    latencies = []
+    for i in range(steps):
+        cls = HumanMessage if i % 2 == 0 else AIMessage
+        messages.append(cls(content=f"step {i} " + "x" * message_chars))
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=i))
+        checkpoint["channel_values"] = {"messages": list(messages), "next": "supervisor"}
+        version = saver.get_next_version(None if i == 0 else version, None)
+        checkpoint["channel_versions"] = {"messages": version, "next": version}
+        start = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop", "step": i, "writes": {}}, {"messages": version})
+        latencies.append(time.perf_counter() - start)
+    rows = []
+    for lo in range(0, steps, bucket):
+        chunk = latencies[lo:lo + bucket]
+        rows.append((lo + len(chunk), 1e3 * sum(chunk) / len(chunk)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--keep-last", type=int, default=20)
+    parser.add_argument("--message-chars", type=int, default=2000)
+    parser.add_argument("--bucket", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        savers = {
+            "memory": MemorySaver(),
+            "sqlite(all)": SqliteCheckpointSaver(os.path.join(tmp, "all.sqlite"), keep_last=None),
+            f"sqlite(keep={args.keep_last})": SqliteCheckpointSaver(os.path.join(tmp, "pruned.sqlite"),
+                                                                    keep_last=args.keep_last),
+        }
+        results = {name: write_history(saver, args.steps, args.message_chars, args.bucket)
+                   for name, saver in savers.items()}
+
+        names = list(results)
+        print(f"{'history':>8} " + " ".join(f"{n + ' [ms]':>22}" for n in names))
+        for i, (history, _) in enumerate(results[names[0]]):
+            print(f"{history:>8} " + " ".join(f"{results[n][i][1]:>22.3f}" for n in names))
+        for name, saver in savers.items():
+            if isinstance(saver, SqliteCheckpointSaver):
+                saver.close()
+                print(f"{name}: {os.path.getsize(saver.path) / 1e6:.2f} MB on disk")
+
+
+if __name__ == "__main__":
+    main()
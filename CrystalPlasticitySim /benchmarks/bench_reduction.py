@@ -0,0 +1,63 @@
+"""
+Stress-strain reduction from F and P versus the damask.Result post-processing path.
+
+Writes synthetic result files (benchmarks/synthetic.py, no solver), reduces each with
+extract_simulation_results (add_stress_Cauchy / add_strain on a fresh copy) and with
+reduce_simulation_results ('points' and 'fields' averages), and reports the time and the
+largest deviation from the reference curve.
+
+    python -m benchmarks.bench_reduction --edges 8 16 32 --increments 50
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workdir"))
+
+from benchmarks.synthetic import write_result  # noqa: E402
+from damask_results import extract_simulation_results, reduce_simulation_results  # noqa: E402
+
+
+def relative_error(curve, reference):
+    return max(float(np.max(np.abs(a - b)) / np.max(np.abs(b))) for a, b in zip(curve, reference))
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--edges", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--increments", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=1e-10,
+                        help="Largest accepted relative deviation of the 'points' average.")
+    args = parser.parse_args()
+
+    print(f"{'cells':>7} {'reference [s]':>14} {'points [s]':>11} {'speedup':>8} {'error':>9} "
+          f"{'fields [s]':>11} {'speedup':>8} {'error':>9}")
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for edge in args.edges:
+            source = write_result(os.path.join(tmp, f"grid{edge}.hdf5"), (edge,) * 3, args.increments)
+            reference_file = shutil.copy(source, os.path.join(tmp, "reference.hdf5"))
+            t_ref, reference = timed(extract_simulation_results, reference_file)
+            t_points, points = timed(reduce_simulation_results, source, "points")
+            t_fields, fields = timed(reduce_simulation_results, source, "fields")
+            e_points, e_fields = relative_error(points, reference), relative_error(fields, reference)
+            failed |= e_points > args.tolerance
+            print(f"{edge ** 3:>7} {t_ref:>14.3f} {t_points:>11.3f} {t_ref / t_points:>7.1f}x {e_points:>9.1e} "
+                  f"{t_fields:>11.3f} {t_ref / t_fields:>7.1f}x {e_fields:>9.1e}")
+    if failed:
+        sys.exit(f"'points' average deviates from extract_simulation_results by more than {args.tolerance:g}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Repeated post-processing of one result file with and without the result pool.
+
+Writes a synthetic result file (benchmarks/synthetic.py, no solver) and runs an agent-like
+sequence of post-processing calls on it several times: final-orientation deviation,
+per-increment orientation deviation and the stress-strain reduction. The uncached run
+sets the pool size to 0, so every call scans the file again as before.
+
+    python -m benchmarks.bench_result_pool --edge 16 --increments 100 --rounds 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workdir"))
+
+from benchmarks.synthetic import write_result  # noqa: E402
+from damask_result_pool import RESULT_POOL  # noqa: E402
+from damask_results import deviation_angle, orientation_deviation, reduce_simulation_results  # noqa: E402
+
+TARGET = [1.0, 0.0, 0.0, 0.0]
+
+
+def session(result_file, rounds):
+    out = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        out.append(deviation_angle(result_file, TARGET)["deviation_angle"])
+        out.append(orientation_deviation(result_file, TARGET, increments=[0])["mean"][0])
+        out.extend(reduce_simulation_results(result_file, "fields")[1][-1:])
+    return time.perf_counter() - start, np.array(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--edge", type=int, default=16)
+    parser.add_argument("--increments", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result_file = write_result(os.path.join(tmp, "result.hdf5"), (args.edge,) * 3, args.increments)
+        size = RESULT_POOL.max_entries
+        RESULT_POOL.max_entries = 0
+        t_plain, plain = session(result_file, args.rounds)
+        RESULT_POOL.max_entries = size
+        RESULT_POOL.clear()
+        t_pooled, pooled = session(result_file, args.rounds)
+    calls = 3 * args.rounds
+    print(f"{'':>8} {'total [s]':>10} {'per call [ms]':>14}")
+    print(f"{'uncached':>8} {t_plain:>10.3f} {1e3 * t_plain / calls:>14.1f}")
+    print(f"{'pooled':>8} {t_pooled:>10.3f} {1e3 * t_pooled / calls:>14.1f}")
+    print(f"speedup {t_plain / t_pooled:.1f}x, pool {RESULT_POOL.summary()}")
+    if not np.allclose(plain, pooled, rtol=0, atol=0):
+        sys.exit("Pooled results differ from uncached ones.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Node throughput of naive versus packed solver launches on synthetic job mixes.
+
+Uses the cost model in workdir/damask_scheduler.py; no solver is run.
+
+    python -m benchmarks.bench_scheduler --cores 32 --memory-gb 64 --jobs 40
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workdir"))
+
+from damask_scheduler import Job, simulate  # noqa: E402
+
+MIXES = {
+    "small": [(8, 16), (100, 1000)],
+    "mixed": [(4, 64), (100, 7000)],
+    "large": [(32, 96), (500, 7000)],
+}
+
+
+def job_mix(n, edge_range, increment_range, rng):
+    jobs = []
+    for i in range(n):
+        edge = rng.randint(*edge_range)
+        jobs.append(Job(f"job{i}", edge ** 3, rng.randint(*increment_range)))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cores", type=int, default=32)
+    parser.add_argument("--memory-gb", type=float, default=64)
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'mix':>6} {'policy':>7} {'makespan [h]':>13} {'jobs/h':>8} {'core util':>10}")
+    for mix, (edges, increments) in MIXES.items():
+        jobs = job_mix(args.jobs, edges, increments, rng)
+        for policy in ("naive", "packed"):
+            r = simulate(jobs, args.cores, args.memory_gb * 1e9, policy)
+            print(f"{mix:>6} {policy:>7} {r['makespan_s'] / 3600:>13.2f} {r['jobs_per_hour']:>8.1f} "
+                  f"{r['core_utilization']:>10.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per-task overhead of the objective pipeline on polycrystal materials.
+
+For each trial the optimizers render the material with new slip parameters, build the
+task, hash it for the study store and pickle it to a worker. The benchmark times these
+steps with render_material (whole config copied and dumped per trial) and with
+damask_yaml.MaterialTemplate (only the fitted phase per trial) on copies of the example
+material with `grains` random orientations, and checks that both give the same task keys.
+
+    python -m benchmarks.bench_task_overhead --grains 1 100 1000 5000 --trials 20
+"""
+import argparse
+import copy
+import os
+import pickle
+import sys
+import time
+
+import damask
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "workdir"))
+
+from damask_store import task_key  # noqa: E402
+from damask_worker import make_task  # noqa: E402
+from damask_yaml import MaterialTemplate, render_material  # noqa: E402
+
+EXAMPLE = os.path.join(ROOT, "examples", "example1", "workdir")
+
+
+def polycrystal(grains: int, seed: int = 0):
+    """Example material with `grains` entries of random orientation."""
+    material = damask.ConfigMaterial.load(os.path.join(EXAMPLE, "Ni3Al17-A1-material.yaml"))
+    entry = material["material"][0]
+    rotations = damask.Rotation.from_random(grains, rng_seed=seed).as_quaternion()
+    material["material"] = []
+    for q in rotations:
+        grain = copy.deepcopy(entry)
+        grain["constituents"][0]["O"] = q.tolist()
+        material["material"].append(grain)
+    return material
+
+
+def pipeline(render, trials, load, rng):
+    """Seconds per task and the task keys of `trials` trials rendered by render(values)."""
+    keys = []
+    start = time.perf_counter()
+    for k in range(trials):
+        values = {"xi_0_sl": float(rng.uniform(27, 90)), "h_0_sl-sl": float(rng.uniform(100, 500))}
+        task = make_task(f"trial_{k}", load, render(values), os.path.join(EXAMPLE, "Ni3Al17-A1-grid.vti"),
+                         "stress_strain")
+        keys.append(task_key(task))
+        pickle.dumps(task)
+    return (time.perf_counter() - start) / trials, keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--grains", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(os.path.join(EXAMPLE, "Ni3Al17-A1-load.yaml")) as f:
+        load = f.read()
+    print(f"{'grains':>7} {'YAML kB':>8} {'template [ms]':>14} {'before [ms/task]':>17} "
+          f"{'after [ms/task]':>16} {'speedup':>8}")
+    for grains in args.grains:
+        material = polycrystal(grains)
+        start = time.perf_counter()
+        template = MaterialTemplate(material)
+        t_template = time.perf_counter() - start
+        t_before, before = pipeline(lambda v: render_material(material, v), args.trials, load,
+                                    np.random.default_rng(0))
+        t_after, after = pipeline(template.render, args.trials, load, np.random.default_rng(0))
+        if before != after:
+            sys.exit(f"{grains} grains: MaterialTemplate renders differ from render_material.")
+        print(f"{grains:>7} {len(str(material)) / 1e3:>8.1f} {1e3 * t_template:>14.1f} {1e3 * t_before:>17.2f} "
+              f"{1e3 * t_after:>16.2f} {t_before / t_after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Golden-result harness for the post-processing and rotation fast paths.
+
+Every check runs a reference implementation and the fast paths that replace it on
+synthetic result files (benchmarks/synthetic.py, no solver). The fast paths must match
+the reference within a tolerance, and their speedups are recorded. The references
+are written against damask.Result, damask.Rotation and damask.Orientation only, as
+extract_simulation_results and calculate_deviation_angle originally were. A rewrite
+of damask_results or damask_rotations therefore cannot move its own baseline. Add
+new fast paths to CHECKS.
+
+--save records the reference outputs of every fixture in a golden file. --golden
+compares the references with such a file, which catches drift in DAMASK, h5py or
+numpy themselves.
+
+    python -m benchmarks.golden
+    python -m benchmarks.golden --golden benchmarks/golden.json --json report.json
+    python -m benchmarks.golden --save benchmarks/golden.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import damask
+import h5py
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workdir"))
+
+import damask_rotations  # noqa: E402
+from benchmarks.synthetic import write_result  # noqa: E402
+from damask_result_pool import RESULT_POOL  # noqa: E402
+from damask_results import (deviation_angle, extract_simulation_results, orientation_deviation,  # noqa: E402
+                            reduce_simulation_results)
+
+FIXTURES = {
+    'single_phase': dict(cells=(8, 8, 8), increments=20, seed=0),
+    'two_phase': dict(cells=(6, 8, 10), increments=12, phase=['Ni3Al', 'gamma'], seed=1),
+    'large_strain': dict(cells=(8, 8, 8), increments=30, strain=0.3, grains=20, seed=2),
+}
+
+TARGET = (np.array([0.9, 0.1, -0.3, 0.2]) / np.linalg.norm([0.9, 0.1, -0.3, 0.2])).tolist()
+
+
+# Reference implementations (damask only).
+
+def _phase_outputs(data) -> np.ndarray:
+    """Output of all phases (a flattened damask.Result.get of one increment) as one array."""
+    return np.concatenate(list(data.values())) if isinstance(data, dict) else data
+
+
+def reference_stress_strain(hdf5_file):
+    r = damask.Result(hdf5_file)
+    r.add_stress_Cauchy(P='P', F='F')
+    r.add_strain(F='F', t='V', m=0.0)
+    r = damask.Result(hdf5_file)
+    strain_xx, stress_xx = [], []
+    for increment in r.increments:
+        r_view = r.view(increments=[increment])
+        strain_xx.append(np.mean(_phase_outputs(r_view.get('epsilon_V^0.0(F)'))[..., 0, 0]))
+        stress_xx.append(np.mean(_phase_outputs(r_view.get('sigma'))[..., 0, 0]))
+    return np.array([strain_xx, stress_xx])
+
+
+def reference_deviation_angle(hdf5_file):
+    quaternion = _phase_outputs(damask.Result(hdf5_file).view(increments=-1).get('O'))[0]
+    R1 = damask.Rotation.from_quaternion(q=quaternion).as_matrix()
+    R2 = damask.Rotation.from_quaternion(q=TARGET).as_matrix()
+    return np.degrees(np.arccos(np.clip((np.trace(R1.T @ R2) - 1) / 2, -1, 1)))
+
+
+def reference_orientation_spread(hdf5_file):
+    r = damask.Result(hdf5_file)
+    target = damask.Orientation.from_quaternion(q=TARGET, lattice='cF')
+    rows = []
+    for increment in r.increments:
+        q = _phase_outputs(r.view(increments=[increment]).get('O'))
+        angles = np.degrees(damask.Orientation.from_quaternion(q=q, lattice='cF')
+                            .disorientation(target).as_axis_angle()[..., 3])
+        rows.append([angles.mean(), np.median(angles), angles.max()])
+    return np.array(rows).T
+
+
+def _last_orientations(hdf5_file):
+    with h5py.File(hdf5_file, 'r') as f:
+        last = max((k for k in f if k.startswith('increment_')), key=lambda k: int(k.split('_')[1]))
+        return np.concatenate([f[last]['phase'][p]['mechanical']['O'][()] for p in sorted(f[last]['phase'])])
+
+
+def reference_matrices(hdf5_file):
+    # damask's matrices are passive (P = -1), the repo's rotate vectors: transposes of each other.
+    return damask.Rotation.from_quaternion(q=_last_orientations(hdf5_file)).as_matrix().transpose(0, 2, 1)
+
+
+def reference_hexagonal(hdf5_file):
+    q = _last_orientations(hdf5_file)
+    return np.degrees(damask.Orientation.from_quaternion(q=q, lattice='hP')
+                      .disorientation(damask.Orientation.from_quaternion(q=q[::-1], lattice='hP'))
+                      .as_axis_angle()[..., 3])
+
+
+# Fast paths.
+
+def fast_deviation_angle(hdf5_file):
+    return damask_rotations.misorientation_angle(_last_orientations(hdf5_file)[0], TARGET)
+
+
+def fast_orientation_spread(hdf5_file):
+    out = orientation_deviation(hdf5_file, TARGET, symmetry='cubic')
+    return np.array([out['mean'], out['median'], out['max']])
+
+
+def fast_hexagonal(hdf5_file):
+    q = _last_orientations(hdf5_file)
+    return damask_rotations.misorientation_angle(q, q[::-1], 'hexagonal')
+
+
+# name: (reference, writes_file, single_phase_only, [(fast path, function, 'rel' | 'abs', tolerance)]).
+# 'rel' errors are relative to the largest reference value of each row (e.g. strain and stress
+# separately); 'abs' errors are in the reference's unit.
+CHECKS = {
+    'stress_strain': (reference_stress_strain, True, False, [
+        ('extract_simulation_results', lambda f: np.array(extract_simulation_results(f)), 'rel', 1e-12),
+        ('reduce_points', lambda f: np.array(reduce_simulation_results(f, 'points')), 'rel', 1e-10),
+        ('reduce_fields', lambda f: np.array(reduce_simulation_results(f, 'fields')), 'rel', 1e-2),
+    ]),
+    'deviation_angle': (reference_deviation_angle, False, True, [
+        ('deviation_angle', lambda f: deviation_angle(f, TARGET)['deviation_angle'], 'abs', 1e-8),
+        ('misorientation_angle', fast_deviation_angle, 'abs', 1e-8),
+    ]),
+    'orientation_spread': (reference_orientation_spread, False, False, [
+        ('orientation_deviation', fast_orientation_spread, 'abs', 1e-6),
+    ]),
+    'rotation_matrices': (reference_matrices, False, False, [
+        ('to_matrix', lambda f: damask_rotations.to_matrix(_last_orientations(f)), 'abs', 1e-12),
+    ]),
+    'hexagonal_misorientation': (reference_hexagonal, False, False, [
+        ('misorientation_angle', fast_hexagonal, 'abs', 1e-6),
+    ]),
+}
+
+
+def error(value, reference, kind: str) -> float:
+    value, reference = np.asarray(value, dtype=float), np.asarray(reference, dtype=float)
+    if value.shape != reference.shape:
+        return float('inf')
+    if not value.size:
+        return 0.0
+    deviation = np.abs(value - reference)
+    if kind == 'rel':
+        deviation = deviation / np.max(np.abs(reference), axis=-1, keepdims=True)
+    return float(np.max(deviation))
+
+
+def golden_values(value, size: int = 256) -> list:
+    """Reference output as stored in golden files: all values, or `size` evenly strided ones of larger arrays."""
+    flat = np.asarray(value, dtype=float).ravel()
+    return flat[::max(1, len(flat) // size)][:size].tolist()
+
+
+def timed(function, path, writes: bool, repeat: int):
+    """Best time of `repeat` calls on a fresh copy each (when the function writes) and a cold pool."""
+    best, value = float('inf'), None
+    for k in range(repeat):
+        target = shutil.copy(path, f"{path[:-5]}_call{k}.hdf5") if writes else path
+        RESULT_POOL.clear()
+        start = time.perf_counter()
+        value = function(target)
+        best = min(best, time.perf_counter() - start)
+        if writes:
+            os.remove(target)
+    return best, value
+
+
+def run(directory: str, repeat: int, checks: list = None) -> tuple:
+    """Rows of every fixture, check and fast path, and the reference outputs {fixture: {check: golden_values}}."""
+    rows, references = [], {}
+    for fixture, spec in FIXTURES.items():
+        path = write_result(os.path.join(directory, f"{fixture}.hdf5"), **spec)
+        references[fixture] = {}
+        for name in checks or list(CHECKS):
+            reference, writes, single_phase, fast_paths = CHECKS[name]
+            if single_phase and not isinstance(spec.get('phase', ''), str):
+                continue
+            t_ref, expected = timed(reference, path, writes, 1)
+            references[fixture][name] = golden_values(expected)
+            for fast, function, kind, tolerance in fast_paths:
+                try:
+                    t_fast, value = timed(function, path, writes, repeat)
+                    e = error(value, expected, kind)
+                except Exception as exc:
+                    t_fast, e = float('nan'), float('inf')
+                    print(f"{fixture}/{name}/{fast}: {exc}", file=sys.stderr)
+                rows.append({'fixture': fixture, 'check': name, 'fast_path': fast, 'error': e, 'kind': kind,
+                             'tolerance': tolerance, 'ok': bool(e <= tolerance), 'reference_s': t_ref,
+                             'fast_s': t_fast, 'speedup': t_ref / t_fast if t_fast > 0 else None})
+    return rows, references
+
+
+def compare_golden(references: dict, golden: dict, rtol: float) -> list:
+    """(fixture, check, largest relative deviation of a value) of the references from a golden file above rtol."""
+    drift = []
+    for fixture, outputs in golden['references'].items():
+        for name, stored in outputs.items():
+            if name in references.get(fixture, {}):
+                current, stored = np.array(references[fixture][name]), np.array(stored)
+                scale = np.maximum(np.abs(stored), 1e-12 * np.max(np.abs(stored)))
+                e = float(np.max(np.abs(current - stored) / scale)) if len(current) == len(stored) else float('inf')
+                if not e <= rtol:
+                    drift.append((fixture, name, e))
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checks", nargs="+", choices=list(CHECKS), help="Checks to run (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per fast path (best is kept).")
+    parser.add_argument("--golden", help="Golden file to compare the reference outputs with.")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="Accepted relative drift from the golden file.")
+    parser.add_argument("--save", help="Write the reference outputs to this golden file.")
+    parser.add_argument("--json", help="Write the result rows (errors, timings, speedups) to this file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows, references = run(tmp, args.repeat, args.checks)
+
+    print(f"{'fixture':>13} {'check':>24} {'fast path':>26} {'error':>9} {'tol':>7} {'ok':>3} "
+          f"{'ref [ms]':>9} {'fast [ms]':>9} {'speedup':>8}")
+    for row in rows:
+        print(f"{row['fixture']:>13} {row['check']:>24} {row['fast_path']:>26} {row['error']:>9.1e} "
+              f"{row['tolerance']:>7.0e} {'yes' if row['ok'] else 'NO':>3} {1e3 * row['reference_s']:>9.1f} "
+              f"{1e3 * row['fast_s']:>9.1f} {row['speedup'] or float('nan'):>7.1f}x")
+    failed = [row for row in rows if not row['ok']]
+
+    drift = []
+    if args.golden:
+        with open(args.golden) as f:
+            drift = compare_golden(references, json.load(f), args.rtol)
+        for fixture, name, e in drift:
+            print(f"reference {fixture}/{name} drifted from {args.golden} by {e:.1e}")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'damask': damask.__version__, 'h5py': h5py.__version__, 'numpy': np.__version__,
+                       'fixtures': FIXTURES, 'target': TARGET, 'references': references}, f)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': rows, 'drift': drift}, f, indent=2)
+    if failed or drift:
+        sys.exit(f"{len(failed)} fast path(s) outside tolerance, {len(drift)} reference(s) drifted.")
+
+
+if __name__ == "__main__":
+    main()
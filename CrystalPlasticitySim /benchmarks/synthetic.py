@@ -0,0 +1,90 @@
+"""
+Synthetic DAMASK result files (DADF5 layout, no solver needed).
+
+write_result() writes a file that damask.Result opens like a DAMASK_grid result:
+geometry and cell_to mappings, and one increment group per written increment with the
+phase outputs F, P and O of a polycrystal under uniaxial tension (fluctuating deformation
+around the applied stretch, a hardening stress response with scatter, grain orientations).
+With several phases the grains are dealt out to them in turn.
+"""
+import h5py
+import numpy as np
+
+
+def _rotations(rng, n):
+    q = rng.standard_normal((n, 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    q[q[:, 0] < 0] *= -1
+    return q
+
+
+def _matrices(q):
+    w, x, y, z = q.T
+    return np.stack([
+        np.stack([1 - 2 * (y ** 2 + z ** 2), 2 * (x * y - z * w), 2 * (x * z + y * w)], -1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x ** 2 + z ** 2), 2 * (y * z - x * w)], -1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x ** 2 + y ** 2)], -1),
+    ], -2)
+
+
+def _dataset(group, name, data, unit, **attrs):
+    d = group.create_dataset(name, data=data)
+    d.attrs['unit'] = unit
+    d.attrs['description'] = name
+    for k, v in attrs.items():
+        d.attrs[k] = v
+    return d
+
+
+def write_result(path: str, cells=(8, 8, 8), increments: int = 20, strain: float = 0.05, grains: int = 8,
+                 phase='Ni3Al', homogenization: str = 'SX', seed: int = 0) -> str:
+    """Write a synthetic result file with `increments` + 1 increment groups (phase: a name or a list); returns its path."""
+    rng = np.random.default_rng(seed)
+    n = int(np.prod(cells))
+    grain = rng.integers(0, grains, n)
+    phases = [phase] if isinstance(phase, str) else list(phase)
+    members = [np.flatnonzero(grain % len(phases) == k) for k in range(len(phases))]
+    q0 = _rotations(rng, grains)[grain]
+    scatter = 1 + 0.05 * rng.standard_normal(n)
+
+    with h5py.File(path, 'w') as f:
+        f.attrs['DADF5_version_major'] = 0
+        f.attrs['DADF5_version_minor'] = 14
+        geometry = f.create_group('geometry')
+        geometry.attrs['cells'] = np.array(cells)
+        geometry.attrs['size'] = np.array(cells) * 1e-6
+        geometry.attrs['origin'] = np.zeros(3)
+        mapping = np.dtype([('label', 'S16'), ('entry', '<i8')])
+        to_phase = np.zeros((n, 1), dtype=mapping)
+        for name, cells_of in zip(phases, members):
+            to_phase['label'][cells_of, 0] = name.encode()
+            to_phase['entry'][cells_of, 0] = np.arange(len(cells_of))
+        to_homogenization = np.zeros(n, dtype=mapping)
+        to_homogenization['label'], to_homogenization['entry'] = homogenization.encode(), np.arange(n)
+        f['cell_to/phase'] = to_phase
+        f['cell_to/homogenization'] = to_homogenization
+
+        for k in range(increments + 1):
+            eps = strain * k / max(increments, 1)
+            increment = f.create_group(f'increment_{k}')
+            increment.attrs['t/s'] = float(k)
+            increment.create_group('geometry')
+            increment.create_group(f'homogenization/{homogenization}/mechanical')
+
+            # Macroscopic stretch along x with lateral contraction plus a zero-mean fluctuation
+            # field, so that the volume average of F is the applied F as in a spectral solution.
+            F = np.tile(np.diag([np.exp(eps), np.exp(-0.5 * eps), np.exp(-0.5 * eps)]), (n, 1, 1))
+            fluctuation = 0.2 * eps * rng.standard_normal((n, 3, 3))
+            F += fluctuation - fluctuation.mean(axis=0)
+            sigma = np.zeros((n, 3, 3))
+            sigma[:, 0, 0] = (200e6 * (1 - np.exp(-eps / 0.005)) + 1e9 * eps) * scatter
+            sigma[:, 0, 1] = sigma[:, 1, 0] = 5e6 * rng.standard_normal(n) * eps
+            P = np.linalg.det(F)[:, None, None] * sigma @ np.linalg.inv(F).transpose(0, 2, 1)
+            O = _rotations(rng, n) * [1, eps, eps, eps] + q0
+            O /= np.linalg.norm(O, axis=1, keepdims=True)
+            for name, cells_of in zip(phases, members):
+                mechanical = increment.create_group(f'phase/{name}/mechanical')
+                _dataset(mechanical, 'F', F[cells_of], '-')
+                _dataset(mechanical, 'P', P[cells_of], 'Pa')
+                _dataset(mechanical, 'O', O[cells_of], 'q_0 (q_1 q_2 q_3)', lattice='cF')
+    return path
@@ -0,0 +1,287 @@
+"""
+Archive of finished result files.
+
+archive_runs() goes through DAMASK result files (a directory is searched recursively),
+finds the load/material/grid each was run with from the '<grid>_<load>_<material>.hdf5'
+name, and stores the reduced summary of every reducer whose fields the file contains
+(stress-strain curve, final orientation) in the study store, under the task key a sweep
+or optimizer would compute for the same inputs, so those runs are served from the cache
+later. The file itself is recorded in the store's file index with its parameters and
+fields, and can then be kept as is, repacked with chunked compression, pruned to the
+fields the objectives read, or deleted.
+
+find_runs() looks archived (and any other stored) runs up by parameter ranges.
+"""
+import glob
+import os
+
+import damask
+import h5py
+import numpy as np
+
+from damask_outputs import OBJECTIVE_OUTPUTS
+from damask_store import StudyStore, task_key
+from damask_sweep import LOAD_PARAMETERS
+from damask_worker import REDUCERS, make_task
+from damask_yaml import MPA_PARAMETERS
+
+MODES = ('keep', 'repack', 'prune', 'delete')
+COMPRESSION_LEVEL = 4
+
+
+def result_fields(result_file: str) -> dict:
+    """Phase/homogenization fields, number of increments and cells of a result file (without damask.Result)."""
+    with h5py.File(result_file, 'r') as f:
+        increments = sorted((k for k in f.keys() if k.startswith('increment_')), key=lambda k: int(k.split('_')[1]))
+        fields = set()
+        if increments:
+            first = f[increments[0]]
+            for kind in ('phase', 'homogenization'):
+                for name in first.get(kind, {}):
+                    for category in first[kind][name].values():
+                        if isinstance(category, h5py.Group):
+                            fields.update(category.keys())
+        cells = f['geometry'].attrs.get('cells') if 'geometry' in f else None
+    return {'fields': sorted(fields), 'increments': len(increments),
+            'cells': int(np.prod(cells)) if cells is not None else None}
+
+
+def _configs(directory: str, cache: dict) -> dict:
+    if directory not in cache:
+        found = {'grid': {}, 'load': {}, 'material': {}}
+        for path in glob.glob(os.path.join(directory, '*.vti')):
+            found['grid'][os.path.splitext(os.path.basename(path))[0]] = path
+        for path in glob.glob(os.path.join(directory, '*.yaml')):
+            try:
+                config = damask.YAML.load(path)
+            except Exception:
+                continue
+            kind = 'load' if 'loadstep' in config else 'material' if 'phase' in config else None
+            if kind:
+                found[kind][os.path.splitext(os.path.basename(path))[0]] = path
+        cache[directory] = found
+    return cache[directory]
+
+
+def find_inputs(result_file: str, grid_file: str = None, cache: dict = None) -> dict:
+    """
+    Load, material and grid files of a result file '<grid>_<load>_<material>.hdf5', searched
+    in its directory (grid_file is used when the grid is elsewhere, e.g. for kept worker
+    scratch directories). Returns None when no combination matches.
+    """
+    directory = os.path.dirname(os.path.abspath(result_file))
+    stem = os.path.splitext(os.path.basename(result_file))[0]
+    found = _configs(directory, {} if cache is None else cache)
+    grids = dict(found['grid'])
+    if grid_file:
+        grids[os.path.splitext(os.path.basename(grid_file))[0]] = os.path.abspath(grid_file)
+    for grid_stem, grid in grids.items():
+        if not stem.startswith(grid_stem + '_'):
+            continue
+        rest = stem[len(grid_stem) + 1:]
+        for load_stem, load in found['load'].items():
+            material = found['material'].get(rest[len(load_stem) + 1:]) if rest.startswith(load_stem + '_') else None
+            if material:
+                return {'load': load, 'material': material, 'grid': grid}
+    return None
+
+
+def _scalar(value):
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def input_parameters(load, material, phase: str = 'Ni3Al') -> dict:
+    """
+    Parameters of a run in the units sweeps and optimizers use: the scalar plastic
+    parameters of `phase` (stresses in MPa) and F12/F13/F23 of the first load step.
+    """
+    params = {}
+    phases = material['phase']
+    plastic = phases.get(phase, next(iter(phases.values())))['mechanical'].get('plastic', {})
+    for name, value in plastic.items():
+        value = _scalar(value)
+        if value is not None:
+            params[name] = value / 1e6 if name in MPA_PARAMETERS else value
+    dot_F = load['loadstep'][0]['boundary_conditions']['mechanical'].get('dot_F')
+    if dot_F:
+        for name, (i, j) in zip(LOAD_PARAMETERS, ((0, 1), (0, 2), (1, 2))):
+            value = _scalar(dot_F[i][j])
+            if value is not None:
+                params[name] = value
+    return params
+
+
+def _copy(source: h5py.Group, target: h5py.Group, keep: set, level: int, path: str = ''):
+    target.attrs.update(source.attrs)
+    for name, item in source.items():
+        item_path = f"{path}/{name}"
+        if isinstance(item, h5py.Group):
+            _copy(item, target.create_group(name), keep, level, item_path)
+            continue
+        parts = item_path.strip('/').split('/')
+        if keep is not None and parts[0].startswith('increment_') and len(parts) >= 4 \
+                and parts[1] in ('phase', 'homogenization') and name not in keep:
+            continue
+        if item.shape and item.size > 1 and item.dtype.kind in 'biufcV':
+            data = target.create_dataset(name, data=item[()], chunks=True, compression='gzip',
+                                         compression_opts=level, shuffle=True)
+            data.attrs.update(item.attrs)
+        else:
+            source.copy(item, target, name)
+
+
+def repack_result(result_file: str, keep_fields: list = None, level: int = COMPRESSION_LEVEL) -> dict:
+    """
+    Rewrite a result file with chunked gzip compression in place, keeping only keep_fields
+    of the phase/homogenization outputs when given (geometry and mappings are always kept).
+
+    Returns:
+    - dict: bytes before and after.
+    """
+    before = os.path.getsize(result_file)
+    packed = result_file + '.repack'
+    try:
+        with h5py.File(result_file, 'r') as source, h5py.File(packed, 'w') as target:
+            _copy(source, target, set(keep_fields) if keep_fields is not None else None, level)
+        os.replace(packed, result_file)
+    finally:
+        if os.path.exists(packed):
+            os.remove(packed)
+    return {'bytes_before': before, 'bytes_after': os.path.getsize(result_file)}
+
+
+def archive_result(result_file: str, store: StudyStore, study: str = 'archive', phase: str = 'Ni3Al',
+                   reducers: list = None, grid_file: str = None, cache: dict = None) -> dict:
+    """
+    Store the reduced summaries of one result file (archive_runs records the file itself).
+
+    Returns:
+    - dict: path, inputs (None when not found; the summaries are then not stored), params,
+      fields, increments, store keys and the reducers that failed.
+    """
+    meta = result_fields(result_file)
+    inputs = find_inputs(result_file, grid_file, cache)
+    record = dict(meta, path=os.path.abspath(result_file), inputs=inputs, params={}, keys=[], failed=[])
+    if inputs is None:
+        return record
+
+    load, material = damask.YAML.load(inputs['load']), damask.ConfigMaterial.load(inputs['material'])
+    record['params'] = input_parameters(load, material, phase)
+    for reduce in reducers or list(REDUCERS):
+        if not set(OBJECTIVE_OUTPUTS[reduce]) <= set(meta['fields']):
+            continue
+        key = task_key(make_task(os.path.basename(result_file), str(load), str(material), inputs['grid'], reduce))
+        try:
+            result = {'status': 'ok', 'reduced': REDUCERS[reduce](result_file),
+                      'message': f"archived from {record['path']}"}
+        except Exception as e:
+            result = {'status': 'reduce', 'reduced': None, 'message': str(e)}
+            record['failed'].append(reduce)
+        store.put(key, study, record['params'], reduce, result)
+        record['keys'].append(key)
+    return record
+
+
+def archive_runs(paths, store=None, study: str = 'archive', mode: str = 'keep', keep_fields: list = None,
+                 phase: str = 'Ni3Al', reducers: list = None, grid_file: str = None,
+                 level: int = COMPRESSION_LEVEL) -> dict:
+    """
+    Archive result files into a study store.
+
+    Parameters:
+    - paths (str | list): Result files and/or directories (searched recursively for *.hdf5).
+    - store (StudyStore | str): Target store (default: study.sqlite in the first directory).
+    - study (str): Name recorded with the archived runs.
+    - mode (str): What happens to a file once its summaries are stored: 'keep', 'repack'
+      (chunked gzip, all fields), 'prune' (repack with only keep_fields) or 'delete'.
+      Files without matching inputs are only ever indexed.
+    - keep_fields (list): Fields kept by 'prune' (default: the fields of all reducers, F, P and O).
+    - reducers (list): Keys of damask_worker.REDUCERS to extract (default: all the file has fields for).
+    - grid_file (str): Grid of the runs when it is not next to the result files.
+
+    Returns:
+    - dict: files archived, unchanged files skipped, files without inputs, summaries stored,
+      reducers that failed, bytes before and after.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {list(MODES)}.")
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '**', '*.hdf5'), recursive=True))
+        else:
+            files.append(path)
+    files = [os.path.abspath(f) for f in files]
+    if keep_fields is None:
+        keep_fields = sorted({f for reduce in reducers or list(REDUCERS) for f in OBJECTIVE_OUTPUTS[reduce]})
+
+    own_store = not isinstance(store, StudyStore)
+    if own_store:
+        root = paths[0] if paths and os.path.isdir(paths[0]) else os.path.dirname(files[0]) if files else '.'
+        store = StudyStore(store or os.path.join(root, 'study.sqlite'))
+    summary = {'archived': 0, 'skipped': 0, 'unmatched': [], 'summaries': 0, 'failed': [],
+               'bytes_before': 0, 'bytes_after': 0}
+    try:
+        indexed = {f['path']: f for f in store.files()}
+        cache = {}
+        states = {'keep': 'kept', 'repack': 'repacked', 'prune': 'pruned', 'delete': 'deleted'}
+        for result_file in files:
+            known = indexed.get(result_file)
+            size = os.path.getsize(result_file)
+            if known and known['mtime'] == os.path.getmtime(result_file) and known['bytes'] == size:
+                # Summaries are already stored; only a different mode still applies.
+                if mode == 'keep' or known['state'] == states[mode] or not known['keys']:
+                    summary['skipped'] += 1
+                    continue
+                record = dict(known, inputs=True, failed=[])
+            else:
+                record = archive_result(result_file, store, study, phase, reducers, grid_file, cache)
+                summary['summaries'] += len(record['keys']) - len(record['failed'])
+            summary['bytes_before'] += size
+            state = 'kept'
+            if record['inputs'] is None:
+                summary['unmatched'].append(result_file)
+            elif record['failed']:
+                summary['failed'].append({'path': result_file, 'reducers': record['failed']})
+            elif mode in ('repack', 'prune'):
+                fields = keep_fields if mode == 'prune' else None
+                repack_result(result_file, fields, level)
+                if fields is not None:
+                    record['fields'] = [f for f in record['fields'] if f in fields]
+                state = states[mode]
+            elif mode == 'delete':
+                os.remove(result_file)
+                state = states[mode]
+            summary['bytes_after'] += os.path.getsize(result_file) if os.path.isfile(result_file) else 0
+            store.put_file(result_file, study, record['keys'], record['params'], record['fields'],
+                           record['increments'], state)
+            summary['archived'] += 1
+    finally:
+        if own_store:
+            store.close()
+    return summary
+
+
+def find_runs(store, ranges: dict, study: str = None, reduce: str = None, status: str = 'ok') -> list:
+    """
+    Stored runs with parameters in ranges ({name: (low, high)}, see StudyStore.find), each
+    with its result 'files' from the file index (empty for runs that were not archived).
+    """
+    own_store = not isinstance(store, StudyStore)
+    store = StudyStore(store) if own_store else store
+    try:
+        rows = store.find(ranges, study, reduce, status)
+        by_key = {}
+        for record in store.files():
+            for key in record['keys']:
+                by_key.setdefault(key, []).append(record)
+        for row in rows:
+            row['files'] = [{'path': f['path'], 'state': f['state'], 'bytes': f['bytes']}
+                            for f in by_key.get(row['key'], [])]
+        return rows
+    finally:
+        if own_store:
+            store.close()
@@ -0,0 +1,169 @@
+"""
+Asynchronous steady-state differential evolution.
+
+Generation-synchronous DE (scipy's differential_evolution with a batch map) submits a
+whole population and waits for its slowest run before the next generation starts; with
+solver run times that vary several-fold across the parameter space (stiff high-n_sl
+materials cut back far more often) most slots sit idle at the end of every generation.
+
+Here `slots` evaluations are kept in flight at all times. Whenever one finishes, its
+trial replaces its target in the population if it is at least as good (DE/rand/1/bin
+with dithered F, as in scipy) and a new trial is submitted at once, built from the
+members evaluated so far. Each evaluation is timed, and the report compares the measured
+slot utilization with what a generation-synchronous schedule of the same run times
+would have achieved.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from damask_sweep import latin_hypercube
+
+
+def _synchronous_wall(durations: list, generation: int, slots: int) -> float:
+    """Wall time of running `durations` in generations of `generation`, each list-scheduled on `slots`."""
+    wall = 0.0
+    for start in range(0, len(durations), generation):
+        finish = np.zeros(slots)
+        for d in durations[start:start + generation]:
+            finish[np.argmin(finish)] += d
+        wall += finish.max()
+    return float(wall)
+
+
+def utilization_report(spans: list, slots: int, generation: int) -> dict:
+    """
+    Slot utilization of timed evaluations [(start, end)] against a synchronous baseline.
+
+    Returns:
+    - dict: slots, evaluations, wall_s, busy_s, utilization (busy / (slots * wall)),
+      mean_in_flight, and the estimated wall time and utilization of the same evaluations
+      run in synchronous generations of `generation` (synchronous_wall_s,
+      synchronous_utilization, speedup).
+    """
+    if not spans:
+        return {'slots': slots, 'evaluations': 0, 'wall_s': 0.0, 'busy_s': 0.0, 'utilization': None,
+                'mean_in_flight': 0.0, 'synchronous_wall_s': 0.0, 'synchronous_utilization': None, 'speedup': None}
+    starts, ends = np.array(spans).T
+    durations = (ends - starts).tolist()
+    wall = float(ends.max() - starts.min())
+    busy = float(sum(durations))
+    sync_wall = _synchronous_wall(durations, generation, slots)
+    return {
+        'slots': slots,
+        'evaluations': len(spans),
+        'wall_s': wall,
+        'busy_s': busy,
+        'utilization': busy / (slots * wall) if wall > 0 else None,
+        'mean_in_flight': busy / wall if wall > 0 else None,
+        'synchronous_wall_s': sync_wall,
+        'synchronous_utilization': busy / (slots * sync_wall) if sync_wall > 0 else None,
+        'speedup': sync_wall / wall if wall > 0 else None,
+    }
+
+
+def async_differential_evolution(evaluate, bounds: list, slots: int, popsize: int = 15,
+                                 max_evaluations: int = 1000, mutation=(0.5, 1.0), recombination: float = 0.7,
+                                 tol: float = 0.01, seed: int = None, callback=None) -> dict:
+    """
+    Minimize evaluate(x) -> float over a box with `slots` evaluations in flight.
+
+    evaluate is called from worker threads and must be thread-safe (the objectives of
+    damask_optimize are: each call is a blocking backend run).
+
+    Parameters:
+    - bounds (list): [(low, high)] per parameter.
+    - slots (int): Concurrent evaluations (usually the backend capacity).
+    - popsize (int): Population size multiplier, as in scipy (popsize * len(bounds) members).
+    - max_evaluations (int): Evaluation budget including the initial population.
+    - mutation, recombination: DE/rand/1/bin settings; a (low, high) mutation is dithered per trial.
+    - tol (float): Stop once std(errors) <= tol * |mean(errors)| over a fully evaluated population.
+    - callback (callable): callback(x, error, evaluations) after every evaluation; return True to stop.
+
+    Returns:
+    - dict: x, fun, evaluations, population, errors, message and 'report' (see utilization_report).
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = np.array(bounds, dtype=float).T
+    d = len(bounds)
+    size = max(5, popsize * d)
+    population = latin_hypercube(dict(enumerate(bounds)), size, seed)
+    errors = np.full(size, np.inf)
+    evaluated = np.zeros(size, dtype=bool)
+    busy = set()
+    spans = []
+    message = "Maximum number of evaluations reached."
+
+    def timed(x):
+        start = time.perf_counter()
+        try:
+            return float(evaluate(x))
+        finally:
+            spans.append((start, time.perf_counter()))
+
+    def trial(target):
+        donors = [i for i in np.flatnonzero(evaluated) if i != target]
+        if len(donors) < 3:
+            return None
+        r0, r1, r2 = rng.choice(donors, 3, replace=False)
+        F = rng.uniform(*mutation) if isinstance(mutation, (tuple, list)) else mutation
+        mutant = population[r0] + F * (population[r1] - population[r2])
+        cross = rng.random(d) < recombination
+        cross[rng.integers(d)] = True
+        # Out-of-bounds genes are resampled, as scipy does.
+        x = np.where(cross, mutant, population[target])
+        out = (x < lo) | (x > hi)
+        return np.where(out, lo + rng.random(d) * (hi - lo), x)
+
+    pending = list(range(size))
+    submitted = 0
+    stop = False
+    with ThreadPoolExecutor(slots) as pool:
+        in_flight = {}
+
+        def fill():
+            nonlocal submitted
+            while len(in_flight) < slots and submitted < max_evaluations and not stop:
+                if pending:
+                    i = pending.pop(0)
+                    x = population[i]
+                else:
+                    idle = [i for i in range(size) if i not in busy]
+                    if not idle:
+                        return
+                    i = int(rng.choice(idle))
+                    x = trial(i)
+                    if x is None:
+                        return
+                busy.add(i)
+                in_flight[pool.submit(timed, x)] = (i, x, not evaluated[i])
+                submitted += 1
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, x, initial = in_flight.pop(future)
+                busy.discard(i)
+                error = future.result()
+                if initial or error <= errors[i]:
+                    population[i], errors[i] = x, error
+                    evaluated[i] = True
+                if callback is not None and callback(x, error, len(spans)):
+                    stop, message = True, "Stopped by the callback."
+            if evaluated.all() and np.all(np.isfinite(errors)) \
+                    and np.std(errors) <= tol * abs(np.mean(errors)):
+                stop, message = True, "Population converged."
+            fill()
+
+    best = int(np.argmin(errors))
+    return {
+        'x': population[best],
+        'fun': float(errors[best]),
+        'evaluations': len(spans),
+        'population': population,
+        'errors': errors,
+        'message': message,
+        'report': utilization_report(spans, slots, size),
+    }
@@ -0,0 +1,289 @@
+"""
+Execution backends for rendered DAMASK tasks (see damask_worker).
+
+All backends take task dicts and return futures resolving to the worker's reduced result
+dict, so the optimizers do not care where the solver runs:
+
+- LocalBackend: a process pool on this node.
+- SSHBackend: tasks are piped as JSON to `damask_worker.py --stdin` on remote hosts
+  (grid on a shared filesystem, or shipped inside the task with ship_grid=True).
+- QueueBackend: a task/result queue served over TCP; any number of
+  `damask_worker.py --connect HOST:PORT` processes on any node pull from it.
+  spawn_local_workers starts such workers on this node, which is also how the
+  backend is exercised without a cluster.
+"""
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+
+import damask_telemetry
+from damask_worker import execute_task
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'damask_worker.py')
+
+
+class ExecutionBackend:
+    """
+    Base class: submit(task) -> Future of the worker result dict; `capacity` is the number
+    of tasks that run at the same time.
+    """
+
+    capacity = 1
+
+    def submit(self, task: dict) -> Future:
+        raise NotImplementedError
+
+    def map(self, tasks: list) -> list:
+        """Run tasks concurrently and return their results in order."""
+        futures = []
+        for task in tasks:
+            future = self.submit(task)
+            if damask_telemetry.enabled():
+                damask_telemetry.queue_change(1, self.capacity)
+                future.add_done_callback(lambda f: damask_telemetry.queue_change(-1, self.capacity))
+            futures.append(future)
+        return [f.result() for f in futures]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalBackend(ExecutionBackend):
+    """Run tasks in a local process pool."""
+
+    def __init__(self, workers: int = None, scratch: str = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.scratch = scratch
+        self.pool = ProcessPoolExecutor(self.workers)
+
+    @property
+    def capacity(self) -> int:
+        return self.workers
+
+    def submit(self, task: dict) -> Future:
+        return self.pool.submit(execute_task, task, self.scratch)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class SSHBackend(ExecutionBackend):
+    """
+    Run tasks on remote hosts over ssh, `slots_per_host` at a time per host.
+
+    The worker script and DAMASK must be installed on the hosts; `python` and
+    `worker_script` are the remote paths.
+    """
+
+    def __init__(self, hosts: list, python: str = 'python3', worker_script: str = WORKER_SCRIPT,
+                 scratch: str = None, slots_per_host: int = 1, ssh: str = 'ssh'):
+        self.hosts = list(hosts)
+        self.command = [python, worker_script, '--stdin'] + (['--scratch', scratch] if scratch else [])
+        self.ssh = ssh
+        self.slots = queue.Queue()
+        for _ in range(slots_per_host):
+            for host in self.hosts:
+                self.slots.put(host)
+        self.capacity = len(self.hosts) * slots_per_host
+        self.pool = ThreadPoolExecutor(self.capacity)
+
+    def _run(self, task: dict) -> dict:
+        host = self.slots.get()
+        try:
+            proc = subprocess.run([self.ssh, host] + self.command, input=json.dumps([task]),
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                return {'name': task['name'], 'status': 'launch', 'reduced': None, 'host': host,
+                        'message': f"ssh exit code {proc.returncode}: {proc.stderr.strip()[-500:]}"}
+            return json.loads(proc.stdout)[0]
+        finally:
+            self.slots.put(host)
+
+    def submit(self, task: dict) -> Future:
+        return self.pool.submit(self._run, task)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class _QueueClient(BaseManager):
+    pass
+
+
+_QueueClient.register('tasks')
+_QueueClient.register('results')
+
+
+def connect_queue(address: tuple, authkey: bytes):
+    """Worker side: connect to a QueueBackend and return its (tasks, results) queues."""
+    manager = _QueueClient(address=address, authkey=authkey)
+    manager.connect()
+    return manager.tasks(), manager.results()
+
+
+class QueueBackend(ExecutionBackend):
+    """
+    Serve tasks on a TCP queue for workers started with `damask_worker.py --connect`.
+
+    Bind to 0.0.0.0 (and a fixed port) for workers on other nodes; port 0 picks a free port,
+    see `.address`. The queues are served from a thread of this process, so the backend works
+    under every multiprocessing start method.
+
+    Workers report each task they take. A task fails with status 'crash' when the local
+    worker (spawn_local_workers) that took it exits, or when it runs longer than
+    task_timeout (default: the task's solver timeout for every attempt plus `grace`;
+    no limit for tasks without one), so a lost worker never blocks map().
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, authkey: bytes = None,
+                 task_timeout: float = None, grace: float = 60.0, poll: float = 1.0):
+        self.authkey = authkey or os.urandom(16).hex().encode()
+        tasks, results = queue.Queue(), queue.Queue()
+        # A class per backend: registrations are class-level and must not leak between instances.
+        manager_class = type('_QueueManager', (BaseManager,), {})
+        manager_class.register('tasks', callable=lambda: tasks)
+        manager_class.register('results', callable=lambda: results)
+        self.server = manager_class(address=(host, port), authkey=self.authkey).get_server()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tasks, self.results = connect_queue(self.server.address, self.authkey)
+        self.task_timeout = task_timeout
+        self.grace = grace
+        self.futures = {}
+        self.started = {}
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.closing = threading.Event()
+        self.workers = []
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+        self.watchdog = threading.Thread(target=self._watch, args=(poll,), daemon=True)
+        self.watchdog.start()
+
+    @property
+    def address(self) -> tuple:
+        return self.server.address
+
+    @property
+    def capacity(self) -> int:
+        # Remote workers are not known here; at least one is assumed.
+        return max(1, len(self.workers))
+
+    def _collect(self):
+        while True:
+            try:
+                item = self.results.get()
+            except (EOFError, ConnectionError, OSError):
+                return
+            if item is None:
+                return
+            if item[0] == 'started':
+                _, task_id, worker = item
+                with self.lock:
+                    if task_id in self.futures:
+                        self.started[task_id] = (time.monotonic(), worker)
+                continue
+            task_id, result = item
+            with self.lock:
+                entry = self.futures.pop(task_id, None)
+                self.started.pop(task_id, None)
+            if entry is not None:
+                entry[0].set_result(result)
+
+    def _limit(self, task: dict):
+        if self.task_timeout is not None:
+            return self.task_timeout
+        if task.get('timeout'):
+            return task['timeout'] * (task.get('retries', 0) + 1) + self.grace
+        return None
+
+    def _fail(self, task_id: int, message: str, worker: dict):
+        with self.lock:
+            entry = self.futures.pop(task_id, None)
+            self.started.pop(task_id, None)
+        if entry is not None:
+            entry[0].set_result({'name': entry[1]['name'], 'status': 'crash', 'message': message, 'reduced': None,
+                                 'attempts': 0, 'host': worker.get('host', ''), 'increments': None,
+                                 'failed_increments': None, 'cpu_s': None, 'result_bytes': None, 'elapsed': None})
+
+    def _watch(self, poll: float):
+        host = os.uname().nodename if hasattr(os, 'uname') else ''
+        while not self.closing.wait(poll):
+            dead = {proc.pid for proc in self.workers if proc.poll() is not None}
+            now = time.monotonic()
+            with self.lock:
+                started = [(task_id, t, worker, self.futures[task_id][1]) for task_id, (t, worker)
+                           in self.started.items() if task_id in self.futures]
+            for task_id, t, worker, task in started:
+                limit = self._limit(task)
+                if worker.get('host') == host and worker.get('pid') in dead:
+                    self._fail(task_id, f"Worker process {worker['pid']} exited during the task.", worker)
+                elif limit is not None and now - t > limit:
+                    self._fail(task_id, f"No result from worker {worker.get('host')}:{worker.get('pid')} "
+                                        f"after {limit:g} s.", worker)
+
+    def submit(self, task: dict) -> Future:
+        future = Future()
+        with self.lock:
+            task_id = next(self.ids)
+            self.futures[task_id] = (future, task)
+        self.tasks.put((task_id, task))
+        return future
+
+    def close(self, wait: float = 10.0):
+        self.closing.set()
+        for _ in self.workers:
+            self.tasks.put(None)
+        for proc in self.workers:
+            try:
+                proc.wait(wait)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self.results.put(None)
+        self.collector.join(wait)
+        self.server.stop_event.set()
+        self.server.listener.close()
+
+
+def spawn_local_workers(backend: QueueBackend, n: int, scratch: str = None) -> list:
+    """Start n worker processes on this node connected to a QueueBackend."""
+    host, port = backend.address
+    env = dict(os.environ, DAMASK_QUEUE_AUTHKEY=backend.authkey.decode())
+    command = [sys.executable, WORKER_SCRIPT, '--connect', f'{host}:{port}'] + \
+        (['--scratch', scratch] if scratch else [])
+    procs = [subprocess.Popen(command, env=env) for _ in range(n)]
+    backend.workers.extend(procs)
+    return procs
+
+
+def make_backend(kind: str = 'local', workers: int = None, **kwargs) -> ExecutionBackend:
+    """
+    Build a backend by name.
+
+    - 'local': LocalBackend(workers).
+    - 'ssh': SSHBackend(hosts=[...], ...).
+    - 'queue': QueueBackend(host, port, authkey) with `workers` local worker processes
+      started (0 to only wait for remote workers).
+    """
+    if kind == 'local':
+        return LocalBackend(workers, **kwargs)
+    if kind == 'ssh':
+        return SSHBackend(**kwargs)
+    if kind == 'queue':
+        scratch = kwargs.pop('scratch', None)
+        backend = QueueBackend(**kwargs)
+        spawn_local_workers(backend, workers if workers is not None else os.cpu_count() or 1, scratch)
+        return backend
+    raise ValueError(f"Unknown backend '{kind}', expected 'local', 'ssh' or 'queue'.")
@@ -0,0 +1,209 @@
+"""
+Grid coarsening for cheap-fidelity runs.
+
+Calibration cost scales with the number of cells, so trial runs can use a coarser copy of
+the material-ID grid. coarsen_material() maps every fine cell to a coarse cell (blocks of
+about factor^3 cells, any grid shape), and assigns coarse cells to materials so that:
+
+- every material gets its volume fraction of the coarse cells (largest-remainder rounding),
+- cells go to the materials that fill most of their block first, so grains keep their
+  place and shape as far as the quotas allow,
+- cells no material with quota left overlaps go to the nearest remaining grain.
+
+Grains smaller than about half a coarse cell can still vanish; grid_fidelity() reports
+this together with the volume-fraction error, the grain size and grain-boundary density of
+both grids and, given the orientations of the materials, the difference of the two
+orientation distributions.
+
+coarse_grid() writes the coarse grid once into the grid cache (see damask_grid) and is what
+the optimizers use for their `coarsen` option.
+"""
+import hashlib
+import os
+
+import damask
+import numpy as np
+
+from damask_grid import load_material, read_vti_header
+from damask_rotations import misorientation_angle
+
+
+def _targets(fractions: np.ndarray, n: int) -> np.ndarray:
+    """Cell counts with the given fractions summing to n (largest-remainder rounding)."""
+    exact = fractions * n
+    counts = np.floor(exact).astype(int)
+    counts[np.argsort(counts - exact)[:n - counts.sum()]] += 1
+    return counts
+
+
+def coarsen_material(material: np.ndarray, cells) -> np.ndarray:
+    """Material IDs (x, y, z) on a coarser grid of `cells`, keeping the volume fraction of every material."""
+    material = np.asarray(material)
+    cells = tuple(int(c) for c in cells)
+    ids, inverse = np.unique(material, return_inverse=True)
+    inverse = inverse.reshape(material.shape)
+    # Coarse cell of every fine cell, per axis, then flat (x fastest like the grid files).
+    axes = [(np.arange(n) * c) // n for n, c in zip(material.shape, cells)]
+    block = (axes[0][:, None, None] + cells[0] * (axes[1][None, :, None] + cells[1] * axes[2][None, None, :]))
+    n_coarse = int(np.prod(cells))
+
+    pairs, counts = np.unique(block.ravel() * len(ids) + inverse.ravel(), return_counts=True)
+    cell, mat = pairs // len(ids), pairs % len(ids)
+    share = counts / np.bincount(block.ravel(), minlength=n_coarse)[cell]
+    quota = _targets(np.bincount(inverse.ravel(), minlength=len(ids)) / material.size, n_coarse)
+
+    assigned = np.full(n_coarse, -1)
+    for k in np.lexsort((mat, -share)):
+        if assigned[cell[k]] < 0 and quota[mat[k]] > 0:
+            assigned[cell[k]] = mat[k]
+            quota[mat[k]] -= 1
+
+    free = np.flatnonzero(assigned < 0)
+    if len(free):
+        # Remaining quota goes to the free cells closest (periodically) to where each grain is densest.
+        anchor = np.zeros(len(ids), dtype=int)
+        best = np.zeros(len(ids))
+        for c, m, s in zip(cell, mat, share):
+            if s > best[m]:
+                best[m], anchor[m] = s, c
+        position = np.stack(np.unravel_index(np.arange(n_coarse), cells, order='F'), axis=-1)
+        waiting = np.flatnonzero(quota > 0)
+        delta = np.abs(position[free][:, None, :] - position[anchor[waiting]][None, :, :])
+        distance = np.linalg.norm(np.minimum(delta, np.array(cells) - delta), axis=-1)
+        for k in np.argsort(distance, axis=None):
+            i, j = np.unravel_index(k, distance.shape)
+            m = waiting[j]
+            if assigned[free[i]] < 0 and quota[m] > 0:
+                assigned[free[i]] = m
+                quota[m] -= 1
+    return ids[assigned].reshape(cells, order='F')
+
+
+def material_orientations(material_file: str) -> np.ndarray:
+    """Quaternion of the first constituent of every material entry (row i is material ID i)."""
+    config = damask.ConfigMaterial.load(material_file)
+    return np.array([entry['constituents'][0]['O'] for entry in config['material']], dtype=float)
+
+
+def _boundary_density(material: np.ndarray, size) -> float:
+    """Grain-boundary area per volume (periodic faces between different materials)."""
+    spacing = np.asarray(size, dtype=float) / material.shape
+    area = 0.0
+    for axis in range(3):
+        faces = np.count_nonzero(material != np.roll(material, 1, axis=axis))
+        area += faces * np.prod(np.delete(spacing, axis))
+    return float(area / np.prod(size))
+
+
+def _odf_error(orientations, fine_fractions, coarse_fractions, symmetry, halfwidth) -> float:
+    """
+    Relative kernel distance between two weightings of the same orientations:
+    |w1 - w2|_K / |w1|_K with a Gaussian kernel of the misorientation angle (O(grains^2)).
+    """
+    q = np.asarray(orientations, dtype=float)
+    K = np.exp(-(misorientation_angle(q[:, None, :], q[None, :, :], symmetry) / halfwidth) ** 2)
+    delta = coarse_fractions - fine_fractions
+    return float(np.sqrt(max(delta @ K @ delta, 0.0) / (fine_fractions @ K @ fine_fractions)))
+
+
+def grid_fidelity(fine: np.ndarray, coarse: np.ndarray, size, orientations=None, symmetry: str = 'cubic',
+                  halfwidth: float = 10.0) -> dict:
+    """
+    Statistics of a coarsened grid against the original.
+
+    Parameters:
+    - fine, coarse: Material IDs (x, y, z) of both grids.
+    - size: Physical size of the grids.
+    - orientations: Quaternions per material ID (see material_orientations) for the ODF error.
+    - symmetry, halfwidth: Crystal symmetry and kernel half-width (degrees) of the ODF error.
+
+    Returns:
+    - dict: cells of both grids, volume-fraction error (total variation and max), grains of
+      the original and the lost ones, mean equivalent grain diameter and grain-boundary
+      density (area per volume) of both, and the relative ODF error (None without orientations).
+    """
+    ids = np.union1d(np.unique(fine), np.unique(coarse))
+
+    def fractions(material):
+        present, counts = np.unique(material, return_counts=True)
+        out = np.zeros(len(ids))
+        out[np.searchsorted(ids, present)] = counts / material.size
+        return out
+
+    f_fine, f_coarse = fractions(fine), fractions(coarse)
+    volume = float(np.prod(size))
+
+    def diameter(fractions):
+        present = fractions[fractions > 0]
+        return float(np.mean((6 * present * volume / np.pi) ** (1 / 3)))
+
+    odf = None
+    if orientations is not None:
+        odf = _odf_error(np.asarray(orientations)[ids], f_fine, f_coarse, symmetry, halfwidth)
+    return {
+        'cells': [list(fine.shape), list(coarse.shape)],
+        'cell_ratio': float(fine.size / coarse.size),
+        'volume_fraction_tv': float(0.5 * np.abs(f_coarse - f_fine).sum()),
+        'volume_fraction_max_error': float(np.abs(f_coarse - f_fine).max()),
+        'grains': int(np.count_nonzero(f_fine)),
+        'grains_lost': [int(i) for i in ids[(f_fine > 0) & (f_coarse == 0)]],
+        'grain_diameter': [diameter(f_fine), diameter(f_coarse)],
+        'boundary_density': [_boundary_density(fine, size), _boundary_density(coarse, size)],
+        'odf_error': odf,
+    }
+
+
+def coarse_cells(cells, factor: float) -> tuple:
+    return tuple(max(1, int(round(c / factor))) for c in cells)
+
+
+def coarsen_grid(grid_file: str, factor: float = 2, cells: list = None, output_file: str = None,
+                 material_file: str = None, symmetry: str = 'cubic') -> dict:
+    """
+    Write a coarsened copy of a .vti grid (same physical size and origin).
+
+    Parameters:
+    - grid_file (str): Original grid.
+    - factor (float): Cells per axis are divided by this (ignored when cells is given).
+    - cells (list): Cells (nx, ny, nz) of the coarse grid.
+    - output_file (str): Target .vti (default: '<stem>_coarse<factor>.vti' next to the grid).
+    - material_file (str): Material config whose orientations enter the ODF error.
+
+    Returns:
+    - dict: grid_file of the coarse grid and its fidelity (see grid_fidelity).
+    """
+    info = read_vti_header(grid_file)
+    fine = np.asarray(load_material(grid_file))
+    if output_file is None:
+        stem = os.path.splitext(os.path.abspath(grid_file))[0]
+        output_file = f"{stem}_coarse{factor:g}.vti" if cells is None else \
+            f"{stem}_{'x'.join(str(c) for c in cells)}.vti"
+    cells = tuple(cells) if cells is not None else coarse_cells(info['cells'], factor)
+    coarse = coarsen_material(fine, cells)
+    damask.GeomGrid(coarse, info['size'], info['origin'],
+                    comments=f"coarsened from {os.path.basename(grid_file)} to {list(cells)} cells").save(output_file)
+    orientations = material_orientations(material_file) if material_file else None
+    return {'grid_file': os.path.abspath(output_file),
+            'fidelity': grid_fidelity(fine, coarse, info['size'], orientations, symmetry)}
+
+
+def coarse_grid(grid_file: str, factor: float, material_file: str = None, cache_dir: str = None) -> dict:
+    """
+    coarsen_grid() into the grid cache, done once per grid content and factor; later calls
+    return the cached file (so result-store keys stay valid) with the fidelity recomputed.
+    """
+    st = os.stat(grid_file)
+    key = hashlib.sha1(f"{os.path.abspath(grid_file)}|{st.st_size}|{st.st_mtime_ns}|{factor}".encode()).hexdigest()[:16]
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(grid_file)), '.grid_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(grid_file))[0]
+    path = os.path.join(cache_dir, f"{stem}_coarse{factor:g}_{key}.vti")
+    if not os.path.exists(path):
+        tmp = f"{path[:-4]}.{os.getpid()}.vti"
+        coarsen_grid(grid_file, factor, output_file=tmp)
+        os.replace(tmp, path)
+    orientations = material_orientations(material_file) if material_file else None
+    return {'grid_file': path,
+            'fidelity': grid_fidelity(np.asarray(load_material(grid_file, cache_dir)),
+                                      np.asarray(load_material(path, cache_dir)),
+                                      read_vti_header(grid_file)['size'], orientations)}
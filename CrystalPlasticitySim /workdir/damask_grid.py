@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+VTK_DTYPES = {
+    'Int8': 'i1', 'UInt8': 'u1', 'Int16': 'i2', 'UInt16': 'u2', 'Int32': 'i4', 'UInt32': 'u4',
+    'Int64': 'i8', 'UInt64': 'u8', 'Float32': 'f4', 'Float64': 'f8',
+}
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def read_vti_header(grid_file: str) -> dict:
+    """
+    Read the ImageData geometry of a .vti file without decoding any data array.
+
+    Returns:
+    - dict: 'cells' (nx, ny, nz), 'origin', 'spacing', 'size', 'byte_order', 'header_type', 'compressor'.
+    """
+    root_attrib = {}
+    for event, elem in ET.iterparse(grid_file, events=('start',)):
+        if elem.tag == 'VTKFile':
+            root_attrib = dict(elem.attrib)
+        elif elem.tag == 'ImageData':
+            extent = [int(v) for v in elem.attrib['WholeExtent'].split()]
+            spacing = [float(v) for v in elem.attrib.get('Spacing', '1 1 1').split()]
+            cells = tuple(extent[2 * i + 1] - extent[2 * i] for i in range(3))
+            return {
+                'cells': cells,
+                'origin': [float(v) for v in elem.attrib.get('Origin', '0 0 0').split()],
+                'spacing': spacing,
+                'size': [c * s for c, s in zip(cells, spacing)],
+                'byte_order': root_attrib.get('byte_order', 'LittleEndian'),
+                'header_type': root_attrib.get('header_type', 'UInt32'),
+                'compressor': root_attrib.get('compressor'),
+            }
+    raise ValueError(f"{grid_file} contains no ImageData element.")
+
+
+def _b64_length(n_bytes: int) -> int:
+    return 4 * ((n_bytes + 2) // 3)
+
+
+def _decode_binary(text: str, dtype: np.dtype, header_dtype: np.dtype, compressed: bool) -> np.ndarray:
+    """Decode an inline base64 DataArray, following the VTK XML binary layout."""
+    text = ''.join(text.split())
+    hsize = header_dtype.itemsize
+    if compressed:
+        # Header [n_blocks, block_size, last_block_size, compressed sizes...] is encoded separately.
+        n_blocks = int(np.frombuffer(base64.b64decode(text[:_b64_length(hsize)])[:hsize], header_dtype)[0])
+        header_chars = _b64_length((3 + n_blocks) * hsize)
+        header = np.frombuffer(base64.b64decode(text[:header_chars]), header_dtype)
+        payload = base64.b64decode(text[header_chars:])
+        out, offset = [], 0
+        for size in header[3:3 + n_blocks].astype(np.int64):
+            out.append(zlib.decompress(payload[offset:offset + size]))
+            offset += size
+        raw = b''.join(out)
+    else:
+        head = text[:_b64_length(hsize)]
+        if head.endswith('='):
+            raw = base64.b64decode(text[len(head):])
+        else:
+            raw = base64.b64decode(text)[hsize:]
+    return np.frombuffer(raw, dtype)
+
+
+def read_vti_array(grid_file: str, name: str = 'material') -> tuple:
+    """
+    Decode one CellData array of a .vti file.
+
+    Returns:
+    - tuple: (header dict from read_vti_header, flat numpy array in VTK (x-fastest) order).
+    """
+    info = read_vti_header(grid_file)
+    endian = '<' if info['byte_order'] == 'LittleEndian' else '>'
+    header_dtype = np.dtype(endian + VTK_DTYPES[info['header_type']])
+    for elem in ET.parse(grid_file).getroot().iter('DataArray'):
+        if elem.attrib.get('Name') != name:
+            continue
+        dtype = np.dtype(endian + VTK_DTYPES[elem.attrib['type']])
+        fmt = elem.attrib.get('format', 'ascii')
+        if fmt == 'binary':
+            data = _decode_binary(elem.text or '', dtype, header_dtype, info['compressor'] is not None)
+        elif fmt == 'ascii':
+            data = np.array((elem.text or '').split(), dtype=dtype)
+        else:
+            raise ValueError(f"Unsupported DataArray format '{fmt}' in {grid_file}.")
+        return info, data.astype(dtype.newbyteorder('='), copy=False)
+    raise KeyError(f"No DataArray named '{name}' in {grid_file}.")
+
+
+def _cache_path(grid_file: str, name: str, cache_dir: str = None) -> str:
+    st = os.stat(grid_file)
+    key = hashlib.sha1(f"{os.path.abspath(grid_file)}|{st.st_size}|{st.st_mtime_ns}|{name}".encode()).hexdigest()[:16]
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(grid_file)), '.grid_cache')
+    stem = os.path.splitext(os.path.basename(grid_file))[0]
+    return os.path.join(cache_dir, f"{stem}.{name}.{key}.npy")
+
+
+def load_material(grid_file: str, cache_dir: str = None, name: str = 'material') -> np.ndarray:
+    """
+    Material IDs of a .vti grid as a read-only array of shape cells (x, y, z).
+
+    The first call decodes the XML/zlib payload once into a .npy cache (keyed on path,
+    size and mtime); later calls, also from other processes, memory-map that file.
+
+    Parameters:
+    - grid_file (str): Path to the .vti file.
+    - cache_dir (str): Cache directory (default: .grid_cache next to the grid).
+    - name (str): CellData array to load.
+    """
+    cache = _cache_path(grid_file, name, cache_dir)
+    with _memo_lock:
+        if cache in _memo:
+            return _memo[cache]
+    if not os.path.exists(cache):
+        info, data = read_vti_array(grid_file, name)
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache), suffix='.npy')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, data.reshape(info['cells'], order='F'), allow_pickle=False)
+        os.replace(tmp, cache)
+    # Stored in Fortran order, so the memory map is a zero-copy (x, y, z) view.
+    material = np.load(cache, mmap_mode='r')
+    with _memo_lock:
+        _memo[cache] = material
+    return material
+
+
+def grid_statistics(grid_file: str, cache_dir: str = None) -> dict:
+    """Cell count, number of materials and volume fraction per material ID."""
+    material = load_material(grid_file, cache_dir)
+    ids, counts = np.unique(material, return_counts=True)
+    return {
+        'cells': list(material.shape),
+        'N_materials': int(len(ids)),
+        'volume_fraction': {int(i): float(c) / material.size for i, c in zip(ids, counts)},
+    }
+
+
+def share_material(grid_file: str, cache_dir: str = None) -> tuple:
+    """
+    Copy the material IDs of a grid into shared memory for worker processes.
+
+    Returns:
+    - tuple: (SharedMemory, descriptor). Pass the picklable descriptor to workers and
+      call attach_material(descriptor) there; the owner must close() and unlink() the
+      SharedMemory when all workers are done.
+    """
+    material = load_material(grid_file, cache_dir)
+    shm = shared_memory.SharedMemory(create=True, size=max(material.nbytes, 1))
+    view = np.ndarray(material.shape, material.dtype, buffer=shm.buf, order='F')
+    view[...] = material
+    return shm, {'name': shm.name, 'shape': material.shape, 'dtype': material.dtype.str}
+
+
+def attach_material(descriptor: dict) -> tuple:
+    """
+    Attach to a grid published with share_material.
+
+    Returns:
+    - tuple: (SharedMemory, read-only array). Keep the SharedMemory referenced while the
+      array is in use and close() it afterwards.
+    """
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    material = np.ndarray(descriptor['shape'], np.dtype(descriptor['dtype']), buffer=shm.buf, order='F')
+    material.flags.writeable = False
+    return shm, material
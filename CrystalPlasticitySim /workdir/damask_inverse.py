@@ -0,0 +1,222 @@
+"""
+Inverse orientation design on a surrogate of the load -> final orientation map.
+
+Instead of one solver run per optimizer step, the final orientation is modelled as a
+function of the dot_F components (F12, F13, F23) by radial-basis-function interpolation
+of the runs done so far. The inverse problem (which dot_F gives the target orientation)
+is solved on the model by multi-start L-BFGS-B, and only the few best candidates of each
+round are run with DAMASK to verify them; the verified runs refine the model for the next
+round.
+
+All runs go through the study store under a study name that fingerprints the templates, so
+the model of a load/material/grid combination keeps improving across calls and every run a
+sweep or another fit already did for the same inputs is reused.
+"""
+import hashlib
+import os
+
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import minimize
+
+from damask_backends import ExecutionBackend, LocalBackend
+from damask_optimize import FailureMemory, append_csv
+from damask_outputs import slim_outputs
+from damask_rotations import misorientation_angle, normalize
+from damask_store import StudyStore
+from damask_sweep import LOAD_PARAMETERS, TaskRenderer, latin_hypercube, run_points
+from damask_yaml import update_load
+
+
+class OrientationSurrogate:
+    """
+    Final orientation as a function of (F12, F13, F23): a thin-plate-spline RBF fit of the
+    quaternion components on inputs scaled to the unit box (predictions are renormalized).
+    """
+
+    def __init__(self, bounds: list, smoothing: float = 1e-9):
+        self.lo, self.hi = np.array(bounds, dtype=float).T
+        self.smoothing = smoothing
+        self.model = None
+        self.size = 0
+
+    def _unit(self, X) -> np.ndarray:
+        return (np.atleast_2d(X) - self.lo) / (self.hi - self.lo)
+
+    def fit(self, X, Q) -> "OrientationSurrogate":
+        Q = normalize(Q)
+        # Align hemispheres (q and -q are the same rotation) so the components vary smoothly.
+        Q = np.where((Q @ Q[0])[:, None] < 0, -Q, Q)
+        self.model = RBFInterpolator(self._unit(X), Q, kernel='thin_plate_spline', smoothing=self.smoothing,
+                                     degree=1)
+        self.size = len(Q)
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        return normalize(self.model(self._unit(X)))
+
+    def inverse(self, target, starts, symmetry: str = None, exclude=None) -> list:
+        """
+        Local minima of the predicted deviation angle from the start points, best first:
+        [(x, predicted angle)], without duplicates and points exclude(x) rejects.
+        """
+        bounds = list(zip(self.lo, self.hi))
+
+        def angle(x):
+            return float(misorientation_angle(self.predict(x)[0], target, symmetry))
+
+        minima = []
+        for x0 in starts:
+            result = minimize(angle, x0, bounds=bounds, method='L-BFGS-B')
+            x = np.clip(result.x, self.lo, self.hi)
+            if exclude is not None and exclude(x):
+                continue
+            if all(np.max(np.abs(self._unit(x) - self._unit(m))) > 1e-3 for m, _ in minima):
+                minima.append((x, float(result.fun)))
+        return sorted(minima, key=lambda m: m[1])
+
+
+def template_study(load_file: str, material_file: str, grid_file: str) -> str:
+    """Study name shared by all inverse fits of the same templates."""
+    h = hashlib.sha1()
+    for path in (load_file, material_file):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    h.update(os.path.abspath(grid_file).encode())
+    return f"inverse_{h.hexdigest()[:10]}"
+
+
+def _training(store: StudyStore, study: str, bounds: list):
+    X, Q = [], []
+    for row in store.rows(study, status='ok'):
+        if row['reduce'] == 'orientation' and all(name in row['params'] for name in LOAD_PARAMETERS):
+            x = [row['params'][name] for name in LOAD_PARAMETERS]
+            if all(lo <= v <= hi for v, (lo, hi) in zip(x, bounds)):
+                X.append(x)
+                Q.append(row['reduced']['quaternion'])
+    return np.array(X, dtype=float).reshape(-1, 3), np.array(Q, dtype=float).reshape(-1, 4)
+
+
+def fit_orientation_surrogate(load_file: str, grid_file: str, material_file: str, target_quaternion: list,
+                              bounds: list = None, initial: int = 12, rounds: int = 5, candidates: int = None,
+                              starts: int = 16, tolerance: float = 0.5, symmetry: str = None,
+                              workers: int = 1, seed: int = None, log_file: str = None, slim: bool = True,
+                              backend: ExecutionBackend = None, store=None, study: str = None,
+                              timeout: float = None) -> dict:
+    """
+    Fit F12, F13, F23 to a target orientation on a surrogate, verifying candidates with DAMASK.
+
+    Parameters:
+    - load_file, grid_file, material_file (str): DAMASK input files.
+    - target_quaternion (list): Target orientation [w, x, y, z].
+    - bounds (list): [(low, high)] * 3 for F12, F13, F23 (default +-3e-3).
+    - initial (int): Latin-hypercube runs before the first model (fewer when the store
+      already holds runs of these templates).
+    - rounds (int): Model -> inverse -> verification rounds.
+    - candidates (int): Runs verified per round (default: workers).
+    - starts (int): L-BFGS-B starts on the model per round (plus the best verified runs).
+    - tolerance (float): Stop once a verified run is within this angle (degrees).
+    - symmetry (str): Crystal symmetry of the deviation angle (see damask_rotations).
+    - store (StudyStore | str): Result cache and training data (default: study.sqlite next to the load file).
+    - study (str): Study of the training runs (default: a fingerprint of the templates).
+    - timeout (float): Wall-time limit per solver run in seconds.
+
+    Returns:
+    - dict: best verified (F12, F13, F23), its deviation and predicted angles, solver runs
+      (evaluations) and cache hits, training size, rounds, mean model error, best load file and the log.
+    """
+    workdir = os.path.dirname(os.path.abspath(load_file))
+    log_file = log_file or os.path.join(workdir, "inverse_results.csv")
+    run_root = os.path.join(workdir, "runs")
+    os.makedirs(run_root, exist_ok=True)
+    bounds = [tuple(float(v) for v in b) for b in (bounds or [(-3e-3, 3e-3)] * 3)]
+    study = study or template_study(load_file, material_file, grid_file)
+    trial_load, trial_material = load_file, material_file
+    if slim:
+        slimmed = slim_outputs(load_file, material_file, "orientation", grid_file=grid_file, output_dir=run_root)
+        trial_load, trial_material = slimmed["load_file"], slimmed["material_file"]
+    render = TaskRenderer(trial_load, trial_material, grid_file, 'orientation', timeout=timeout)
+    candidates = candidates or max(1, workers)
+    rng = np.random.default_rng(seed)
+
+    own_backend = backend is None
+    backend = backend or LocalBackend(workers)
+    own_store = not isinstance(store, StudyStore)
+    store = StudyStore(store or os.path.join(workdir, 'study.sqlite')) if own_store else store
+    memory = FailureMemory(bounds)
+    executed = cached = done = 0
+    best = (np.inf, None, None)
+    model_errors = []
+
+    def verify(X, round_, predicted):
+        nonlocal executed, cached, best
+        params = [dict(zip(LOAD_PARAMETERS, (float(v) for v in x))) for x in X]
+        results = run_points(render, params, study, backend, store=store)
+        executed += len({r['key'] for r in results if not r['cached']})
+        cached += sum(r['cached'] for r in results)
+        memory.check(results)
+        for x, p, r, pred in zip(X, params, results, predicted):
+            angle = np.inf
+            if r['status'] == 'ok':
+                angle = float(misorientation_angle(r['reduced']['quaternion'], target_quaternion, symmetry))
+                if pred is not None:
+                    model_errors.append(abs(angle - pred))
+                if angle < best[0]:
+                    best = (angle, x, pred)
+            memory.record(x, r['status'], angle if np.isfinite(angle) else None)
+            append_csv(log_file, ["round"] + list(LOAD_PARAMETERS) + ["predicted_angle", "deviation_angle", "status",
+                                                                     "cached"],
+                       [round_] + [p[n] for n in LOAD_PARAMETERS] + [pred, angle, r['status'], r['cached']])
+
+    try:
+        for row in store.rows(study):
+            if row['status'] != 'ok' and all(name in row['params'] for name in LOAD_PARAMETERS):
+                memory.record([row['params'][name] for name in LOAD_PARAMETERS], row['status'])
+        X, Q = _training(store, study, bounds)
+        if len(X) < initial:
+            design = latin_hypercube(dict(zip(LOAD_PARAMETERS, bounds)), initial - len(X), seed)
+            verify(design, 0, [None] * len(design))
+            X, Q = _training(store, study, bounds)
+        for x, q in zip(X, Q):
+            angle = float(misorientation_angle(q, target_quaternion, symmetry))
+            if angle < best[0]:
+                best = (angle, x, None)
+
+        surrogate = OrientationSurrogate(bounds)
+        lo, hi = np.array(bounds).T
+        while done < rounds and best[0] > tolerance and len(X) >= 5:
+            surrogate.fit(X, Q)
+            angles = misorientation_angle(Q, target_quaternion, symmetry)
+            x0 = [X[i] for i in np.argsort(angles)[:3]] + list(lo + rng.random((starts, 3)) * (hi - lo))
+            minima = surrogate.inverse(target_quaternion, x0, symmetry, exclude=memory.predicted)
+            # Candidates that were already run teach the model nothing new.
+            minima = [(x, a) for x, a in minima
+                      if not np.any(np.all(np.abs((X - x) / (hi - lo)) < 1e-6, axis=1))][:candidates]
+            if not minima:
+                break
+            done += 1
+            verify(np.array([x for x, _ in minima]), done, [a for _, a in minima])
+            X, Q = _training(store, study, bounds)
+    finally:
+        if own_backend:
+            backend.close()
+        if own_store:
+            store.close()
+
+    if best[1] is None:
+        raise RuntimeError("No successful run to fit the orientation on; see the log for the failures.")
+    F12, F13, F23 = (float(v) for v in best[1])
+    return {
+        "best_F": {"F12": F12, "F13": F13, "F23": F23},
+        "deviation_angle": float(best[0]),
+        "predicted_angle": best[2],
+        "evaluations": executed,
+        "cached": cached,
+        "training_runs": int(len(X)),
+        "rounds": done,
+        "model_error": float(np.mean(model_errors)) if model_errors else None,
+        "best_load_file": update_load(load_file, F12, F13, F23),
+        "log_file": log_file,
+        "study": study,
+        "failures": memory.summary(),
+    }
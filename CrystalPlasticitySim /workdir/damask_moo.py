@@ -0,0 +1,293 @@
+"""
+Multi-objective calibration with NSGA-II.
+
+Instead of weighting per-experiment errors into one number, every objective is kept
+separate ("<case>:error" for the MAPE / deviation angle of a case, "<case>:saturation"
+for the remaining work-hardening rate of a stress-strain case) and the optimizer returns
+the Pareto front. Constraints are handled with Deb's constraint-domination rule, failed
+runs count as infeasible, and each generation's feasible non-dominated points are merged
+into the study's Pareto archive in the study store, so the front survives restarts and
+can be extended by later runs.
+"""
+import os
+
+import numpy as np
+
+from damask_backends import ExecutionBackend, LocalBackend
+from damask_optimize import MultiExperimentObjective, append_csv
+from damask_store import StudyStore
+from damask_sweep import latin_hypercube
+
+
+def hardening_saturation(reduced: dict, tail: float = 0.2) -> float:
+    """
+    Relative work-hardening rate at the end of a stress-strain curve: the slope of a line
+    through the last `tail` of the points divided by the final stress (0 when saturated).
+    """
+    strain, stress = np.asarray(reduced['strain']), np.asarray(reduced['stress'])
+    n = max(2, int(np.ceil(len(strain) * tail)))
+    slope = np.polyfit(strain[-n:], stress[-n:], 1)[0]
+    return float(abs(slope) / abs(stress[-1])) if stress[-1] else np.inf
+
+
+def _error(objective, case, result):
+    return objective.case_error(case, result)
+
+
+def _saturation(objective, case, result):
+    if result['status'] != 'ok' or case['reduce'] != 'stress_strain':
+        return np.inf
+    return hardening_saturation(result['reduced'])
+
+
+METRICS = {
+    'error': _error,
+    'saturation': _saturation,
+}
+
+
+class ParetoObjective:
+    """
+    Objective vectors and constraint violations of parameter vectors.
+
+    - objectives: labels "<case name>:<metric>" (metric a key of METRICS).
+    - constraints: dicts {'name': parameter or objective label, 'min': value and/or 'max': value},
+      or callables f(params, objectives) -> violation (> 0 is infeasible).
+    """
+
+    def __init__(self, objective: MultiExperimentObjective, objectives: list, constraints: list = None):
+        self.objective = objective
+        self.cases = {case['name']: case for case in objective.cases}
+        self.labels = list(objectives)
+        for label in self.labels:
+            case, _, metric = label.partition(':')
+            if case not in self.cases or metric not in METRICS:
+                raise ValueError(f"Unknown objective '{label}', expected '<case>:<{'|'.join(METRICS)}>' "
+                                 f"with case in {list(self.cases)}.")
+        self.constraints = list(constraints or [])
+
+    def violation(self, params: dict, objectives: dict) -> float:
+        total = 0.0
+        values = dict(params, **objectives)
+        for constraint in self.constraints:
+            if callable(constraint):
+                total += max(0.0, float(constraint(params, objectives)))
+                continue
+            value = values[constraint['name']]
+            if 'min' in constraint:
+                total += max(0.0, constraint['min'] - value)
+            if 'max' in constraint:
+                total += max(0.0, value - constraint['max'])
+        return total
+
+    def evaluate_batch(self, X):
+        """
+        Returns:
+        - (F, V, values): objective matrix (n, m), violations (n,), parameter dicts.
+          Failed runs get inf objectives and inf violation.
+        """
+        values, results = self.objective.run_cases(X)
+        names = list(self.cases)
+        F, V = [], []
+        for v, per_case in zip(values, results):
+            by_case = dict(zip(names, per_case))
+            objectives = {}
+            for label in self.labels:
+                case, _, metric = label.partition(':')
+                objectives[label] = float(METRICS[metric](self.objective, self.cases[case], by_case[case]))
+            failed = not all(np.isfinite(list(objectives.values())))
+            violation = np.inf if failed else self.violation(v, objectives)
+            append_csv(self.objective.log_file, self.objective.names + self.labels + ["violation"],
+                       [v[n] for n in self.objective.names] + [objectives[k] for k in self.labels] + [violation])
+            F.append([objectives[k] for k in self.labels])
+            V.append(violation)
+        return np.array(F, dtype=float), np.array(V, dtype=float), values
+
+
+def _dominates(Fi, Vi, Fj, Vj) -> bool:
+    if Vi == 0 and Vj > 0:
+        return True
+    if Vi > 0 or Vj > 0:
+        return Vi < Vj
+    return bool(np.all(Fi <= Fj) and np.any(Fi < Fj))
+
+
+def nondominated_sort(F: np.ndarray, V: np.ndarray) -> list:
+    """Fronts (lists of indices) under constraint domination, best first."""
+    n = len(F)
+    dominated_by = [[] for _ in range(n)]
+    counts = np.zeros(n, dtype=int)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if _dominates(F[i], V[i], F[j], V[j]):
+                dominated_by[i].append(j)
+                counts[j] += 1
+            elif _dominates(F[j], V[j], F[i], V[i]):
+                dominated_by[j].append(i)
+                counts[i] += 1
+    fronts, current = [], [i for i in range(n) if counts[i] == 0]
+    while current:
+        fronts.append(current)
+        following = []
+        for i in current:
+            for j in dominated_by[i]:
+                counts[j] -= 1
+                if counts[j] == 0:
+                    following.append(j)
+        current = following
+    return fronts
+
+
+def crowding_distance(F: np.ndarray) -> np.ndarray:
+    n, m = F.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    F = np.where(np.isfinite(F), F, np.finfo(float).max / 4)
+    for k in range(m):
+        order = np.argsort(F[:, k])
+        span = F[order[-1], k] - F[order[0], k]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (F[order[2:], k] - F[order[:-2], k]) / span
+    return distance
+
+
+def _rank(F, V):
+    rank, crowd = np.empty(len(F), dtype=int), np.empty(len(F))
+    for r, front in enumerate(nondominated_sort(F, V)):
+        rank[front] = r
+        crowd[front] = crowding_distance(F[front])
+    return rank, crowd
+
+
+def _select(F, V, size):
+    chosen = []
+    for front in nondominated_sort(F, V):
+        if len(chosen) + len(front) <= size:
+            chosen += front
+        else:
+            crowd = crowding_distance(F[front])
+            chosen += [front[i] for i in np.argsort(-crowd)[:size - len(chosen)]]
+            break
+    return np.array(chosen)
+
+
+def _offspring(X, rank, crowd, lo, hi, rng, eta_c=15.0, eta_m=20.0, p_cross=0.9):
+    n, d = X.shape
+
+    def tournament():
+        i, j = rng.integers(0, n, 2)
+        if rank[i] != rank[j]:
+            return i if rank[i] < rank[j] else j
+        return i if crowd[i] >= crowd[j] else j
+
+    children = []
+    while len(children) < n:
+        p1, p2 = X[tournament()].copy(), X[tournament()].copy()
+        if rng.random() < p_cross:
+            # Simulated binary crossover
+            u = rng.random(d)
+            beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta_c + 1)), (1 / (2 * (1 - u))) ** (1 / (eta_c + 1)))
+            p1, p2 = 0.5 * ((1 + beta) * p1 + (1 - beta) * p2), 0.5 * ((1 - beta) * p1 + (1 + beta) * p2)
+        for child in (p1, p2):
+            # Polynomial mutation, each gene with probability 1/d
+            mutate = rng.random(d) < 1.0 / d
+            u = rng.random(d)
+            delta = np.where(u < 0.5, (2 * u) ** (1 / (eta_m + 1)) - 1, 1 - (2 * (1 - u)) ** (1 / (eta_m + 1)))
+            child = np.where(mutate, child + delta * (hi - lo), child)
+            children.append(np.clip(child, lo, hi))
+    return np.array(children[:n])
+
+
+def nsga2(evaluate, bounds: dict, pop_size: int = 24, generations: int = 20, seed: int = None,
+          on_generation=None):
+    """
+    NSGA-II over a box.
+
+    evaluate(X) -> (F, V) evaluates a whole population at once (F minimized, V constraint
+    violation); on_generation(generation, X, F, V) is called for the initial population
+    and every offspring batch.
+
+    Returns:
+    - (X, F, V): the final population.
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = np.array(list(bounds.values()), dtype=float).T
+    X = latin_hypercube(bounds, pop_size, seed)
+    F, V = evaluate(X)
+    if on_generation:
+        on_generation(0, X, F, V)
+    for generation in range(1, generations + 1):
+        rank, crowd = _rank(F, V)
+        Y = _offspring(X, rank, crowd, lo, hi, rng)
+        FY, VY = evaluate(Y)
+        if on_generation:
+            on_generation(generation, Y, FY, VY)
+        X, F, V = np.vstack([X, Y]), np.vstack([F, FY]), np.concatenate([V, VY])
+        keep = _select(F, V, pop_size)
+        X, F, V = X[keep], F[keep], V[keep]
+    return X, F, V
+
+
+def calibrate_pareto(material_file: str, experiments: list, bounds: dict, objectives: list = None,
+                     constraints: list = None, pop_size: int = 24, generations: int = 20, workers: int = 1,
+                     seed: int = None, log_file: str = None, slim: bool = True, backend: ExecutionBackend = None,
+                     store=None, study: str = 'pareto') -> dict:
+    """
+    Multi-objective calibration of slip parameters over one or more experiments.
+
+    Parameters:
+    - material_file (str): Material YAML template.
+    - experiments (list): As in damask_optimize.calibrate_experiments.
+    - bounds (dict): Parameter name -> (low, high); stresses in MPa.
+    - objectives (list): Labels "<case>:error" / "<case>:saturation" (default: the error of every case).
+    - constraints (list): See ParetoObjective, e.g. [{'name': 'A1:error', 'max': 5}].
+    - pop_size, generations, seed: NSGA-II settings; each generation is one parallel batch.
+    - backend (ExecutionBackend): Where runs execute (default: LocalBackend(workers)).
+    - store (StudyStore | str): Result cache and Pareto archive (default: study.sqlite next to the material file).
+    - study (str): Archive name; rerunning with the same study and objectives extends the archived
+      front, other objectives replace it.
+
+    Returns:
+    - dict: archived Pareto front (params and objectives), its size, evaluations and the log.
+    """
+    workdir = os.path.dirname(os.path.abspath(material_file))
+    log_file = log_file or os.path.join(workdir, "pareto_results.csv")
+    names = list(bounds)
+    own_backend = backend is None
+    backend = backend or LocalBackend(workers)
+    own_store = not isinstance(store, StudyStore)
+    store = StudyStore(store or os.path.join(workdir, 'study.sqlite')) if own_store else store
+    evaluations = 0
+    try:
+        joint = MultiExperimentObjective(material_file, experiments, names, log_file, backend, store, study, slim=slim)
+        problem = ParetoObjective(joint, objectives or [f"{case['name']}:error" for case in joint.cases], constraints)
+
+        def evaluate(X):
+            nonlocal evaluations
+            F, V, _ = problem.evaluate_batch(X)
+            evaluations += len(X)
+            return F, V
+
+        def archive(generation, X, F, V):
+            feasible = (V == 0) & np.all(np.isfinite(F), axis=1)
+            store.update_archive(study, [
+                {'params': dict(zip(names, map(float, x))), 'objectives': dict(zip(problem.labels, map(float, f))),
+                 'generation': generation}
+                for x, f in zip(X[feasible], F[feasible])])
+
+        nsga2(evaluate, bounds, pop_size, generations, seed, on_generation=archive)
+        front = store.archive(study)
+    finally:
+        if own_backend:
+            backend.close()
+        if own_store:
+            store.close()
+    return {
+        'objectives': problem.labels,
+        'pareto': front,
+        'archive_size': len(front),
+        'evaluations': evaluations,
+        'log_file': log_file,
+    }
@@ -0,0 +1,649 @@
+import csv
+import os
+import threading
+import uuid
+
+import damask
+import numpy as np
+from scipy.optimize import differential_evolution, minimize
+
+from damask_async import async_differential_evolution
+from damask_backends import ExecutionBackend, LocalBackend
+from damask_coarsen import coarse_grid
+from damask_outputs import slim_load, slim_material, slim_outputs
+from damask_results import curve_error, read_experimental_data
+from damask_rotations import misorientation_angle
+from damask_simulation import FAILURE_TYPES
+from damask_stepping import StepPlanner
+from damask_store import StudyStore, run_cached, template_key
+from damask_worker import make_task
+from damask_yaml import MaterialTemplate, render_load, update_load, update_material_properties
+
+
+def new_run_dir(root: str) -> str:
+    """Create a unique directory for one solver evaluation under root."""
+    run_dir = os.path.join(root, f"run_{uuid.uuid4().hex[:12]}")
+    os.makedirs(run_dir)
+    return run_dir
+
+
+_CSV_LOCK = threading.Lock()
+
+
+def append_csv(log_file: str, header: list, row: list):
+    """Append one row to a CSV log, writing the header first if the file is new (thread-safe)."""
+    with _CSV_LOCK:
+        new = not os.path.exists(log_file)
+        with open(log_file, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(header)
+            writer.writerow(row)
+
+
+SKIPPED = {"status": "skipped", "message": "predicted failure region", "reduced": None, "host": "", "elapsed": 0.0}
+
+
+class FailureMemory:
+    """
+    Where in the (box-normalized) parameter space runs failed or succeeded.
+
+    A candidate is predicted to fail, and is not run, when at least `min_failures` failed
+    runs lie within `radius` of it and no successful run is closer than its nearest failure.
+    Failed and skipped points score penalty(): twice the worst finite error seen so far,
+    so they rank behind every successful point without inf entering the optimizer.
+    """
+
+    def __init__(self, bounds: list, radius: float = 0.05, min_failures: int = 2):
+        self.lo, self.hi = np.array(bounds, dtype=float).T
+        self.radius = radius
+        self.min_failures = min_failures
+        self.failed, self.succeeded, self.kinds = [], [], {}
+        self.worst = None
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def _unit(self, x) -> np.ndarray:
+        return (np.asarray(x, dtype=float) - self.lo) / np.where(self.hi > self.lo, self.hi - self.lo, 1.0)
+
+    def record(self, x, status: str, error: float = None):
+        with self.lock:
+            if status == "ok":
+                self.succeeded.append(self._unit(x))
+                if error is not None and np.isfinite(error):
+                    self.worst = error if self.worst is None else max(self.worst, error)
+            elif status == "skipped":
+                self.skipped += 1
+            elif status != "launch":
+                self.failed.append(self._unit(x))
+                self.kinds[status] = self.kinds.get(status, 0) + 1
+
+    def predicted(self, x) -> bool:
+        with self.lock:
+            failed, succeeded = np.array(self.failed), np.array(self.succeeded)
+        if len(failed) < self.min_failures:
+            return False
+        u = self._unit(x)
+        d_fail = np.linalg.norm(failed - u, axis=1)
+        if np.sum(d_fail <= self.radius) < self.min_failures:
+            return False
+        if len(succeeded):
+            return np.linalg.norm(succeeded - u, axis=1).min() > d_fail.min()
+        return True
+
+    def penalty(self) -> float:
+        return 2.0 * self.worst if self.worst else 1e6
+
+    def check(self, results: list):
+        """Raise when a batch only failed for reasons no parameter change can fix (and nothing ever ran)."""
+        statuses = {r["status"] for r in results if r["status"] != "skipped"}
+        if statuses and statuses <= {"config", "launch"} and not self.succeeded:
+            kind = "launch" if "launch" in statuses else "config"
+            raise FAILURE_TYPES[kind](next(r["message"] for r in results if r["status"] == kind))
+
+    def seed(self, store: StudyStore, names: list, study: str, templates) -> "FailureMemory":
+        """
+        Add earlier runs of one study whose parameters cover `names` and whose fixed inputs have
+        one of the `templates` fingerprints (see damask_store.template_key); runs of other
+        templates, grids or slimming say nothing about where this study's runs fail.
+        """
+        templates = {templates} if isinstance(templates, str) else set(templates)
+        for row in store.rows(study):
+            if row["template"] in templates and all(n in row["params"] for n in names):
+                self.record([row["params"][n] for n in names], row["status"])
+        return self
+
+    def summary(self) -> dict:
+        return {"failures": len(self.failed), "by_kind": dict(self.kinds), "skipped": self.skipped}
+
+
+def run_guarded(backend: ExecutionBackend, tasks: list, X, memory: FailureMemory = None,
+                store: StudyStore = None, study: str = "", params: list = None,
+                planner: StepPlanner = None) -> list:
+    """
+    Worker results for tasks, skipping those the memory predicts to fail (status 'skipped').
+    With a planner, the increments of every run are chosen from its neighbours' convergence.
+    """
+    run = [memory is None or not memory.predicted(x) for x in X]
+    params = params or [{} for _ in tasks]
+    if planner is not None:
+        tasks = [planner.apply(t, x, p.get("case")) if r else t for t, x, p, r in zip(tasks, X, params, run)]
+    ran = iter(run_cached(backend, [t for t, r in zip(tasks, run) if r], store, study,
+                          [p for p, r in zip(params, run) if r]))
+    results = [next(ran) if r else dict(SKIPPED) for r in run]
+    if planner is not None:
+        for x, p, r in zip(X, params, results):
+            if r["status"] != "skipped" and not r.get("cached"):
+                planner.observe(x, r, p.get("case"))
+    if memory is not None:
+        memory.check(results)
+    return results
+
+
+def reduce_failed(result: dict, error: Exception) -> str:
+    """
+    Mark a finished run whose output cannot be compared with the experiment (e.g. strain
+    ranges that do not overlap) as failed with status 'reduce', so settle() penalizes it.
+    """
+    result.update(status="reduce", message=str(error), reduced=None)
+    return result["status"]
+
+
+def settle(memory: FailureMemory, X, statuses: list, errors: list) -> list:
+    """Record a scored batch in the memory and replace failed/skipped errors by its penalty."""
+    if memory is None:
+        return [e if s == "ok" else np.inf for s, e in zip(statuses, errors)]
+    for x, s, e in zip(X, statuses, errors):
+        if s == "ok":
+            memory.record(x, s, e)
+    penalty = memory.penalty()
+    for x, s in zip(X, statuses):
+        if s != "ok":
+            memory.record(x, s)
+    return [e if s == "ok" else penalty for s, e in zip(statuses, errors)]
+
+
+class SlipParameterObjective:
+    """
+    MAPE between the experimental and simulated stress-strain curve for parameter vectors.
+
+    The templates are loaded once; every trial is rendered to YAML text (only the fitted
+    phase is dumped per trial, see damask_yaml.MaterialTemplate) and executed by a
+    backend (see damask_backends), which returns only the reduced curve. Each trial is
+    appended to log_file, and stored in the study store when one is given. The best trial
+    is kept as (mape, parameters, curve).
+    """
+
+    def __init__(self, material_file, load_file, grid_file, experimental_file, names, log_file,
+                 backend: ExecutionBackend, phase: str = "Ni3Al", memory: FailureMemory = None,
+                 timeout: float = None, store=None, study: str = "slip", planner: StepPlanner = None):
+        self.material = MaterialTemplate(damask.ConfigMaterial.load(material_file), phase)
+        self.load = render_load(damask.YAML.load(load_file))
+        self.grid_file = os.path.abspath(grid_file)
+        self.template = template_key(self.load, self.material.render({}), self.grid_file, "stress_strain")
+        self.exp_strain, self.exp_stress = read_experimental_data(experimental_file)
+        self.names = list(names)
+        self.log_file = log_file
+        self.backend = backend
+        self.phase = phase
+        self.memory = memory
+        self.timeout = timeout
+        self.store = store
+        self.study = study
+        self.planner = planner
+        self.best = (np.inf, {}, None)
+        self.lock = threading.Lock()
+
+    def evaluate_batch(self, X) -> list:
+        """Evaluate parameter vectors concurrently on the backend."""
+        values = [dict(zip(self.names, (float(v) for v in x))) for x in X]
+        tasks = [make_task(f"trial_{uuid.uuid4().hex[:12]}", self.load,
+                           self.material.render(v), self.grid_file, "stress_strain",
+                           timeout=self.timeout, template=self.template)
+                 for v in values]
+        results = run_guarded(self.backend, tasks, X, self.memory, self.store, self.study, values, self.planner)
+        statuses, errors = [], []
+        for result in results:
+            status, error = result["status"], np.inf
+            if status == "ok":
+                reduced = result["reduced"]
+                try:
+                    error = curve_error(self.exp_strain, self.exp_stress, reduced["strain"], reduced["stress"])
+                except ValueError as e:
+                    status = reduce_failed(result, e)
+            statuses.append(status)
+            errors.append(error)
+        errors = settle(self.memory, X, statuses, errors)
+        for v, result, error in zip(values, results, errors):
+            append_csv(self.log_file, self.names + ["mape", "status", "host", "elapsed_s", "error"],
+                       [v[n] for n in self.names] + [error, result["status"], result.get("host", ""),
+                                                     result.get("elapsed"), result["message"]])
+            with self.lock:
+                if error < self.best[0]:
+                    self.best = (error, v, result["reduced"])
+        return errors
+
+    def __call__(self, x) -> float:
+        return self.evaluate_batch([x])[0]
+
+
+class LoadOrientationObjective:
+    """
+    Deviation angle (degrees) between the final simulated orientation and a target
+    quaternion for (F12, F13, F23) vectors, executed on a backend. Each trial is
+    appended to log_file.
+    """
+
+    def __init__(self, load_file, grid_file, material_file, target_quaternion, log_file,
+                 backend: ExecutionBackend, memory: FailureMemory = None, timeout: float = None):
+        self.load = damask.YAML.load(load_file)
+        self.material = str(damask.ConfigMaterial.load(material_file))
+        self.grid_file = os.path.abspath(grid_file)
+        self.target_quaternion = list(target_quaternion)
+        self.log_file = log_file
+        self.backend = backend
+        self.memory = memory
+        self.timeout = timeout
+
+    def evaluate_batch(self, X) -> list:
+        """Evaluate dot_F vectors concurrently on the backend."""
+        Fs = [tuple(float(v) for v in x) for x in X]
+        tasks = [make_task(f"trial_{uuid.uuid4().hex[:12]}", render_load(self.load, *F), self.material,
+                           self.grid_file, "orientation", timeout=self.timeout)
+                 for F in Fs]
+        results = run_guarded(self.backend, tasks, X, self.memory)
+        ok = [r["status"] == "ok" for r in results]
+        angles = np.full(len(results), np.inf)
+        if any(ok):
+            angles[ok] = misorientation_angle([r["reduced"]["quaternion"] for r, o in zip(results, ok) if o],
+                                              self.target_quaternion)
+        angles = angles.tolist()
+        angles = settle(self.memory, X, [r["status"] for r in results], angles)
+        for F, result, angle in zip(Fs, results, angles):
+            quaternion = result["reduced"]["quaternion"] if result["status"] == "ok" else None
+            append_csv(self.log_file,
+                       ["F12", "F13", "F23", "simulated_quaternion", "deviation_angle", "status", "host",
+                        "elapsed_s", "error"],
+                       list(F) + [quaternion, angle, result["status"], result.get("host", ""), result.get("elapsed"),
+                                  result["message"]])
+        return angles
+
+    def __call__(self, x) -> float:
+        return self.evaluate_batch([x])[0]
+
+
+# Error of a case that counts as one unit of joint error, per reduction: a MAPE of 0.02 (2 %)
+# weighs as much as a deviation of 1 degree. Override per experiment with 'tolerance'.
+CASE_TOLERANCE = {"stress_strain": 0.02, "orientation": 1.0}
+
+
+class MultiExperimentObjective:
+    """
+    Weighted mean normalized error of one parameter vector over several experiments.
+
+    Each experiment is a dict with 'name', 'load_file', 'grid_file', an optional 'weight'
+    (default 1), an optional 'tolerance' (default CASE_TOLERANCE) and either
+    'experimental_file' (stress-strain curve, MAPE as a fraction) or 'target_quaternion'
+    (final orientation, deviation angle in degrees). Each case error is divided by its
+    tolerance, so curves and orientations enter the joint error on the same scale. The
+    material template is parsed once and rendered once per parameter vector, shared by
+    all cases; every (vector, case) run of a batch is submitted to the backend together.
+    A vector with a failed run scores the failure memory's finite penalty (see settle).
+    Each vector is appended to log_file with the raw per-case errors and the joint error.
+    """
+
+    def __init__(self, material_file, experiments, names, log_file, backend: ExecutionBackend,
+                 store=None, study: str = "joint", phase: str = "Ni3Al", slim: bool = True,
+                 memory: FailureMemory = None, timeout: float = None, planner: StepPlanner = None):
+        self.material = damask.ConfigMaterial.load(material_file)
+        self.cases = []
+        for i, experiment in enumerate(experiments):
+            reduce = "stress_strain" if experiment.get("experimental_file") else "orientation"
+            load = damask.YAML.load(experiment["load_file"])
+            case = {
+                "name": experiment.get("name") or f"case{i}",
+                "reduce": reduce,
+                "load": str(slim_load(load, reduce) if slim else load),
+                "grid_file": os.path.abspath(experiment["grid_file"]),
+                "weight": float(experiment.get("weight", 1.0)),
+                "tolerance": float(experiment.get("tolerance") or CASE_TOLERANCE[reduce]),
+            }
+            if reduce == "stress_strain":
+                case["exp_strain"], case["exp_stress"] = read_experimental_data(experiment["experimental_file"])
+            else:
+                case["target_quaternion"] = np.asarray(experiment["target_quaternion"], dtype=float)
+            self.cases.append(case)
+        if slim:
+            slim_material(self.material, sorted({case["reduce"] for case in self.cases}))
+        self.material = MaterialTemplate(self.material, phase)
+        for case in self.cases:
+            case["template"] = template_key(case["load"], self.material.render({}), case["grid_file"], case["reduce"])
+        self.templates = [case["template"] for case in self.cases]
+        self.names = list(names)
+        self.log_file = log_file
+        self.backend = backend
+        self.store = store
+        self.study = study
+        self.phase = phase
+        self.memory = memory
+        self.timeout = timeout
+        self.planner = planner
+        self.best = (np.inf, {}, {})
+        self.lock = threading.Lock()
+
+    def case_error(self, case: dict, result: dict) -> float:
+        """Error of one case; a curve that cannot be compared marks the result as failed (status 'reduce')."""
+        if result["status"] != "ok":
+            return np.inf
+        reduced = result["reduced"]
+        if case["reduce"] == "stress_strain":
+            try:
+                return curve_error(case["exp_strain"], case["exp_stress"], reduced["strain"], reduced["stress"])
+            except ValueError as e:
+                reduce_failed(result, e)
+                return np.inf
+        return float(misorientation_angle(reduced["quaternion"], case["target_quaternion"]))
+
+    def run_cases(self, X):
+        """
+        Run parameter vectors on all cases in one backend batch (vectors the failure memory
+        predicts to fail are skipped on every case).
+
+        Returns:
+        - (values, results): parameter dicts and, per vector, the list of worker results per case.
+        """
+        values = [dict(zip(self.names, (float(v) for v in x))) for x in X]
+        tasks, params, points = [], [], []
+        for x, v in zip(X, values):
+            material = self.material.render(v)
+            for case in self.cases:
+                tasks.append(make_task(f"{case['name']}_{uuid.uuid4().hex[:12]}", case["load"], material,
+                                       case["grid_file"], case["reduce"], timeout=self.timeout,
+                                       template=case["template"]))
+                params.append(dict(v, case=case["name"]))
+                points.append(x)
+        results = run_guarded(self.backend, tasks, points, self.memory, self.store, self.study, params,
+                              self.planner)
+        n = len(self.cases)
+        return values, [results[k * n:(k + 1) * n] for k in range(len(values))]
+
+    def evaluate_batch(self, X) -> list:
+        """Evaluate parameter vectors on all cases concurrently; returns the joint errors."""
+        values, results = self.run_cases(X)
+        total_weight = sum(case["weight"] for case in self.cases)
+        case_errors = [[self.case_error(case, result) for case, result in zip(self.cases, per_case)]
+                       for per_case in results]
+        statuses = [next((r["status"] for r in per_case if r["status"] != "ok"), "ok") for per_case in results]
+        joints = settle(self.memory, X, statuses,
+                        [sum(case["weight"] * e / case["tolerance"] for case, e in zip(self.cases, per_case))
+                         / total_weight for per_case in case_errors])
+        joint = []
+        for v, per_case, error in zip(values, case_errors, joints):
+            append_csv(self.log_file, self.names + [case["name"] for case in self.cases] + ["joint_error"],
+                       [v[n] for n in self.names] + per_case + [error])
+            with self.lock:
+                if error < self.best[0]:
+                    self.best = (error, v, {case["name"]: e for case, e in zip(self.cases, per_case)})
+            joint.append(error)
+        return joint
+
+    def __call__(self, x) -> float:
+        return self.evaluate_batch([x])[0]
+
+
+def batch_map(objective):
+    """Map-like callable for differential_evolution(workers=...) that evaluates a whole population at once."""
+    return lambda func, X: objective.evaluate_batch(list(X))
+
+
+def run_differential_evolution(objective, bounds: list, maxiter: int, popsize: int, tol: float, seed: int,
+                               backend: ExecutionBackend, asynchronous: bool = False):
+    """
+    Minimize an objective of this module with generation-synchronous scipy DE (each
+    population is one backend batch) or, with asynchronous=True, with steady-state DE
+    keeping backend.capacity runs in flight under the same evaluation budget (see damask_async).
+
+    Returns:
+    - (x, fun, evaluations, utilization): utilization is the damask_async report, or None.
+    """
+    if asynchronous:
+        result = async_differential_evolution(objective, bounds, backend.capacity, popsize=popsize,
+                                              max_evaluations=(maxiter + 1) * popsize * len(bounds),
+                                              tol=tol, seed=seed)
+        return result["x"], result["fun"], result["evaluations"], result["report"]
+    result = differential_evolution(objective, bounds, maxiter=maxiter, popsize=popsize, tol=tol, seed=seed,
+                                    workers=batch_map(objective), updating="deferred", polish=False)
+    return result.x, result.fun, result.nfev, None
+
+
+def calibrate_slip_parameters(material_file: str, load_file: str, grid_file: str, experimental_file: str,
+                              bounds: dict, maxiter: int = 20, popsize: int = 10, tol: float = 0.01,
+                              workers: int = 1, seed: int = None, log_file: str = None,
+                              slim: bool = True, backend: ExecutionBackend = None,
+                              timeout: float = None, asynchronous: bool = False, store=None,
+                              study: str = "slip", adaptive_steps: bool = False, coarsen: float = 1) -> dict:
+    """
+    Fit slip parameters of the material file to an experimental stress-strain curve
+    with differential evolution.
+
+    Parameters:
+    - material_file, load_file, grid_file (str): DAMASK input files.
+    - experimental_file (str): Two-column text file (true_stress, true_strain) with a header line.
+    - bounds (dict): Parameter name -> (low, high); stresses in MPa (see damask_yaml.MPA_PARAMETERS).
+    - maxiter, popsize, tol, seed: Passed to scipy.optimize.differential_evolution.
+    - workers (int): Number of parallel solver evaluations when no backend is given.
+    - log_file (str): CSV receiving every trial (default: optimization_results.csv next to the material file).
+    - slim (bool): Let trial runs write only F and P at ~50 increments (see damask_outputs.slim_outputs).
+    - backend (ExecutionBackend): Where trials run (default: LocalBackend(workers)); see damask_backends.
+    - timeout (float): Wall-time limit per solver run in seconds.
+    - asynchronous (bool): Steady-state DE that submits a new trial whenever a run finishes
+      instead of waiting for the slowest run of each generation (see damask_async).
+    - store (StudyStore | str): Optional result cache; finished trials are reused.
+    - study (str): Study name of the stored trials.
+    - adaptive_steps (bool): Choose the increments of every trial from the convergence of
+      nearby trials, stored and current (see damask_stepping).
+    - coarsen (float): Run the trials on a grid with this many times fewer cells per axis
+      (volume fractions kept, see damask_coarsen); the result reports its fidelity.
+
+    Failed runs (see damask_simulation.SolverError) score a finite penalty, and candidates in
+    regions where runs keep failing are not run at all (see FailureMemory).
+
+    Returns:
+    - dict: best parameters, best MAPE, number of evaluations, path of the best material file,
+      the log, the simulated curve of the best trial, a summary of failures, the utilization
+      report (asynchronous runs only), the increments planned and converged at (adaptive_steps
+      only) and the grid fidelity (coarsen only).
+    """
+    workdir = os.path.dirname(os.path.abspath(material_file))
+    log_file = log_file or os.path.join(workdir, "optimization_results.csv")
+    run_root = os.path.join(workdir, "runs")
+    os.makedirs(run_root, exist_ok=True)
+    names = list(bounds)
+    fidelity = None
+    if coarsen > 1:
+        coarse = coarse_grid(grid_file, coarsen, material_file)
+        grid_file, fidelity = coarse["grid_file"], coarse["fidelity"]
+    trial_load, trial_material, output_report = load_file, material_file, None
+    if slim:
+        slimmed = slim_outputs(load_file, material_file, "stress_strain", grid_file=grid_file, output_dir=run_root)
+        trial_load, trial_material, output_report = slimmed["load_file"], slimmed["material_file"], slimmed["report"]
+    own_backend = backend is None
+    backend = backend or LocalBackend(workers)
+    own_store = store is not None and not isinstance(store, StudyStore)
+    store = StudyStore(store) if own_store else store
+    planner = StepPlanner([tuple(bounds[n]) for n in names], names) if adaptive_steps else None
+    try:
+        memory = FailureMemory([tuple(bounds[n]) for n in names])
+        objective = SlipParameterObjective(trial_material, trial_load, grid_file, experimental_file,
+                                           names, log_file, backend, memory=memory, timeout=timeout,
+                                           store=store, study=study, planner=planner)
+        if store is not None:
+            memory.seed(store, names, study, objective.template)
+            if planner is not None:
+                planner.seed(store, study, objective.template)
+        x, fun, evaluations, utilization = run_differential_evolution(
+            objective, [tuple(bounds[n]) for n in names], maxiter, popsize, tol, seed, backend, asynchronous)
+    finally:
+        if own_backend:
+            backend.close()
+        if own_store:
+            store.close()
+    best = dict(zip(names, (float(v) for v in x)))
+    return {
+        "best_parameters": best,
+        "best_mape": float(fun),
+        "evaluations": int(evaluations),
+        "best_material_file": update_material_properties(material_file, best),
+        "log_file": log_file,
+        "best_curve": objective.best[2],
+        "output_report": output_report,
+        "failures": memory.summary(),
+        "utilization": utilization,
+        "stepping": planner.summary() if planner is not None else None,
+        "grid_fidelity": fidelity,
+    }
+
+
+def fit_load_orientation(load_file: str, grid_file: str, material_file: str, target_quaternion: list,
+                         bounds: list = None, method: str = "L-BFGS-B", maxiter: int = 50,
+                         workers: int = 1, seed: int = None, log_file: str = None,
+                         slim: bool = True, backend: ExecutionBackend = None,
+                         timeout: float = None) -> dict:
+    """
+    Fit the dot_F components F12, F13, F23 so that the final simulated orientation
+    matches a target quaternion.
+
+    Parameters:
+    - load_file, grid_file, material_file (str): DAMASK input files.
+    - target_quaternion (list): Target orientation [w, x, y, z].
+    - bounds (list): [(low, high)] * 3 for F12, F13, F23 (default +-3e-3).
+    - method (str): 'L-BFGS-B' (local, from zero), 'differential_evolution' (global, parallel) or
+      'surrogate' (inverse design on a model of the runs, maxiter rounds; see damask_inverse).
+    - log_file (str): CSV receiving every trial (default: optimization_results.csv next to the load file).
+    - slim (bool): Let trial runs write only O at the end of each load step (see damask_outputs.slim_outputs).
+    - backend (ExecutionBackend): Where trials run (default: LocalBackend(workers)); see damask_backends.
+    - timeout (float): Wall-time limit per solver run in seconds.
+
+    Returns:
+    - dict: best (F12, F13, F23), deviation angle, number of evaluations, best load file, the log
+      and a summary of failures.
+    """
+    if method == "surrogate":
+        from damask_inverse import fit_orientation_surrogate
+        return fit_orientation_surrogate(load_file, grid_file, material_file, target_quaternion, bounds=bounds,
+                                         rounds=maxiter, workers=workers, seed=seed, log_file=log_file, slim=slim,
+                                         backend=backend, timeout=timeout)
+    workdir = os.path.dirname(os.path.abspath(load_file))
+    log_file = log_file or os.path.join(workdir, "optimization_results.csv")
+    run_root = os.path.join(workdir, "runs")
+    os.makedirs(run_root, exist_ok=True)
+    bounds = [tuple(b) for b in (bounds or [(-3e-3, 3e-3)] * 3)]
+    trial_load, trial_material, output_report = load_file, material_file, None
+    if slim:
+        slimmed = slim_outputs(load_file, material_file, "orientation", grid_file=grid_file, output_dir=run_root)
+        trial_load, trial_material, output_report = slimmed["load_file"], slimmed["material_file"], slimmed["report"]
+    own_backend = backend is None
+    backend = backend or LocalBackend(workers)
+    try:
+        memory = FailureMemory(bounds)
+        objective = LoadOrientationObjective(trial_load, grid_file, trial_material, target_quaternion,
+                                             log_file, backend, memory=memory, timeout=timeout)
+        if method == "differential_evolution":
+            result = differential_evolution(objective, bounds, maxiter=maxiter, seed=seed,
+                                            workers=batch_map(objective), updating="deferred", polish=False)
+        else:
+            result = minimize(objective, np.zeros(3), bounds=bounds, method=method, options={"maxiter": maxiter})
+    finally:
+        if own_backend:
+            backend.close()
+    F12, F13, F23 = (float(v) for v in result.x)
+    return {
+        "best_F": {"F12": F12, "F13": F13, "F23": F23},
+        "deviation_angle": float(result.fun),
+        "evaluations": int(result.nfev),
+        "best_load_file": update_load(load_file, F12, F13, F23),
+        "log_file": log_file,
+        "output_report": output_report,
+        "failures": memory.summary(),
+    }
+
+
+def calibrate_experiments(material_file: str, experiments: list, bounds: dict, maxiter: int = 20,
+                          popsize: int = 10, tol: float = 0.01, workers: int = 1, seed: int = None,
+                          log_file: str = None, slim: bool = True, backend: ExecutionBackend = None,
+                          store=None, study: str = "joint", timeout: float = None,
+                          asynchronous: bool = False, adaptive_steps: bool = False, coarsen: float = 1) -> dict:
+    """
+    Fit one set of slip parameters to several experiments at once with differential evolution.
+
+    Parameters:
+    - material_file (str): Material YAML template shared by all experiments.
+    - experiments (list): Dicts with 'name', 'load_file', 'grid_file', optional 'weight' and
+      'tolerance', and either 'experimental_file' or 'target_quaternion' (see MultiExperimentObjective).
+    - bounds (dict): Parameter name -> (low, high); stresses in MPa.
+    - maxiter, popsize, tol, seed: Passed to scipy.optimize.differential_evolution.
+    - workers (int): Parallel solver runs when no backend is given.
+    - log_file (str): CSV with per-case and joint errors (default: joint_results.csv next to the material file).
+    - slim (bool): Write only the fields/increments the cases read (see damask_outputs).
+    - backend (ExecutionBackend): Where runs execute (default: LocalBackend(workers)).
+    - store (StudyStore | str): Optional result cache; finished (vector, case) runs are reused and
+      failed runs of earlier studies seed the failure memory.
+    - timeout (float): Wall-time limit per solver run in seconds.
+    - asynchronous (bool): Steady-state DE without generation barriers (see damask_async).
+    - adaptive_steps (bool): Choose the increments of every run from the convergence of nearby
+      runs of the same case, stored and current (see damask_stepping).
+    - coarsen (float): Run every case on a grid with this many times fewer cells per axis
+      (see damask_coarsen); the result reports the fidelity per case.
+
+    Returns:
+    - dict: best parameters, best joint error, per-case errors at the optimum, evaluations,
+      best material file, the log, a summary of failures, the utilization report
+      (asynchronous runs only), the increments planned and converged at (adaptive_steps only)
+      and the grid fidelity per case (coarsen only).
+    """
+    workdir = os.path.dirname(os.path.abspath(material_file))
+    log_file = log_file or os.path.join(workdir, "joint_results.csv")
+    names = list(bounds)
+    fidelity = None
+    if coarsen > 1:
+        experiments = [dict(e) for e in experiments]
+        fidelity = {}
+        for i, experiment in enumerate(experiments):
+            coarse = coarse_grid(experiment["grid_file"], coarsen, material_file)
+            experiment["grid_file"] = coarse["grid_file"]
+            fidelity[experiment.get("name") or f"case{i}"] = coarse["fidelity"]
+    own_backend = backend is None
+    backend = backend or LocalBackend(workers)
+    own_store = store is not None and not isinstance(store, StudyStore)
+    store = StudyStore(store) if own_store else store
+    planner = StepPlanner([tuple(bounds[n]) for n in names], names) if adaptive_steps else None
+    try:
+        memory = FailureMemory([tuple(bounds[n]) for n in names])
+        objective = MultiExperimentObjective(material_file, experiments, names, log_file, backend,
+                                             store, study, slim=slim, memory=memory, timeout=timeout,
+                                             planner=planner)
+        if store is not None:
+            memory.seed(store, names, study, objective.templates)
+            if planner is not None:
+                planner.seed(store, study, objective.templates)
+        x, fun, evaluations, utilization = run_differential_evolution(
+            objective, [tuple(bounds[n]) for n in names], maxiter, popsize, tol, seed, backend, asynchronous)
+    finally:
+        if own_backend:
+            backend.close()
+        if own_store:
+            store.close()
+
+    best = dict(zip(names, (float(v) for v in x)))
+    return {
+        "best_parameters": best,
+        "best_error": float(fun),
+        "case_errors": objective.best[2],
+        "evaluations": int(evaluations),
+        "best_material_file": update_material_properties(material_file, best),
+        "log_file": log_file,
+        "failures": memory.summary(),
+        "utilization": utilization,
+        "stepping": planner.summary() if planner is not None else None,
+        "grid_fidelity": fidelity,
+    }
@@ -0,0 +1,137 @@
+import os
+
+import damask
+import numpy as np
+
+from damask_grid import read_vti_header
+
+# Fields each objective reads from the result file (phase-level mechanical output).
+OBJECTIVE_OUTPUTS = {
+    'stress_strain': ['F', 'P'],
+    'orientation': ['O'],
+}
+
+# Components per material point of the standard mechanical outputs.
+FIELD_COMPONENTS = {'F': 9, 'P': 9, 'F_e': 9, 'F_p': 9, 'L_p': 9, 'O': 4}
+
+
+def written_increments(load: dict) -> int:
+    """Number of increments DAMASK writes for a load (increment 0 plus every f_out-th per step)."""
+    count = 1
+    for loadstep in load['loadstep']:
+        N = int(loadstep['discretization']['N'])
+        count += N // int(loadstep.get('f_out', 1))
+    return count
+
+
+def choose_f_out(N: int, samples: int) -> int:
+    """Largest divisor of N that still writes at least `samples` increments in the step."""
+    samples = max(1, min(int(samples), N))
+    return max(d for d in range(1, N // samples + 1) if N % d == 0)
+
+
+def _values_per_point(material: dict) -> int:
+    total = 0
+    for phase in material['phase'].values():
+        mechanical = phase.get('mechanical', {})
+        total += sum(FIELD_COMPONENTS.get(f, 9) for f in mechanical.get('output', []))
+        plastic = mechanical.get('plastic', {})
+        N_sl = int(np.sum(plastic.get('N_sl', [0])))
+        N_tw = int(np.sum(plastic.get('N_tw', [0])))
+        for f in plastic.get('output', []):
+            total += N_tw if f.endswith('_tw') else N_sl
+    return total
+
+
+def estimate_result_bytes(load: dict, material: dict, cells: int) -> int:
+    """Approximate size of the field data in the result file (float64)."""
+    return 8 * cells * _values_per_point(material) * written_increments(load)
+
+
+def slim_material(material: dict, objectives: list) -> dict:
+    """Limit the phase outputs of a material config in place to the fields the objectives read."""
+    fields = []
+    for objective in objectives:
+        fields += [f for f in OBJECTIVE_OUTPUTS[objective] if f not in fields]
+    for phase in material['phase'].values():
+        mechanical = phase['mechanical']
+        mechanical['output'] = list(fields)
+        mechanical.get('plastic', {}).pop('output', None)
+    return material
+
+
+def slim_load(load: dict, objective: str, samples: int = 50) -> dict:
+    """Set f_out of every load step in place so that the objective gets what it reads and no more."""
+    N_total = sum(int(step['discretization']['N']) for step in load['loadstep'])
+    for step in load['loadstep']:
+        N = int(step['discretization']['N'])
+        if objective == 'orientation':
+            step['f_out'] = N
+        else:
+            # Never write more often than the template already does.
+            step['f_out'] = max(int(step.get('f_out', 1)), choose_f_out(N, np.ceil(samples * N / N_total)))
+    return load
+
+
+def slim_outputs(load_file: str, material_file: str, objective: str = 'stress_strain',
+                 samples: int = 50, grid_file: str = None, output_dir: str = None) -> dict:
+    """
+    Rewrite load and material files to emit only what an objective consumes.
+
+    - 'stress_strain': phase output [F, P], no plastic output, and at most about `samples`
+      written increments spread over the load steps in proportion to their N.
+    - 'orientation': phase output [O], no plastic output, and only the final increment
+      of every load step.
+
+    Parameters:
+    - load_file, material_file (str): Templates to slim; copies are written with a '_slim' suffix.
+    - objective (str): Key of OBJECTIVE_OUTPUTS.
+    - samples (int): Target number of written increments for 'stress_strain'.
+    - grid_file (str): Optional .vti used to report absolute byte estimates.
+    - output_dir (str): Directory for the slimmed files (default: next to the templates).
+
+    Returns:
+    - dict: paths of the slimmed files and a report of written increments and bytes saved.
+    """
+    if objective not in OBJECTIVE_OUTPUTS:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {list(OBJECTIVE_OUTPUTS)}.")
+
+    load = damask.YAML.load(load_file)
+    material = damask.ConfigMaterial.load(material_file)
+    cells = int(np.prod(read_vti_header(grid_file)['cells'])) if grid_file else 1
+    before = {'increments': written_increments(load), 'bytes': estimate_result_bytes(load, material, cells)}
+
+    slim_material(material, [objective])
+    slim_load(load, objective, samples)
+
+    after = {'increments': written_increments(load), 'bytes': estimate_result_bytes(load, material, cells)}
+
+    def target(path):
+        stem, ext = os.path.splitext(os.path.basename(path))
+        return os.path.join(output_dir or os.path.dirname(os.path.abspath(path)), f"{stem}_slim{ext}")
+
+    load_path, material_path = target(load_file), target(material_file)
+    load.save(load_path)
+    material.save(material_path)
+
+    return {
+        'load_file': load_path,
+        'material_file': material_path,
+        'report': {
+            'objective': objective,
+            'fields': OBJECTIVE_OUTPUTS[objective],
+            'increments_before': before['increments'],
+            'increments_after': after['increments'],
+            'bytes_before': before['bytes'] if grid_file else None,
+            'bytes_after': after['bytes'] if grid_file else None,
+            'bytes_saved': before['bytes'] - after['bytes'] if grid_file else None,
+            'fraction_saved': 1 - after['bytes'] / before['bytes'] if before['bytes'] else 0.0,
+        },
+    }
+
+
+def measured_savings(reference_file: str, slim_file: str) -> dict:
+    """Compare the on-disk size of a full and a slimmed result file."""
+    before, after = os.path.getsize(reference_file), os.path.getsize(slim_file)
+    return {'bytes_before': before, 'bytes_after': after, 'bytes_saved': before - after,
+            'fraction_saved': 1 - after / before if before else 0.0}
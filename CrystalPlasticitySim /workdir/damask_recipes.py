@@ -0,0 +1,270 @@
+"""
+Calibration recipes driven by study files.
+
+A study file (YAML or JSON) names a recipe and gives the arguments of its function.
+Paths are relative to the study file:
+
+    recipe: slip
+    material_file: Ni3Al17-A1-material.yaml
+    load_file: Ni3Al17-A1-load.yaml
+    grid_file: Ni3Al17-A1-grid.vti
+    experimental_file: Ni3Al17-A1-strain-stress-data.txt
+    bounds: {xi_0_sl: [27, 90], xi_inf_sl: [1000, 5000], h_0_sl-sl: [100, 500]}
+    maxiter: 20
+    asynchronous: true
+    backend: {kind: local, workers: 8}      # see damask_backends.make_backend
+    store: study.sqlite                     # result cache shared by reruns and other studies
+
+Recipes (RECIPES):
+- 'slip': slip parameters against a stress-strain curve (calibrate_slip_parameters).
+- 'orientation': F12, F13, F23 against a target orientation (fit_load_orientation).
+- 'joint': one parameter set against several experiments (calibrate_experiments).
+- 'sweep': a design of experiments over the parameters (damask_sweep.run_sweep).
+- 'uq': confidence intervals and curve bands of calibrated slip parameters (damask_uq.run_uq).
+
+run_study() runs a recipe on the project's backends, result store and failure memory. It
+writes everything to output_dir (default: a directory named after the study file): the
+trial log of the run, result.json (the result and the resolved study), and with `plot` (default on)
+<column>_trace.png (every trial and the best so far), for 'slip' fit_curve.png and for 'uq'
+curve_band.png.
+"""
+import inspect
+import json
+import os
+
+import damask
+import numpy as np
+
+from damask_backends import make_backend
+from damask_optimize import calibrate_experiments, calibrate_slip_parameters, fit_load_orientation
+from damask_results import read_experimental_data
+from damask_sweep import run_sweep
+from damask_uq import plot_band, run_uq
+
+RECIPES = {
+    'slip': {
+        'function': calibrate_slip_parameters,
+        'required': ('material_file', 'load_file', 'grid_file', 'experimental_file', 'bounds'),
+        'log': 'optimization_results.csv',
+        'trace': 'mape',
+        'description': "Slip parameters against an experimental stress-strain curve (differential evolution, MAPE).",
+    },
+    'orientation': {
+        'function': fit_load_orientation,
+        'required': ('load_file', 'grid_file', 'material_file', 'target_quaternion'),
+        'log': 'optimization_results.csv',
+        'trace': 'deviation_angle',
+        'description': "F12, F13, F23 of the load against a target orientation (deviation angle).",
+    },
+    'joint': {
+        'function': calibrate_experiments,
+        'required': ('material_file', 'experiments', 'bounds'),
+        'log': 'joint_results.csv',
+        'trace': 'joint_error',
+        'description': "One parameter set against several stress-strain and orientation experiments.",
+    },
+    'sweep': {
+        'function': run_sweep,
+        'required': ('bounds', 'load_file', 'material_file', 'grid_file'),
+        'log': None,
+        'trace': None,
+        'description': "Design of experiments (factorial, Latin hypercube or Sobol) with a result table.",
+    },
+    'uq': {
+        'function': run_uq,
+        'required': ('material_file', 'load_file', 'grid_file', 'experimental_file', 'best'),
+        'log': None,
+        'trace': None,
+        'description': "Parameter confidence intervals and curve bands around a calibration (MCMC or bootstrap).",
+    },
+}
+
+# Study keys that are not arguments of the recipe functions.
+STUDY_KEYS = ('recipe', 'output_dir', 'backend', 'plot')
+
+
+def list_recipes() -> dict:
+    """Name -> description, required and optional study keys of every recipe."""
+    out = {}
+    for name, recipe in RECIPES.items():
+        parameters = inspect.signature(recipe['function']).parameters
+        out[name] = {'description': recipe['description'], 'required': list(recipe['required']),
+                     'optional': [p for p in parameters if p not in recipe['required'] and p != 'backend']
+                     + [k for k in STUDY_KEYS if k != 'recipe']}
+    return out
+
+
+def _is_path(key: str) -> bool:
+    return key.endswith('_file') or key in ('store', 'output', 'output_dir')
+
+
+def _resolve(config: dict, base: str) -> dict:
+    """Paths of a study (and of its experiments) relative to base made absolute."""
+    def path(key, value):
+        return os.path.normpath(os.path.join(base, os.path.expanduser(value))) \
+            if _is_path(key) and isinstance(value, str) else value
+
+    out = {k: path(k, v) for k, v in config.items()}
+    if isinstance(out.get('experiments'), list):
+        out['experiments'] = [{k: path(k, v) for k, v in e.items()} for e in out['experiments']]
+    return out
+
+
+def load_study(study_file: str) -> dict:
+    """Study of a YAML or JSON file with its paths made absolute."""
+    if study_file.endswith('.json'):
+        with open(study_file) as f:
+            config = json.load(f)
+    else:
+        config = dict(damask.YAML.load(study_file))
+    return _resolve(config, os.path.dirname(os.path.abspath(study_file)))
+
+
+def save_study(config: dict, study_file: str) -> str:
+    """Write a study to a YAML (or .json) file."""
+    config = json.loads(json.dumps(config, default=str))
+    if study_file.endswith('.json'):
+        with open(study_file, 'w') as f:
+            json.dump(config, f, indent=2)
+    else:
+        damask.YAML(config).save(study_file)
+    return os.path.abspath(study_file)
+
+
+def check_study(config: dict) -> dict:
+    """
+    Validate a (resolved) study: known recipe, required keys present, no unknown keys,
+    input files existing. Raises ValueError listing every problem.
+
+    Returns:
+    - dict: recipe name and the keyword arguments of its function (without the backend).
+    """
+    name = config.get('recipe')
+    if name not in RECIPES:
+        raise ValueError(f"Unknown recipe '{name}', expected one of {', '.join(RECIPES)}.")
+    recipe = RECIPES[name]
+    parameters = inspect.signature(recipe['function']).parameters
+    problems = [f"missing '{key}'" for key in recipe['required'] if config.get(key) is None]
+    problems += [f"unknown key '{key}'" for key in config if key not in parameters and key not in STUDY_KEYS]
+    files = [(k, v) for k, v in config.items() if k.endswith('_file') and k != 'log_file' and isinstance(v, str)]
+    for e in config.get('experiments') or []:
+        files += [(k, v) for k, v in e.items() if k.endswith('_file') and isinstance(v, str)]
+    problems += [f"{key} not found: {path}" for key, path in files if not os.path.exists(path)]
+    if problems:
+        raise ValueError(f"Study for recipe '{name}': " + "; ".join(problems) + ".")
+    return {'recipe': name, 'kwargs': {k: v for k, v in config.items() if k not in STUDY_KEYS}}
+
+
+def plot_trace(log_file: str, column: str, output_file: str) -> str:
+    """Save every trial's `column` of a trial log and the best so far against the trial number."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    values = pd.to_numeric(pd.read_csv(log_file)[column], errors='coerce').to_numpy(dtype=float)
+    values = np.where(np.isfinite(values), values, np.nan)
+    fig, ax = plt.subplots(figsize=(6, 4))
+    trials = np.arange(1, len(values) + 1)
+    ax.plot(trials, values, '.', alpha=0.5, label='trial')
+    ax.plot(trials, np.fmin.accumulate(np.where(np.isnan(values), np.inf, values)), '-', label='best so far')
+    ax.set_xlabel('trial')
+    ax.set_ylabel(column)
+    ax.set_yscale('log' if np.nanmin(values, initial=np.inf) > 0 else 'linear')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=120)
+    plt.close(fig)
+    return os.path.abspath(output_file)
+
+
+def plot_fit(curve: dict, experimental_file: str, output_file: str) -> str:
+    """Save the best simulated stress-strain curve over the experimental one."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    exp_strain, exp_stress = read_experimental_data(experimental_file)
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot(exp_strain, np.asarray(exp_stress) / 1e6, 'o', ms=3, label='experiment')
+    ax.plot(curve['strain'], np.asarray(curve['stress']) / 1e6, '-', label='best fit')
+    ax.set_xlabel('true strain')
+    ax.set_ylabel('true stress [MPa]')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=120)
+    plt.close(fig)
+    return os.path.abspath(output_file)
+
+
+def run_study(study_file: str = None, study: dict = None, overrides: dict = None, dry_run: bool = False) -> dict:
+    """
+    Run a recipe from a study file or a study dict (saved as <recipe>_study.yaml next to its
+    first input file, so it can be rerun).
+
+    Parameters:
+    - study_file (str): YAML/JSON study file.
+    - study (dict): Study given directly (absolute paths, or relative to the working directory).
+    - overrides (dict): Keys replacing those of the study for this run (e.g. {'maxiter': 5}).
+    - dry_run (bool): Only validate the study and return what would be run.
+
+    Returns:
+    - dict: the recipe's result plus study_file, output_dir, result_file and plots (dry_run:
+      recipe, study_file, output_dir and the function's keyword arguments).
+    """
+    if study_file is None:
+        if study is None:
+            raise ValueError("Give a study file or a study.")
+        study = _resolve(study, os.getcwd())
+        inputs = [v for k, v in study.items() if k.endswith('_file') and isinstance(v, str)] or \
+            [e['load_file'] for e in study.get('experiments') or []] or [os.getcwd()]
+        study_file = save_study(study, os.path.join(os.path.dirname(inputs[0]), f"{study.get('recipe')}_study.yaml"))
+    study_file = os.path.abspath(study_file)
+    config = load_study(study_file)
+    config.update(_resolve(overrides or {}, os.getcwd()))
+    checked = check_study(config)
+    recipe = RECIPES[checked['recipe']]
+    kwargs = checked['kwargs']
+
+    output_dir = config.get('output_dir') or os.path.splitext(study_file)[0]
+    if not dry_run:
+        os.makedirs(output_dir, exist_ok=True)
+    if recipe['log'] and 'log_file' not in kwargs:
+        kwargs['log_file'] = os.path.join(output_dir, recipe['log'])
+    if checked['recipe'] == 'sweep' and 'output' not in kwargs:
+        kwargs['output'] = os.path.join(output_dir, 'sweep.npz')
+    if checked['recipe'] == 'uq' and 'output' not in kwargs:
+        kwargs['output'] = os.path.join(output_dir, 'samples.npz')
+    if 'store' in inspect.signature(recipe['function']).parameters and 'store' not in kwargs:
+        kwargs['store'] = os.path.join(os.path.dirname(study_file), 'study.sqlite')
+    if dry_run:
+        return {'recipe': checked['recipe'], 'study_file': study_file, 'output_dir': os.path.abspath(output_dir),
+                'kwargs': kwargs, 'backend': config.get('backend')}
+
+    if kwargs.get('log_file') and os.path.exists(kwargs['log_file']):
+        # One log per run for the trace plot; the previous run's is kept beside it.
+        os.replace(kwargs['log_file'], f"{os.path.splitext(kwargs['log_file'])[0]}.previous.csv")
+    backend = make_backend(**config['backend']) if config.get('backend') else None
+    try:
+        result = recipe['function'](**kwargs, **({'backend': backend} if backend is not None else {}))
+    finally:
+        if backend is not None:
+            backend.close()
+
+    plots = {}
+    if config.get('plot', True):
+        log_file = kwargs.get('log_file')
+        if recipe['trace'] and log_file and os.path.exists(log_file) \
+                and recipe['trace'] in open(log_file).readline().strip().split(','):
+            plots['trace'] = plot_trace(log_file, recipe['trace'],
+                                        os.path.join(output_dir, f"{recipe['trace']}_trace.png"))
+        if result.get('best_curve'):
+            plots['fit'] = plot_fit(result['best_curve'], kwargs['experimental_file'],
+                                    os.path.join(output_dir, 'fit_curve.png'))
+        if result.get('band'):
+            plots['band'] = plot_band(result, kwargs['experimental_file'], os.path.join(output_dir, 'curve_band.png'))
+    result = dict(result, study_file=study_file, output_dir=os.path.abspath(output_dir), plots=plots,
+                  result_file=os.path.join(os.path.abspath(output_dir), 'result.json'))
+    with open(result['result_file'], 'w') as f:
+        json.dump({'recipe': checked['recipe'], 'study': config, 'result': result}, f, indent=2, default=str)
+    return result
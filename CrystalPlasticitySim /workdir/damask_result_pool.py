@@ -0,0 +1,130 @@
+"""
+Shared handles on DAMASK result files for repeated post-processing.
+
+damask.Result scans the whole file structure (increments, times, phase/homogenization
+labels of every cell, fields) when it is created, and the readers of damask_results
+walk every increment group to find the ones with F and P. Agents usually call several
+post-processing tools on the same file in a row, so ResultPool keeps, per file:
+
+- an index of the increments (names, numbers, times), phases, points per phase and the
+  mechanical outputs of every increment, read once with h5py;
+- a damask.Result, created on first use (use its view() copies, never change the
+  shared one).
+
+Entries are keyed on path, modification time and size, so a rewritten file (a new run
+under the same name, fields added by damask.Result.add_*, an archive repack) is indexed
+again on its next use. At most `max_entries` files are kept (least recently used first
+out).
+
+The pool does not keep HDF5 files open between calls: a held read handle locks the
+file against the solver writing a new run to the same name, and damask.Result opens the
+file with default locking for every query, which HDF5 refuses while a handle with other
+locking flags is open in the same process.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import damask
+import h5py
+
+
+def index_result(f: h5py.File) -> dict:
+    """Increments (names, numbers, times), phases, points per phase and mechanical outputs per increment."""
+    names = sorted((k for k in f.keys() if k.startswith('increment_')), key=lambda k: int(k.split('_')[1]))
+    mechanical = {}
+    for inc in names:
+        phases = f[inc].get('phase', {})
+        outputs = [set(phases[p]['mechanical'].keys()) for p in phases if 'mechanical' in phases[p]]
+        mechanical[inc] = set.intersection(*outputs) if outputs and len(outputs) == len(phases) else set()
+    phases = sorted(f[names[0]]['phase']) if names and 'phase' in f[names[0]] else []
+    points = {}
+    if 'cell_to' in f and 'phase' in f['cell_to']:
+        labels = f['cell_to/phase']['label'][:, 0].astype(str)
+        points = {p: int((labels == p).sum()) for p in phases}
+    return {
+        'names': names,
+        'increments': [int(inc.split('_')[1]) for inc in names],
+        'times': [float(f[inc].attrs['t/s']) if 't/s' in f[inc].attrs else None for inc in names],
+        'phases': phases,
+        'points': points,
+        'mechanical': mechanical,
+    }
+
+
+class _Entry:
+    def __init__(self, path: str, stamp: tuple):
+        self.path = path
+        self.stamp = stamp
+        with h5py.File(path, 'r') as f:
+            self.index = index_result(f)
+        self._result = None
+        self._lock = threading.Lock()
+
+    def result(self) -> damask.Result:
+        with self._lock:
+            if self._result is None:
+                self._result = damask.Result(self.path)
+            return self._result
+
+
+class ResultPool:
+    """
+    Thread-safe cache of result-file indexes and damask.Result objects.
+
+    - max_entries (int): Files kept; the least recently used one is dropped beyond that.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _get(self, path: str) -> _Entry:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return entry
+            self.stats['misses'] += 1
+        # Indexed outside the lock; two threads racing on one new file both index it, the last one is kept.
+        entry = _Entry(path, stamp)
+        with self.lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return entry
+
+    def index(self, path: str) -> dict:
+        """Index of a result file (see index_result); shared, do not modify."""
+        return self._get(path).index
+
+    def result(self, path: str) -> damask.Result:
+        """damask.Result of a result file; shared, take view() copies instead of changing its view."""
+        return self._get(path).result()
+
+    def release(self, path: str):
+        """Drop the entry of a file (e.g. before it is deleted)."""
+        with self.lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self.lock:
+            self._entries.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def summary(self) -> dict:
+        """Hits, misses and evictions so far, entries kept and the bound."""
+        with self.lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+RESULT_POOL = ResultPool()
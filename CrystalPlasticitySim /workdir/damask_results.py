@@ -1,7 +1,39 @@
 import numpy as np
 import damask
+import h5py
 import json
 
+import damask_rotations
+from damask_result_pool import RESULT_POOL
+
+# Memory budget of reduce_simulation_results for the F and P data read at once (bytes).
+REDUCE_BATCH_BYTES = 256 * 2**20
+
+def deviation_angle(simulated_file: str, experimental_quaternion: list) -> dict:
+    """
+    Deviation angle between the final simulated orientation and an experimental quaternion.
+
+    Parameters:
+    - simulated_file (str): Path to the DAMASK result (HDF5) file.
+    - experimental_quaternion (list): Experimental quaternion [w, x, y, z].
+
+    Returns:
+    - dict: 'deviation_angle' (degrees) and 'simulated_quaternion'.
+    """
+    # Load results from the simulated file (structure scanned once per file version)
+    r_last = RESULT_POOL.result(simulated_file).view(increments=-1)
+    quaternion_simulated = r_last.get('O')[0]  # Extract the last quaternion orientation
+
+    # Convert quaternions to rotation matrices
+    R_simulated = quaternion_to_rotation_matrix(quaternion_simulated)
+    R_experimental = quaternion_to_rotation_matrix(experimental_quaternion)
+
+    return {
+        "deviation_angle": deviation_angle_between_rotations(R_simulated, R_experimental),
+        "simulated_quaternion": quaternion_simulated
+    }
+
+
 def calculate_deviation_angle(json_input: str) -> dict:
     """
     Calculate the deviation angle between simulated and experimental orientations.
@@ -13,25 +45,7 @@ def calculate_deviation_angle(json_input: str) -> dict:
     try:
         # Parse JSON input
         params = json.loads(json_input)
-        simulated_file = params["simulated_file"]
-        experimental_quaternion = params["experimental_quaternion"]
-
-        # Load results from the simulated file
-        r = damask.Result(simulated_file)
-        r_last = r.view(increments=-1)
-        quaternion_simulated = r_last.get('O')[0]  # Extract the last quaternion orientation
-
-        # Convert quaternions to rotation matrices
-        R_simulated = quaternion_to_rotation_matrix(quaternion_simulated)
-        R_experimental = quaternion_to_rotation_matrix(experimental_quaternion)
-
-        # Compute the deviation angle
-        deviation_angle = deviation_angle_between_rotations(R_simulated, R_experimental)
-
-        return {
-            "deviation_angle": deviation_angle,
-            "simulated_quaternion": quaternion_simulated
-        }
+        return deviation_angle(params["simulated_file"], params["experimental_quaternion"])
     except KeyError as e:
         return {"error": f"Missing required key in JSON input: {e}"}
     except Exception as e:
@@ -39,63 +53,170 @@ def calculate_deviation_angle(json_input: str) -> dict:
 
 def quaternion_to_rotation_matrix(q: list) -> np.ndarray:
     """
-    Convert a quaternion to a 3x3 rotation matrix.
+    Convert a quaternion to a 3x3 rotation matrix (or (..., 4) quaternions to (..., 3, 3) matrices).
     """
-    w, x, y, z = q
-    R = np.array([
-        [1 - 2 * (y**2 + z**2), 2 * (x * y - z * w), 2 * (x * z + y * w)],
-        [2 * (x * y + z * w), 1 - 2 * (x**2 + z**2), 2 * (y * z - x * w)],
-        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x**2 + y**2)]
-    ])
-    return R
+    return damask_rotations.to_matrix(q)
 
 def deviation_angle_between_rotations(R1: np.ndarray, R2: np.ndarray) -> float:
     """
-    Compute the deviation angle between two rotation matrices.
+    Compute the deviation angle (degrees) between two rotation matrices, or between stacks of them.
+    """
+    return damask_rotations.matrix_angle(R1, R2)
+
+
+def orientation_deviation(hdf5_file: str, target_quaternion: list, increments=None, symmetry: str = None) -> dict:
     """
-    R_relative = np.dot(R1.T, R2)
-    trace = np.trace(R_relative)
-    
-    # Ensure the trace is within the valid range for arccos
-    trace = max(min(trace, 3), -1)
+    Deviation of every material point's orientation from a target, per increment.
 
-    # Compute the deviation angle
-    angle = np.arccos((trace - 1) / 2)
-    return np.degrees(angle)
+    Parameters:
+    - hdf5_file (str): DAMASK result file with the phase output O.
+    - target_quaternion (list): Target orientation [w, x, y, z].
+    - increments: Increment numbers (default: all written increments).
+    - symmetry (str): 'cubic' or 'hexagonal' to reduce by crystal symmetry (default: none,
+      as in deviation_angle).
+
+    Returns:
+    - dict: increments and the mean, median and max deviation angle (degrees) per increment.
+    """
+    names = RESULT_POOL.index(hdf5_file)['names']
+    with h5py.File(hdf5_file, 'r') as f:
+        if increments is not None:
+            wanted = {f"increment_{i}" for i in increments}
+            names = [inc for inc in names if inc in wanted]
+        O = np.stack([np.concatenate([f[inc]['phase'][p]['mechanical']['O'][()] for p in f[inc]['phase']])
+                      for inc in names])
+    angles = damask_rotations.misorientation_angle(O, target_quaternion, symmetry)
+    return {
+        'increments': [int(inc.split('_')[1]) for inc in names],
+        'mean': angles.mean(axis=1).tolist(),
+        'median': np.median(angles, axis=1).tolist(),
+        'max': angles.max(axis=1).tolist(),
+    }
 
 
 def read_experimental_data(file_path):
         data = np.loadtxt(file_path, skiprows=1)
-        true_strain = data[:, 1] 
+        true_strain = data[:, 1]
         true_stress = data[:, 0]
         return true_strain, true_stress
 
 
 def extract_simulation_results(hdf5_file):
-    r = damask.Result(hdf5_file)
-    try:
-        r.add_stress_Cauchy(P='P', F='F')
-        r.add_strain(F='F', t='V', m=0.0)
-    except Exception as e:
-        print(f"stress and strain is exist in the file")
-    # Extract the true strain and stress values
+    outputs = ['epsilon_V^0.0(F)', 'sigma']
+    index = RESULT_POOL.index(hdf5_file)
+    present = set.intersection(*(index['mechanical'][inc] for inc in index['names'])) if index['names'] else set()
+    # Missing fields are written into the file once; the pool then indexes the changed file again.
+    if 'sigma' not in present:
+        RESULT_POOL.result(hdf5_file).add_stress_Cauchy(P='P', F='F')
+    if 'epsilon_V^0.0(F)' not in present:
+        RESULT_POOL.result(hdf5_file).add_strain(F='F', t='V', m=0.0)
+    r = RESULT_POOL.result(hdf5_file)
+    # Extract the true strain and stress values of all increments in one read
 
     strain_xx = []
     stress_xx = []
 
+    data = r.get(outputs, flatten=False) or {}
     for increment in r.increments:
-        r_view = r.view(increments=[increment])
-        true_strain = r_view.get('epsilon_V^0.0(F)')
-        true_stress = r_view.get('sigma')
-        
-        if true_strain is None or true_stress is None:
+        values = {out: [] for out in outputs}
+        for phase in data.get(increment, {}).get('phase', {}).values():
+            for out in outputs:
+                values[out] += [field[out] for field in phase.values() if out in field]
+        if not all(values.values()):
             print(f"Missing data in increment {increment}")
             continue
-        
-        strain_xx.append(np.mean(true_strain[..., 0, 0]))
-        stress_xx.append(np.mean(true_stress[..., 0, 0]))
+
+        strain_xx.append(np.mean(np.concatenate(values['epsilon_V^0.0(F)'])[..., 0, 0]))
+        stress_xx.append(np.mean(np.concatenate(values['sigma'])[..., 0, 0]))
 
     if not strain_xx or not stress_xx:
         raise ValueError("No valid strain or stress data extracted.")
 
-    return np.array(strain_xx), np.array(stress_xx)
\ No newline at end of file
+    return np.array(strain_xx), np.array(stress_xx)
+
+
+def _xx_response(F: np.ndarray, P_x: np.ndarray):
+    """
+    sigma_xx and (ln V)_xx of deformation gradients F (..., 3, 3) and first rows P_x (..., 3)
+    of the first Piola-Kirchhoff stress; equal to the xx components of damask.mechanics
+    stress_Cauchy(P, F) and strain(F, 'V', 0.0).
+    """
+    stress = np.einsum('...k,...k', P_x, F[..., 0, :]) / np.linalg.det(F)
+    w, n = np.linalg.eigh(np.einsum('...ik,...jk', F, F))
+    strain = 0.5 * np.einsum('...j,...j', np.log(w), n[..., 0, :] ** 2)
+    return strain, stress
+
+
+def reduce_simulation_results(hdf5_file, average: str = 'points', batch_bytes: int = REDUCE_BATCH_BYTES):
+    """
+    Volume-averaged true strain and Cauchy stress (xx) per increment, computed from F and P
+    without writing derived fields into the result file.
+
+    Parameters:
+    - hdf5_file (str): DAMASK result file with phase outputs F and P.
+    - average (str): 'points' averages the per-point sigma_xx and (ln V)_xx (the result of
+      extract_simulation_results); 'fields' takes sigma and ln V of the volume-averaged F
+      and P (the homogenized response, cheaper for large grids).
+    - batch_bytes (int): Memory budget for the increments read and processed at once.
+
+    Returns:
+    - (strain, stress): arrays over the increments that have F and P.
+    """
+    if average not in ('points', 'fields'):
+        raise ValueError(f"Unknown average '{average}', expected 'points' or 'fields'.")
+    strain_xx, stress_xx = [], []
+    index = RESULT_POOL.index(hdf5_file)
+    increments = [inc for inc in index['names'] if {'F', 'P'} <= index['mechanical'][inc]]
+    if not increments:
+        raise ValueError("No valid strain or stress data extracted.")
+    with h5py.File(hdf5_file, 'r') as f:
+        phases = list(f[increments[0]]['phase'])
+        points = sum(len(f[increments[0]]['phase'][p]['mechanical']['F']) for p in phases)
+        batch = max(1, int(batch_bytes // (8 * 12 * points)))
+        for start in range(0, len(increments), batch):
+            chunk = increments[start:start + batch]
+            # (increments, points, ...) with all phases concatenated; every cell has the same volume.
+            F = np.stack([np.concatenate([f[inc]['phase'][p]['mechanical']['F'][()] for p in phases]) for inc in chunk])
+            P_x = np.stack([np.concatenate([f[inc]['phase'][p]['mechanical']['P'][:, 0, :] for p in phases])
+                            for inc in chunk])
+            if average == 'fields':
+                strain, stress = _xx_response(F.mean(axis=1), P_x.mean(axis=1))
+            else:
+                strain, stress = (v.mean(axis=1) for v in _xx_response(F, P_x))
+            strain_xx += strain.tolist()
+            stress_xx += stress.tolist()
+    return np.array(strain_xx), np.array(stress_xx)
+
+
+def curve_error(exp_strain, exp_stress, sim_strain, sim_stress, metric: str = "mape") -> float:
+    """
+    Error between experimental and simulated stress-strain curves.
+
+    The simulated curve is interpolated at the experimental strains that lie within
+    the simulated strain range. metric is 'mape' (fraction, 0.01 = 1%) or 'mse' (Pa^2).
+    """
+    order = np.argsort(sim_strain)
+    sim_strain, sim_stress = np.asarray(sim_strain)[order], np.asarray(sim_stress)[order]
+    mask = (exp_strain >= sim_strain[0]) & (exp_strain <= sim_strain[-1]) & (exp_stress != 0)
+    if not np.any(mask):
+        raise ValueError("Experimental and simulated strain ranges do not overlap.")
+    predicted = np.interp(exp_strain[mask], sim_strain, sim_stress)
+    if metric == "mape":
+        return float(np.mean(np.abs((predicted - exp_stress[mask]) / exp_stress[mask])))
+    if metric == "mse":
+        return float(np.mean((predicted - exp_stress[mask]) ** 2))
+    raise ValueError(f"Unknown metric '{metric}'.")
+
+
+def calculate_mape(experimental_file, hdf5_file):
+    """Mean absolute percentage error (fraction) of the simulated xx stress-strain curve."""
+    exp_strain, exp_stress = read_experimental_data(experimental_file)
+    sim_strain, sim_stress = reduce_simulation_results(hdf5_file)
+    return curve_error(exp_strain, exp_stress, sim_strain, sim_stress, metric="mape")
+
+
+def calculate_mse(experimental_file, hdf5_file):
+    """Mean squared error (Pa^2) of the simulated xx stress-strain curve."""
+    exp_strain, exp_stress = read_experimental_data(experimental_file)
+    sim_strain, sim_stress = reduce_simulation_results(hdf5_file)
+    return curve_error(exp_strain, exp_stress, sim_strain, sim_stress, metric="mse")
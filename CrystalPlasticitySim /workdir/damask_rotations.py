@@ -0,0 +1,168 @@
+"""
+Array-first rotation utilities.
+
+Quaternions are [w, x, y, z] in the last axis of an array of any leading shape (a single
+quaternion is shape (4,), N of them (N, 4), points x increments (I, N, 4)); all functions
+broadcast. The matrix convention is that of damask_results.quaternion_to_rotation_matrix
+(R = to_matrix(q) rotates vectors by q, Hamilton product), so angles agree with the
+existing objectives. Crystal symmetry is optional: misorientation angles are then the
+minimum over the symmetry operators of SYMMETRIES.
+
+The symmetry-reduced misorientation uses a numba kernel when numba is installed and
+falls back to numpy otherwise.
+"""
+import math
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+_C = np.sqrt(0.5)
+
+SYMMETRIES = {
+    'cubic': np.array([
+        [1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1],
+        [_C, _C, 0, 0], [_C, -_C, 0, 0], [_C, 0, _C, 0], [_C, 0, -_C, 0], [_C, 0, 0, _C], [_C, 0, 0, -_C],
+        [0, _C, _C, 0], [0, _C, -_C, 0], [0, _C, 0, _C], [0, _C, 0, -_C], [0, 0, _C, _C], [0, 0, _C, -_C],
+        [.5, .5, .5, .5], [.5, .5, .5, -.5], [.5, .5, -.5, .5], [.5, .5, -.5, -.5],
+        [.5, -.5, .5, .5], [.5, -.5, .5, -.5], [.5, -.5, -.5, .5], [.5, -.5, -.5, -.5],
+    ]),
+    'hexagonal': np.array(
+        [[np.cos(k * np.pi / 6), 0, 0, np.sin(k * np.pi / 6)] for k in range(6)]
+        + [[0, np.cos(k * np.pi / 6), np.sin(k * np.pi / 6), 0] for k in range(6)]),
+}
+
+
+def normalize(q) -> np.ndarray:
+    """Unit quaternions with w >= 0."""
+    q = np.asarray(q, dtype=float)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    return np.where(q[..., :1] < 0, -q, q)
+
+
+def conjugate(q) -> np.ndarray:
+    return np.asarray(q, dtype=float) * [1, -1, -1, -1]
+
+
+def multiply(p, q) -> np.ndarray:
+    """Hamilton product p * q (rotation q followed by p)."""
+    p, q = np.asarray(p, dtype=float), np.asarray(q, dtype=float)
+    pw, px, py, pz = np.moveaxis(p, -1, 0)
+    qw, qx, qy, qz = np.moveaxis(q, -1, 0)
+    return np.stack([
+        pw * qw - px * qx - py * qy - pz * qz,
+        pw * qx + px * qw + py * qz - pz * qy,
+        pw * qy - px * qz + py * qw + pz * qx,
+        pw * qz + px * qy - py * qx + pz * qw,
+    ], axis=-1)
+
+
+def to_matrix(q) -> np.ndarray:
+    """Rotation matrices (..., 3, 3) of quaternions (..., 4)."""
+    w, x, y, z = np.moveaxis(np.asarray(q, dtype=float), -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y ** 2 + z ** 2), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=-1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x ** 2 + z ** 2), 2 * (y * z - x * w)], axis=-1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x ** 2 + y ** 2)], axis=-1),
+    ], axis=-2)
+
+
+def from_matrix(R) -> np.ndarray:
+    """Unit quaternions (..., 4) with w >= 0 of rotation matrices (..., 3, 3)."""
+    R = np.asarray(R, dtype=float)
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = np.moveaxis(R, (-2, -1), (0, 1))
+    # Row k is 4 q_k q; the row with the largest diagonal term is the best conditioned.
+    candidates = np.stack([
+        np.stack([1 + m00 + m11 + m22, m21 - m12, m02 - m20, m10 - m01], axis=-1),
+        np.stack([m21 - m12, 1 + m00 - m11 - m22, m01 + m10, m02 + m20], axis=-1),
+        np.stack([m02 - m20, m01 + m10, 1 - m00 + m11 - m22, m12 + m21], axis=-1),
+        np.stack([m10 - m01, m02 + m20, m12 + m21, 1 - m00 - m11 + m22], axis=-1),
+    ], axis=-2)
+    diagonal = np.diagonal(candidates, axis1=-2, axis2=-1)
+    best = np.argmax(diagonal, axis=-1)[..., None, None]
+    return normalize(np.take_along_axis(candidates, best, axis=-2)[..., 0, :])
+
+
+def from_axis_angle(axis, angle) -> np.ndarray:
+    """Quaternions of rotations by angle (radians) about axis (..., 3)."""
+    axis = np.asarray(axis, dtype=float)
+    axis = axis / np.linalg.norm(axis, axis=-1, keepdims=True)
+    half = 0.5 * np.asarray(angle, dtype=float)[..., None]
+    return np.concatenate([np.cos(half), np.sin(half) * axis], axis=-1)
+
+
+def to_axis_angle(q):
+    """
+    Returns:
+    - (axis, angle): unit axes (..., 3) and angles in [0, pi] (radians); the axis of the
+      identity is [0, 0, 1].
+    """
+    q = normalize(q)
+    norm = np.linalg.norm(q[..., 1:], axis=-1)
+    angle = 2 * np.arctan2(norm, q[..., 0])
+    axis = np.where(norm[..., None] > 1e-12, q[..., 1:] / np.where(norm > 1e-12, norm, 1)[..., None], [0, 0, 1])
+    return axis, angle
+
+
+def rotation_angle(q) -> np.ndarray:
+    """Rotation angles in degrees, in [0, 180]."""
+    q = np.asarray(q, dtype=float)
+    return np.degrees(2 * np.arctan2(np.linalg.norm(q[..., 1:], axis=-1), np.abs(q[..., 0])))
+
+
+def _misorientation_numpy(q1, q2, operators):
+    delta = multiply(conjugate(q1), q2)
+    # |w| of delta * s for every operator s; the largest gives the smallest angle.
+    w = np.abs(np.einsum('...k,sk->...s', delta * [1, -1, -1, -1], operators)).max(axis=-1)
+    norm2 = np.einsum('...k,...k', delta, delta)
+    return np.degrees(2 * np.arctan2(np.sqrt(np.clip(norm2 - w ** 2, 0, None)), w))
+
+
+if numba is not None:
+    @numba.njit(cache=True, parallel=True)
+    def _misorientation_kernel(q1, q2, operators):
+        n = q1.shape[0]
+        out = np.empty(n)
+        for i in numba.prange(n):
+            aw, ax, ay, az = q1[i, 0], -q1[i, 1], -q1[i, 2], -q1[i, 3]
+            bw, bx, by, bz = q2[i, 0], q2[i, 1], q2[i, 2], q2[i, 3]
+            dw = aw * bw - ax * bx - ay * by - az * bz
+            dx = aw * bx + ax * bw + ay * bz - az * by
+            dy = aw * by - ax * bz + ay * bw + az * bx
+            dz = aw * bz + ax * by - ay * bx + az * bw
+            best = 0.0
+            for s in range(operators.shape[0]):
+                w = abs(dw * operators[s, 0] - dx * operators[s, 1] - dy * operators[s, 2] - dz * operators[s, 3])
+                if w > best:
+                    best = w
+            norm2 = dw * dw + dx * dx + dy * dy + dz * dz
+            if norm2 != norm2:
+                out[i] = np.nan
+                continue
+            out[i] = 360.0 / math.pi * math.atan2(math.sqrt(max(norm2 - best * best, 0.0)), best)
+        return out
+
+
+def misorientation_angle(q1, q2, symmetry: str = None) -> np.ndarray:
+    """
+    Angles in degrees between orientations q1 and q2 (broadcast against each other, e.g.
+    (N, 4) against a target (4,)). With symmetry ('cubic' or 'hexagonal') the smallest
+    angle over the crystallographically equivalent orientations is returned.
+    """
+    q1, q2 = np.broadcast_arrays(np.asarray(q1, dtype=float), np.asarray(q2, dtype=float))
+    operators = np.array([[1.0, 0, 0, 0]]) if symmetry is None else SYMMETRIES[symmetry]
+    if numba is not None and symmetry is not None:
+        shape = q1.shape[:-1]
+        flat = _misorientation_kernel(np.ascontiguousarray(q1.reshape(-1, 4)),
+                                      np.ascontiguousarray(q2.reshape(-1, 4)), operators)
+        return flat.reshape(shape)
+    return _misorientation_numpy(q1, q2, operators)
+
+
+def matrix_angle(R1, R2) -> np.ndarray:
+    """Angles in degrees of R1^T R2 for rotation matrices (..., 3, 3)."""
+    trace = np.einsum('...ji,...ji->...', np.asarray(R1, dtype=float), np.asarray(R2, dtype=float))
+    return np.degrees(np.arccos(np.clip((trace - 1) / 2, -1, 1)))
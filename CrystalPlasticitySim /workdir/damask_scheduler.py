@@ -0,0 +1,226 @@
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+
+import damask
+
+from damask_grid import read_vti_header
+from damask_simulation import run_damask_simulation
+
+# Rough cost model of one DAMASK_grid (spectral) process; calibrate against measured runs.
+BYTES_PER_CELL = 6_000                  # solver fields, FFT buffers and state history per cell
+BASE_MEMORY = 300e6                     # per-process baseline (PETSc, HDF5, code)
+CPU_SECONDS_PER_CELL_INCREMENT = 5e-5   # single-thread cost of one cell over one increment
+PARALLEL_FRACTION = 0.9                 # Amdahl fraction of the OpenMP-parallel part
+CELLS_PER_THREAD = 1024                 # below this, an extra thread does not pay off
+OVERSUBSCRIPTION_PENALTY = 0.7          # throughput factor once threads exceed cores
+SWAP_PENALTY = 0.2                      # throughput factor once memory is overcommitted
+
+
+@dataclass
+class Job:
+    """One solver run with its estimated resource needs."""
+    name: str
+    cells: int
+    increments: int
+    load_file: str = None
+    grid_file: str = None
+    material_file: str = None
+    threads: int = 1
+    mpi_ranks: int = 1
+    cpus: list = field(default_factory=list)
+
+    @property
+    def memory(self) -> float:
+        return BASE_MEMORY * self.mpi_ranks + BYTES_PER_CELL * self.cells
+
+    @property
+    def work(self) -> float:
+        return CPU_SECONDS_PER_CELL_INCREMENT * self.cells * self.increments
+
+    @property
+    def cores(self) -> int:
+        return self.threads * self.mpi_ranks
+
+
+def speedup(threads: int, parallel_fraction: float = PARALLEL_FRACTION) -> float:
+    return 1.0 / ((1 - parallel_fraction) + parallel_fraction / max(threads, 1))
+
+
+def runtime(job: Job) -> float:
+    """Estimated wall time of a job running alone with its assigned threads/ranks."""
+    return job.work / speedup(job.cores)
+
+
+def estimate_job(load_file: str, grid_file: str, material_file: str, name: str = None) -> Job:
+    """
+    Estimate a job from its inputs: cells from the .vti WholeExtent, increments from the
+    sum of N over all load steps.
+    """
+    cells = math.prod(read_vti_header(grid_file)['cells'])
+    load = damask.YAML.load(load_file)
+    increments = sum(int(step['discretization']['N']) for step in load['loadstep'])
+    return Job(name or os.path.basename(os.path.dirname(os.path.abspath(load_file))), cells, increments,
+               os.path.abspath(load_file), os.path.abspath(grid_file), os.path.abspath(material_file))
+
+
+def max_threads(job: Job) -> int:
+    """Threads a job's grid can use efficiently."""
+    return max(1, math.ceil(job.cells / CELLS_PER_THREAD))
+
+
+def next_job(pending: list, free_cores: int, free_memory: float, running: int):
+    """
+    Pick the next job to start and set its thread count, or return None to wait.
+
+    The longest pending job that fits the free memory is chosen. Free cores are shared
+    among the pending jobs in proportion to their work, so a full queue runs many narrow
+    (efficient) jobs while long jobs and the tail of a study get wider.
+    """
+    total_work = sum(j.work for j in pending)
+    for job in pending:
+        share = round(free_cores * job.work / total_work / job.mpi_ranks) if total_work else 1
+        threads = min(max_threads(job), max(1, share))
+        if threads * job.mpi_ranks <= free_cores and job.memory <= free_memory:
+            job.threads = threads
+            return job
+    if running == 0 and pending:
+        # Too large for the node even when idle: run it alone, capped to the node.
+        job = pending[0]
+        job.threads = max(1, min(max_threads(job), free_cores // job.mpi_ranks))
+        return job
+    return None
+
+
+class LocalScheduler:
+    """
+    Packs solver runs onto one node without oversubscribing cores or memory.
+
+    Jobs are started longest-first; whenever a run finishes, the longest pending job that
+    fits the free cores and memory is started (backfilling smaller jobs) with a thread count
+    from next_job. Each run gets OMP_NUM_THREADS equal to its thread count and is pinned to
+    its own CPUs.
+    """
+
+    def __init__(self, cores: int = None, memory: float = None, pin: bool = True):
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else \
+            list(range(os.cpu_count() or 1))
+        self.cores = cores or len(available)
+        self.cpu_ids = available[:self.cores] if self.cores <= len(available) else list(range(self.cores))
+        self.memory = memory or _physical_memory()
+        # Pinning needs real CPU ids; a core budget larger than the process may use is only packed.
+        self.pin = pin and hasattr(os, 'sched_setaffinity') and self.cores <= len(available)
+
+    def run(self, jobs: list) -> list:
+        """
+        Run all jobs and return their result paths or error strings in the order of `jobs`
+        (names need not be unique: estimate_job names jobs after their directory).
+        """
+        pending = sorted(range(len(jobs)), key=lambda i: jobs[i].work, reverse=True)
+        free_cpus = list(self.cpu_ids)
+        free_memory = self.memory
+        results, taken, running = [None] * len(jobs), {}, 0
+        cond = threading.Condition()
+
+        def worker(i):
+            nonlocal free_memory, running
+            job = jobs[i]
+            result = None
+            try:
+                result = run_damask_simulation(job.load_file, job.grid_file, job.material_file,
+                                               threads=job.threads, cpus=job.cpus or None, mpi_ranks=job.mpi_ranks)
+            except Exception as e:
+                result = f"Error: {e}"
+            finally:
+                with cond:
+                    results[i] = result
+                    free_cpus.extend(taken.pop(i))
+                    free_memory += job.memory
+                    running -= 1
+                    cond.notify_all()
+
+        with cond:
+            while pending:
+                job = next_job([jobs[i] for i in pending], len(free_cpus), free_memory, running)
+                if job is None:
+                    cond.wait()
+                    continue
+                i = next(i for i in pending if jobs[i] is job)
+                pending.remove(i)
+                taken[i] = [free_cpus.pop() for _ in range(min(job.cores, len(free_cpus)))]
+                job.cpus = list(taken[i]) if self.pin else []
+                free_memory -= job.memory
+                running += 1
+                threading.Thread(target=worker, args=(i,), daemon=True).start()
+            while running:
+                cond.wait()
+        return results
+
+
+def _physical_memory() -> float:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 16e9
+
+
+def simulate(jobs: list, cores: int, memory: float, policy: str = 'packed') -> dict:
+    """
+    Simulate a job mix on one node with the cost model above (no solver is run).
+
+    - 'packed': LocalScheduler policy (next_job threads, no oversubscription).
+    - 'naive': every job is launched at once with OMP default threading (one thread per core),
+      sharing cores and memory.
+
+    Returns:
+    - dict: makespan (s), jobs per hour, and core utilization (useful single-thread work / core time).
+    """
+    jobs = [Job(j.name, j.cells, j.increments, mpi_ranks=j.mpi_ranks) for j in jobs]
+    remaining = {j.name: j.work for j in jobs}
+    now, running, pending = 0.0, [], []
+    if policy == 'naive':
+        for j in jobs:
+            j.threads = cores
+        running = list(jobs)
+    elif policy == 'packed':
+        pending = sorted(jobs, key=lambda j: j.work, reverse=True)
+    else:
+        raise ValueError(f"Unknown policy '{policy}'.")
+
+    free_cores, free_memory = cores, memory
+    while running or pending:
+        while pending:
+            job = next_job(pending, free_cores, free_memory, len(running))
+            if job is None:
+                break
+            pending.remove(job)
+            running.append(job)
+            free_cores -= job.cores
+            free_memory -= job.memory
+
+        demand = sum(j.cores for j in running)
+        overcommitted = sum(j.memory for j in running) > memory
+        rates = {}
+        for j in running:
+            if demand > cores:
+                rate = speedup(j.cores * cores / demand) * OVERSUBSCRIPTION_PENALTY
+            else:
+                rate = speedup(j.cores)
+            rates[j.name] = rate * (SWAP_PENALTY if overcommitted else 1.0)
+        step = min(remaining[j.name] / rates[j.name] for j in running)
+        now += step
+        for j in list(running):
+            remaining[j.name] -= step * rates[j.name]
+            if remaining[j.name] <= 1e-9 * j.work:
+                running.remove(j)
+                free_cores += j.cores
+                free_memory += j.memory
+
+    total_work = sum(j.work for j in jobs)
+    return {
+        'policy': policy,
+        'makespan_s': now,
+        'jobs_per_hour': 3600 * len(jobs) / now if now else 0.0,
+        'core_utilization': total_work / (cores * now) if now else 0.0,
+    }
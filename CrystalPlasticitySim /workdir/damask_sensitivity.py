@@ -0,0 +1,202 @@
+"""
+Global sensitivity analysis of one scalar simulation output to material/load parameters.
+
+- Sobol: Saltelli design (matrices A, B and A with column i from B), first-order indices
+  with the Saltelli (2010) estimator and total-order indices with the Jansen estimator.
+- Morris: r one-at-a-time trajectories on a p-level grid, elementary effects summarized
+  by mu, mu* and sigma (in units of the output per full parameter range).
+
+Both report bootstrap confidence intervals. The design points are evaluated in one batch
+through damask_sweep.run_points, so repeated analyses (same seed) and points already
+run by sweeps or optimizations are served from the study store.
+"""
+import os
+
+import numpy as np
+from scipy.stats import qmc
+
+from damask_backends import ExecutionBackend
+from damask_sweep import TaskRenderer, output_columns, run_points
+
+
+def _to_bounds(unit: np.ndarray, bounds: dict) -> np.ndarray:
+    lo, hi = np.array(list(bounds.values()), dtype=float).T
+    return lo + unit * (hi - lo)
+
+
+def saltelli_design(bounds: dict, n: int, seed: int = None) -> np.ndarray:
+    """
+    Points of a Saltelli design stacked as [A; B; AB_1; ...; AB_d], each block n rows
+    (n rounded up to a power of two), in parameter units.
+    """
+    d = len(bounds)
+    m = int(np.ceil(np.log2(max(n, 2))))
+    base = qmc.Sobol(d=2 * d, seed=seed).random_base2(m)
+    A, B = base[:, :d], base[:, d:]
+    AB = []
+    for i in range(d):
+        ABi = A.copy()
+        ABi[:, i] = B[:, i]
+        AB.append(ABi)
+    return _to_bounds(np.vstack([A, B] + AB), bounds)
+
+
+def _sobol_indices(fA, fB, fAB):
+    V = np.var(np.concatenate([fA, fB]), ddof=1)
+    S1 = np.mean(fB[:, None] * (fAB - fA[:, None]), axis=0) / V
+    ST = 0.5 * np.mean((fA[:, None] - fAB) ** 2, axis=0) / V
+    return S1, ST
+
+
+def sobol_analysis(Y: np.ndarray, names: list, n_boot: int = 1000, confidence: float = 0.95,
+                   seed: int = None) -> dict:
+    """
+    First/total-order indices from outputs of a saltelli_design (rows with a failed run are dropped).
+
+    Returns:
+    - dict: 'indices' {name: S1, S1_ci, ST, ST_ci} and the number of 'samples' used.
+    """
+    d = len(names)
+    blocks = np.asarray(Y, dtype=float).reshape(d + 2, -1)
+    fA, fB, fAB = blocks[0], blocks[1], blocks[2:].T
+    valid = np.isfinite(fA) & np.isfinite(fB) & np.all(np.isfinite(fAB), axis=1)
+    fA, fB, fAB = fA[valid], fB[valid], fAB[valid]
+    if len(fA) < 2:
+        raise ValueError("Too few successful runs for a Sobol analysis.")
+
+    S1, ST = _sobol_indices(fA, fB, fAB)
+    rng = np.random.default_rng(seed)
+    boot = [_sobol_indices(fA[idx], fB[idx], fAB[idx])
+            for idx in rng.integers(0, len(fA), (n_boot, len(fA)))]
+    S1_boot, ST_boot = np.array([b[0] for b in boot]), np.array([b[1] for b in boot])
+    q = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    S1_ci, ST_ci = np.nanpercentile(S1_boot, q, axis=0), np.nanpercentile(ST_boot, q, axis=0)
+    indices = {
+        name: {'S1': float(S1[i]), 'S1_ci': [float(S1_ci[0, i]), float(S1_ci[1, i])],
+               'ST': float(ST[i]), 'ST_ci': [float(ST_ci[0, i]), float(ST_ci[1, i])]}
+        for i, name in enumerate(names)
+    }
+    return {'indices': indices, 'samples': int(valid.sum())}
+
+
+def morris_design(bounds: dict, r: int, levels: int = 4, seed: int = None):
+    """
+    r Morris trajectories of d + 1 points each.
+
+    Returns:
+    - (points, steps): points as an (r * (d + 1), d) array in parameter units; steps as an
+      (r, d, 2) array of (changed parameter index, signed unit step) per move.
+    """
+    d = len(bounds)
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    starts = np.arange(levels // 2) / (levels - 1)
+    points, steps = [], []
+    for _ in range(r):
+        sign = rng.choice([-1.0, 1.0], d)
+        x = rng.choice(starts, d)
+        x = np.where(sign < 0, x + delta, x)
+        trajectory, moves = [x.copy()], []
+        for i in rng.permutation(d):
+            x = x.copy()
+            x[i] += sign[i] * delta
+            trajectory.append(x)
+            moves.append((i, sign[i] * delta))
+        points.append(np.array(trajectory))
+        steps.append(moves)
+    return _to_bounds(np.vstack(points), bounds), np.array(steps)
+
+
+def morris_analysis(Y: np.ndarray, steps: np.ndarray, names: list, n_boot: int = 1000,
+                    confidence: float = 0.95, seed: int = None) -> dict:
+    """
+    Elementary-effect statistics of a morris_design (trajectories with a failed run are dropped).
+
+    Returns:
+    - dict: 'indices' {name: mu, mu_star, mu_star_ci, sigma} and the number of 'samples' used.
+    """
+    r, d = steps.shape[:2]
+    Y = np.asarray(Y, dtype=float).reshape(r, d + 1)
+    valid = np.all(np.isfinite(Y), axis=1)
+    if valid.sum() < 2:
+        raise ValueError("Too few successful trajectories for a Morris analysis.")
+    effects = np.empty((r, d))
+    for t in range(r):
+        for k, (i, step) in enumerate(steps[t]):
+            effects[t, int(i)] = (Y[t, k + 1] - Y[t, k]) / step
+    effects = effects[valid]
+
+    rng = np.random.default_rng(seed)
+    boot = np.array([np.mean(np.abs(effects[idx]), axis=0)
+                     for idx in rng.integers(0, len(effects), (n_boot, len(effects)))])
+    q = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    ci = np.percentile(boot, q, axis=0)
+    indices = {
+        name: {'mu': float(effects[:, i].mean()), 'mu_star': float(np.abs(effects[:, i]).mean()),
+               'mu_star_ci': [float(ci[0, i]), float(ci[1, i])],
+               'sigma': float(effects[:, i].std(ddof=1))}
+        for i, name in enumerate(names)
+    }
+    return {'indices': indices, 'samples': int(valid.sum())}
+
+
+def run_sensitivity(bounds: dict, load_file: str, material_file: str, grid_file: str, method: str = 'sobol',
+                    n: int = 64, r: int = 10, levels: int = 4, output: str = None,
+                    experimental_file: str = None, target_quaternion: list = None,
+                    reduce: str = 'stress_strain', phase: str = 'Ni3Al', backend: ExecutionBackend = None,
+                    workers: int = 1, store=None, study: str = 'sensitivity', n_boot: int = 1000,
+                    confidence: float = 0.95, seed: int = None) -> dict:
+    """
+    Rank parameters by their influence on one scalar output.
+
+    Parameters:
+    - bounds (dict): Parameter name -> (low, high), as in damask_sweep.run_sweep.
+    - method (str): 'sobol' (n * (d + 2) runs) or 'morris' (r * (d + 1) runs).
+    - output (str): Output column of damask_sweep.output_columns ('mape', 'max_stress',
+      'final_stress', 'deviation_angle', ...); default 'mape' / 'deviation_angle' when
+      reference data is given, else 'max_stress' / 'q_w'.
+    - store (StudyStore | str): Result cache (default: study.sqlite next to the material file).
+    - n_boot, confidence: Bootstrap resamples and interval width.
+    - seed (int): Fixes the design, so a repeated analysis is served from the store.
+
+    Returns:
+    - dict: indices per parameter, ranking (most influential first), run counts.
+    """
+    names = list(bounds)
+    if method == 'sobol':
+        X = saltelli_design(bounds, n, seed)
+    elif method == 'morris':
+        X, steps = morris_design(bounds, r, levels, seed)
+    else:
+        raise ValueError(f"Unknown method '{method}', expected 'sobol' or 'morris'.")
+    if output is None:
+        if reduce == 'orientation':
+            output = 'deviation_angle' if target_quaternion is not None else 'q_w'
+        else:
+            output = 'mape' if experimental_file else 'max_stress'
+
+    workdir = os.path.dirname(os.path.abspath(material_file))
+    params = [dict(zip(names, (float(v) for v in x))) for x in X]
+    render = TaskRenderer(load_file, material_file, grid_file, reduce, phase)
+    results = run_points(render, params, study, backend, workers, store or os.path.join(workdir, 'study.sqlite'))
+    columns = output_columns(reduce, results, experimental_file, target_quaternion)
+    if output not in columns:
+        raise ValueError(f"Unknown output '{output}', expected one of {list(columns)}.")
+    Y = columns[output]
+
+    if method == 'sobol':
+        analysis, score = sobol_analysis(Y, names, n_boot, confidence, seed), 'ST'
+    else:
+        analysis, score = morris_analysis(Y, steps, names, n_boot, confidence, seed), 'mu_star'
+    indices = analysis['indices']
+    return {
+        'method': method,
+        'output': output,
+        'indices': indices,
+        'ranking': sorted(names, key=lambda name: indices[name][score], reverse=True),
+        'samples': analysis['samples'],
+        'runs': len(results),
+        'executed': len({res['key'] for res in results if not res['cached']}),
+        'cached': sum(res['cached'] for res in results),
+        'failed': sum(res['status'] != 'ok' for res in results),
+    }
@@ -1,11 +1,166 @@
 import os
-import json
-from langchain.tools import tool
+import re
+import subprocess
+import time
+from dataclasses import dataclass
 
+# DAMASK_grid messages used to classify a failed run; the first matching kind wins, and a
+# log matching none of them (segfault, OOM kill, MPI abort) is a 'crash'. The log always
+# contains the input file names, so the patterns are message texts, never file names.
+FAILURE_PATTERNS = {
+    'convergence': [r'cutting back', r'cut ?backs? exceeded', r'max(imum)? (number of )?cut ?backs',
+                    r'not converged', r'terminally ill'],
+    'config': [r'file not found', r'could not read file', r'invalid YAML', r'invalid use of flow YAML',
+               r'incorrect indent', r'type mismatch in YAML', r'abrupt end of file',
+               r'unknown (key|keyword|type|label|element|lattice)', r'not defined for lattice structure',
+               r'invalid (character|value|name|load ?case)', r'incomplete load ?case',
+               r'mixed boundary conditions', r'non-positive (loadcase|load case|number of increments|time)',
+               r'(negative|zero) (value|entry|lattice parameter)', r'number of .* (differs|does not match)'],
+}
+LOG_TAIL = 4000
+
+
+class SolverError(RuntimeError):
+    """A DAMASK_grid run that did not produce a result file."""
+    kind = 'crash'
+
+    def __init__(self, message: str, returncode: int = None, log_file: str = None, log_tail: str = ''):
+        super().__init__(message)
+        self.returncode = returncode
+        self.log_file = log_file
+        self.log_tail = log_tail
+
+
+class ConfigError(SolverError):
+    """Invalid load/material/grid input; rerunning the same input cannot succeed."""
+    kind = 'config'
+
+
+class ConvergenceError(SolverError):
+    """The solver ran out of cutbacks; a finer time stepping may succeed."""
+    kind = 'convergence'
+
+
+class SolverTimeout(SolverError):
+    """The run exceeded its wall-time limit and was killed."""
+    kind = 'timeout'
+
+
+class LaunchError(SolverError):
+    """DAMASK_grid (or mpiexec) could not be started."""
+    kind = 'launch'
+
+
+FAILURE_TYPES = {cls.kind: cls for cls in (SolverError, ConfigError, ConvergenceError, SolverTimeout, LaunchError)}
+
+
+@dataclass
+class SolverResult:
+    """A successful DAMASK_grid run."""
+    result_file: str
+    log_file: str
+    elapsed: float
+    returncode: int = 0
+
+
+def classify_failure(log_text: str) -> str:
+    """Failure kind of a non-zero exit from the solver log: 'convergence', 'config' or 'crash'."""
+    for kind, patterns in FAILURE_PATTERNS.items():
+        if any(re.search(p, log_text, re.IGNORECASE) for p in patterns):
+            return kind
+    return 'crash'
+
+
+def damask_command(load_file: str, grid_file: str, material_file: str, workdir: str, mpi_ranks: int = 1) -> list:
+    """Argument list of one DAMASK_grid run (prefixed with mpiexec for more than one rank)."""
+    command = [
+        "DAMASK_grid",
+        "--load", load_file,
+        "--geom", grid_file,
+        "--material", material_file,
+        "--workingdirectory", workdir,
+    ]
+    if mpi_ranks > 1:
+        command = ["mpiexec", "-n", str(mpi_ranks)] + command
+    return command
 
-import os
 
-def run_damask_simulation(load_file: str, grid_file: str, material_file: str) -> str:
+def result_path(load_file: str, grid_file: str, material_file: str) -> str:
+    """Result file DAMASK_grid writes next to the load file."""
+    return os.path.join(
+        os.path.dirname(os.path.abspath(load_file)),
+        f"{os.path.splitext(os.path.basename(grid_file))[0]}_"
+        f"{os.path.splitext(os.path.basename(load_file))[0]}_"
+        f"{os.path.splitext(os.path.basename(material_file))[0]}.hdf5"
+    )
+
+
+def _tail(path: str) -> str:
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - LOG_TAIL))
+            return f.read().decode(errors='replace')
+    except OSError:
+        return ''
+
+
+def solve(load_file: str, grid_file: str, material_file: str, threads: int = None, cpus: list = None,
+          mpi_ranks: int = 1, timeout: float = None, log_file: str = None) -> SolverResult:
+    """
+    Run DAMASK_grid in the directory of the load file, with its output captured in log_file
+    (default: the result file's name with .log, so runs of other inputs in the same
+    directory keep their own logs).
+
+    Raises:
+    - SolverError subclass (ConfigError, ConvergenceError, SolverTimeout, LaunchError) on failure.
+    """
+    load_file = os.path.abspath(load_file)
+    grid_file = os.path.abspath(grid_file)
+    material_file = os.path.abspath(material_file)
+    workdir = os.path.dirname(load_file)
+    for path in (load_file, grid_file, material_file):
+        if not os.path.isfile(path):
+            raise ConfigError(f"Input file {path} does not exist.")
+
+    command = damask_command(load_file, grid_file, material_file, workdir, mpi_ranks)
+    env = dict(os.environ)
+    if threads:
+        env["OMP_NUM_THREADS"] = str(threads)
+    pin = None
+    if cpus and hasattr(os, "sched_setaffinity"):
+        def pin():
+            os.sched_setaffinity(0, cpus)
+
+    result_file = result_path(load_file, grid_file, material_file)
+    log_file = log_file or f"{os.path.splitext(result_file)[0]}.log"
+    start = time.perf_counter()
+    with open(log_file, "w") as log:
+        try:
+            proc = subprocess.Popen(command, env=env, preexec_fn=pin, stdout=log, stderr=subprocess.STDOUT)
+        except OSError as e:
+            raise LaunchError(f"Could not start {command[0]}: {e}", log_file=log_file)
+        try:
+            returncode = proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            raise SolverTimeout(f"DAMASK simulation exceeded {timeout:g} s and was killed.",
+                                log_file=log_file, log_tail=_tail(log_file))
+    elapsed = time.perf_counter() - start
+
+    if returncode != 0 or not os.path.isfile(result_file):
+        tail = _tail(log_file)
+        kind = classify_failure(tail) if returncode != 0 else 'crash'
+        raise FAILURE_TYPES[kind](
+            f"DAMASK simulation failed ({kind}) with command:\n{' '.join(command)}\nExit code: {returncode}",
+            returncode=returncode, log_file=log_file, log_tail=tail)
+    return SolverResult(result_file, log_file, elapsed, returncode)
+
+
+def run_damask_simulation(load_file: str, grid_file: str, material_file: str,
+                          threads: int = None, cpus: list = None, mpi_ranks: int = 1,
+                          timeout: float = None) -> str:
     """
     Run the DAMASK simulation using paths to the load file, grid file, and material file.
     The simulation is executed in the same directory as the input files.
@@ -14,48 +169,16 @@ def run_damask_simulation(load_file: str, grid_file: str, material_file: str) ->
     - load_file (str): Path to the load YAML file.
     - grid_file (str): Path to the grid file.
     - material_file (str): Path to the material file.
+    - threads (int): OMP_NUM_THREADS for the run (default: inherited environment).
+    - cpus (list): CPU ids the run is pinned to (Linux only).
+    - mpi_ranks (int): Number of MPI ranks (launched through mpiexec when > 1).
+    - timeout (float): Wall-time limit in seconds.
 
     Returns:
-    - str: Absolute path to the result HDF5 file, or an error message if the simulation fails.
+    - str: Absolute path to the result HDF5 file, or an error message if the simulation fails
+      (use solve() for typed failures).
     """
     try:
-        # Resolve absolute paths
-        load_file = os.path.abspath(load_file)
-        grid_file = os.path.abspath(grid_file)
-        material_file = os.path.abspath(material_file)
-
-        # Determine working directory (based on load file location)
-        workdir = os.path.dirname(load_file)
-
-        if not os.path.isdir(workdir):
-            return f"Error: Work directory {workdir} does not exist."
-
-        # Construct output file name
-        result_file = os.path.join(
-            workdir,
-            f"{os.path.splitext(os.path.basename(grid_file))[0]}_"
-            f"{os.path.splitext(os.path.basename(load_file))[0]}_"
-            f"{os.path.splitext(os.path.basename(material_file))[0]}.hdf5"
-        )
-
-
-        # Command to run DAMASK 
-        command = (
-            f"DAMASK_grid --load \"{load_file}\" "
-            f"--geom \"{grid_file}\" "
-            f"--material \"{material_file}\" "
-            f"--workingdirectory \"{workdir}\" > /dev/null 2>&1"
-        )
-
-        # Execute command
-        exit_code = os.system(command)
-
-        if exit_code != 0:
-            raise RuntimeError(f"DAMASK simulation failed with command:\n{command}\nExit code: {exit_code}")
-
-        return os.path.abspath(result_file)
-
+        return solve(load_file, grid_file, material_file, threads, cpus, mpi_ranks, timeout).result_file
     except Exception as e:
         return f"Error: {str(e)}"
-
-
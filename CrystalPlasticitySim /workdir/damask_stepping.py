@@ -0,0 +1,120 @@
+"""
+Adaptive time stepping from the convergence history of nearby runs.
+
+The load templates use one discretization (t: 700, N: 7000) for every candidate, although
+most parameter sets converge with far fewer increments and stiff ones need cutbacks.
+StepPlanner chooses the increments of each run on the ladder N * refine^-k from the runs
+closest to it in the (box-normalized) parameter space:
+
+- the lowest level above every level a neighbour failed to converge at, or
+- one level below the neighbours' lowest success when none of them failed, so cheaper
+  settings keep being probed.
+
+Without neighbours a run keeps the template N. The convergence retries of a planned run
+are raised by its levels below the template, so a run planned too low is refined back up
+to the template N and beyond, as unplanned runs are. The written increments and the
+strains they are written at stay those of the template (damask_yaml.rescale_time_stepping).
+
+The history comes from the study store (every run records the increments it converged or
+failed at, see StudyStore.stepping; only runs of the same inputs are used) and from the
+runs of the current optimization.
+Multi-experiment runs are planned per case ('case' parameter).
+"""
+import threading
+
+import numpy as np
+
+from damask_worker import REFINE, RETRIES
+from damask_yaml import total_increments
+
+
+class StepPlanner:
+    """
+    Increment multiplier ('scale' of damask_worker tasks) per candidate.
+
+    - bounds, names: Box and names of the planned parameters.
+    - min_scale (float): Fewest increments relative to the template.
+    - radius (float): Neighbourhood in the unit box; at most `neighbours` runs are used.
+    """
+
+    def __init__(self, bounds: list, names: list, min_scale: float = 1 / 16, radius: float = 0.1,
+                 neighbours: int = 5, refine: int = REFINE, retries: int = RETRIES):
+        self.lo, self.hi = np.array(bounds, dtype=float).T
+        self.names = list(names)
+        self.refine = refine
+        self.retries = retries
+        self.depth = int(round(np.log(1 / min_scale) / np.log(refine)))
+        self.radius = radius
+        self.neighbours = neighbours
+        self.history = {}
+        self.lock = threading.Lock()
+        self.stats = {'runs': 0, 'template_increments': 0, 'planned_increments': 0, 'converged_increments': 0,
+                      'refined': 0}
+
+    def _unit(self, x) -> np.ndarray:
+        return (np.asarray(x, dtype=float) - self.lo) / np.where(self.hi > self.lo, self.hi - self.lo, 1.0)
+
+    def record(self, x, result: dict, group=None):
+        """Add a worker result (or StudyStore.stepping row) to the history; other failures than convergence are ignored."""
+        if result.get('increments') is None or result['status'] not in ('ok', 'convergence'):
+            return
+        ok = result['increments'] if result['status'] == 'ok' else np.nan
+        failed = result.get('failed_increments') or np.nan
+        with self.lock:
+            self.history.setdefault(group, []).append((self._unit(x), ok, failed))
+
+    def seed(self, store, study: str, templates) -> "StepPlanner":
+        """
+        Add the stored runs of one study whose parameters cover `names` and whose fixed inputs
+        have one of the `templates` fingerprints (see damask_store.template_key); runs of
+        another load N, grid or material converge at increments that say nothing about these.
+        """
+        templates = {templates} if isinstance(templates, str) else set(templates)
+        for row in store.stepping(study):
+            if row['template'] in templates and all(n in row['params'] for n in self.names):
+                self.record([row['params'][n] for n in self.names], row, row['params'].get('case'))
+        return self
+
+    def scale(self, x, increments: int, group=None) -> float:
+        """Increment multiplier for a run at x whose template has `increments` in total."""
+        with self.lock:
+            history = list(self.history.get(group, []))
+        if not history:
+            return 1.0
+        points, ok, failed = (np.array(v, dtype=float) for v in zip(*history))
+        d = np.linalg.norm(points - self._unit(x), axis=1)
+        near = np.argsort(d)[:self.neighbours]
+        near = near[d[near] <= self.radius]
+        if not len(near):
+            return 1.0
+        step = np.log(self.refine)
+        failed, ok = failed[near], ok[near]
+        if np.isfinite(failed).any():
+            # Highest level that is still above every failure.
+            level = int(np.ceil(np.log(increments / np.nanmax(failed)) / step - 1e-9)) - 1
+        else:
+            level = int(round(np.log(increments / np.nanmin(ok)) / step)) + 1
+        return float(self.refine ** -min(max(level, -self.retries), self.depth))
+
+    def apply(self, task: dict, x, group=None) -> dict:
+        """Task with the planned 'scale' and retries enough to reach the template N and the usual retries above it."""
+        increments = total_increments(task['load'])
+        scale = self.scale(x, increments, group)
+        below = max(0, int(round(-np.log(scale) / np.log(self.refine))))
+        with self.lock:
+            self.stats['runs'] += 1
+            self.stats['template_increments'] += increments
+            self.stats['planned_increments'] += int(round(increments * scale))
+        return dict(task, scale=scale, refine=self.refine, retries=self.retries + below)
+
+    def observe(self, x, result: dict, group=None):
+        """record() a fresh run of a planned task and count its increments."""
+        self.record(x, result, group)
+        if result.get('increments') is not None and result['status'] == 'ok':
+            with self.lock:
+                self.stats['converged_increments'] += result['increments']
+                self.stats['refined'] += result.get('attempts', 1) > 1
+
+    def summary(self) -> dict:
+        """Planned runs, increments of their templates, planned for the first attempt and converged at."""
+        return dict(self.stats)
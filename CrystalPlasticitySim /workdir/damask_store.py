@@ -0,0 +1,379 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import damask_telemetry
+
+# Rendered YAML is compared textually; parameter values are rounded so that a value
+# reproduced from a CSV or a design file still hits the cache.
+PARAMETER_DIGITS = 12
+
+
+def task_key(task: dict) -> str:
+    """
+    Content hash of a rendered task (see damask_worker.make_task).
+
+    Identical load/material text, grid and reduction give the same key, whichever sweep,
+    optimizer or study produced the task.
+    """
+    h = hashlib.sha1()
+    for part in (task['load'], task['material'], task['reduce']):
+        h.update(part.encode())
+        h.update(b'\0')
+    if task.get('grid_text') is not None:
+        h.update(task['grid_text'].encode())
+    else:
+        stat = os.stat(task['grid'])
+        h.update(f"{os.path.abspath(task['grid'])}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def template_key(load: str, material: str, grid_file: str, reduce: str) -> str:
+    """
+    Fingerprint of the fixed inputs of a study: the load and material templates (before any
+    parameter is set), grid and reduction, hashed like task_key. Stored with every run of
+    tasks that carry it, so failure and stepping histories are only taken from runs of the
+    same inputs.
+    """
+    return task_key({'load': load, 'material': material, 'grid': grid_file, 'reduce': reduce})
+
+
+def rounded(params: dict) -> dict:
+    return {k: round(float(v), PARAMETER_DIGITS) if isinstance(v, (int, float)) else v for k, v in params.items()}
+
+
+def dominates(a: dict, b: dict) -> bool:
+    """
+    True if objective dict a is no worse than b everywhere and better somewhere (minimization).
+    Dicts of different objectives never dominate each other.
+    """
+    if a.keys() != b.keys():
+        return False
+    return all(a[k] <= b[k] for k in b) and any(a[k] < b[k] for k in b)
+
+
+class StudyStore:
+    """
+    SQLite store of reduced solver results keyed on task_key.
+
+    Every row keeps the study name, the parameter values, the worker status and the
+    (zlib-compressed JSON) reduced result, so finished runs are never repeated and can be
+    listed per study for later analysis. Numeric parameters are also indexed for range
+    queries (find), archived result files are listed in a file index (put_file/files), and
+    the increments each run converged or failed at are kept for damask_stepping (stepping).
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        with self.cursor() as cur:
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    study TEXT,
+                    params TEXT,
+                    reduce TEXT,
+                    status TEXT,
+                    message TEXT,
+                    reduced BLOB,
+                    elapsed REAL,
+                    host TEXT,
+                    created REAL
+                )"""
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS results_study ON results (study)")
+            cur.execute("PRAGMA table_info(results)")
+            if 'template' not in {column[1] for column in cur.fetchall()}:
+                cur.execute("ALTER TABLE results ADD COLUMN template TEXT")
+            cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'params'")
+            backfill = cur.fetchone() is None
+            cur.execute(
+                """CREATE TABLE IF NOT EXISTS params (
+                    key TEXT,
+                    name TEXT,
+                    value REAL,
+                    PRIMARY KEY (key, name)
+                )"""
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS params_value ON params (name, value)")
+            if backfill:
+                cur.execute("SELECT key, params FROM results")
+                cur.executemany("INSERT OR IGNORE INTO params VALUES (?, ?, ?)",
+                                [index for key, params in cur.fetchall()
+                                 for index in self._index(key, json.loads(params))])
+            cur.execute(
+                """CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    study TEXT,
+                    keys TEXT,
+                    params TEXT,
+                    fields TEXT,
+                    increments INTEGER,
+                    bytes INTEGER,
+                    mtime REAL,
+                    state TEXT,
+                    created REAL
+                )"""
+            )
+            cur.execute(
+                """CREATE TABLE IF NOT EXISTS stepping (
+                    key TEXT PRIMARY KEY,
+                    increments INTEGER,
+                    failed_increments INTEGER
+                )"""
+            )
+            cur.execute(
+                """CREATE TABLE IF NOT EXISTS pareto (
+                    study TEXT,
+                    params TEXT,
+                    objectives TEXT,
+                    generation INTEGER,
+                    created REAL,
+                    PRIMARY KEY (study, params)
+                )"""
+            )
+
+    @contextmanager
+    def cursor(self, transaction: bool = False):
+        with self.lock:
+            cur = self.conn.cursor()
+            if transaction:
+                cur.execute("BEGIN")
+            try:
+                yield cur
+                if transaction:
+                    cur.execute("COMMIT")
+            except BaseException:
+                if transaction:
+                    cur.execute("ROLLBACK")
+                raise
+            finally:
+                cur.close()
+
+    @staticmethod
+    def _index(key: str, params: dict) -> list:
+        return [(key, name, float(value)) for name, value in params.items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+    @staticmethod
+    def _row(row) -> dict:
+        key, study, params, reduce, status, message, reduced, elapsed, host, created, template = row
+        return {
+            'key': key, 'study': study, 'params': json.loads(params), 'reduce': reduce,
+            'status': status, 'message': message,
+            'reduced': json.loads(zlib.decompress(reduced)) if reduced else None,
+            'elapsed': elapsed, 'host': host, 'created': created, 'template': template,
+        }
+
+    def get(self, keys: list, ok_only: bool = True) -> dict:
+        """Stored results of the given keys as {key: row}; failed runs only if ok_only is False."""
+        keys = list(keys)
+        found = {}
+        with self.cursor() as cur:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                cur.execute(f"SELECT * FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                for row in cur.fetchall():
+                    row = self._row(row)
+                    if row['status'] == 'ok' or not ok_only:
+                        found[row['key']] = row
+        return found
+
+    def put(self, key: str, study: str, params: dict, reduce: str, result: dict, template: str = None):
+        """
+        Store one worker result (see damask_worker.execute_task); a successful run is never
+        overwritten by a failure. template is the fingerprint of the task's fixed inputs
+        (see damask_worker.make_task).
+        """
+        reduced = zlib.compress(json.dumps(result['reduced']).encode()) if result.get('reduced') is not None else None
+        values = (key, study, json.dumps(rounded(params)), reduce, result['status'], result.get('message', ''),
+                  reduced, result.get('elapsed'), result.get('host', ''), time.time(), template)
+        with self.cursor(transaction=True) as cur:
+            cur.execute("SELECT status FROM results WHERE key = ?", (key,))
+            existing = cur.fetchone()
+            if existing and existing[0] == 'ok' and result['status'] != 'ok':
+                return
+            cur.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+            cur.execute("DELETE FROM params WHERE key = ?", (key,))
+            cur.executemany("INSERT INTO params VALUES (?, ?, ?)", self._index(key, rounded(params)))
+            if result.get('increments') is not None:
+                cur.execute("INSERT OR REPLACE INTO stepping VALUES (?, ?, ?)",
+                            (key, result['increments'], result.get('failed_increments')))
+
+    def rows(self, study: str = None, status: str = None, template: str = None) -> list:
+        """All stored rows, optionally of one study, status and/or template fingerprint, oldest first."""
+        query, args = "SELECT * FROM results", []
+        clauses = []
+        for column, value in (('study', study), ('status', status), ('template', template)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self.cursor() as cur:
+            cur.execute(query + " ORDER BY created", args)
+            return [self._row(row) for row in cur.fetchall()]
+
+    def find(self, ranges: dict, study: str = None, reduce: str = None, status: str = 'ok') -> list:
+        """
+        Rows whose parameters lie in the given ranges, through the parameter index.
+
+        ranges maps a parameter name to (low, high), either end None for open; a row
+        without the parameter never matches. status=None returns failed runs too.
+        """
+        query, args = "SELECT * FROM results WHERE 1", []
+        for name, (low, high) in ranges.items():
+            query += " AND key IN (SELECT key FROM params WHERE name = ?"
+            args.append(name)
+            if low is not None:
+                query += " AND value >= ?"
+                args.append(float(low))
+            if high is not None:
+                query += " AND value <= ?"
+                args.append(float(high))
+            query += ")"
+        for column, value in (('study', study), ('reduce', reduce), ('status', status)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                args.append(value)
+        with self.cursor() as cur:
+            cur.execute(query + " ORDER BY created", args)
+            return [self._row(row) for row in cur.fetchall()]
+
+    def stepping(self, study: str = None) -> list:
+        """
+        Time-stepping history of the runs that recorded it, optionally of one study:
+        [{'key', 'params', 'status', 'increments', 'failed_increments', 'template'}]
+        (see damask_worker.execute_task and template_key).
+        """
+        query, args = ("SELECT r.key, r.params, r.status, s.increments, s.failed_increments, r.template "
+                       "FROM results r JOIN stepping s ON r.key = s.key"), []
+        if study is not None:
+            query += " WHERE r.study = ?"
+            args.append(study)
+        with self.cursor() as cur:
+            cur.execute(query + " ORDER BY r.created", args)
+            return [{'key': key, 'params': json.loads(params), 'status': status, 'increments': increments,
+                     'failed_increments': failed, 'template': template}
+                    for key, params, status, increments, failed, template in cur.fetchall()]
+
+    def put_file(self, path: str, study: str, keys: list, params: dict, fields: list, increments: int,
+                 state: str):
+        """Record an archived result file (see damask_archive.archive_runs)."""
+        path = os.path.abspath(path)
+        exists = os.path.isfile(path)
+        values = (path, study, json.dumps(keys), json.dumps(rounded(params)), json.dumps(fields), increments,
+                  os.path.getsize(path) if exists else 0, os.path.getmtime(path) if exists else None, state,
+                  time.time())
+        with self.cursor() as cur:
+            cur.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+
+    def files(self, study: str = None) -> list:
+        """Archived result files, optionally of one study, oldest first."""
+        query, args = "SELECT * FROM files", []
+        if study is not None:
+            query += " WHERE study = ?"
+            args.append(study)
+        with self.cursor() as cur:
+            cur.execute(query + " ORDER BY created", args)
+            return [{'path': path, 'study': study, 'keys': json.loads(keys), 'params': json.loads(params),
+                     'fields': json.loads(fields), 'increments': increments, 'bytes': size, 'mtime': mtime,
+                     'state': state, 'created': created}
+                    for path, study, keys, params, fields, increments, size, mtime, state, created
+                    in cur.fetchall()]
+
+    def archive(self, study: str) -> list:
+        """Current Pareto archive of a study: [{'params', 'objectives', 'generation'}]."""
+        with self.cursor() as cur:
+            cur.execute("SELECT params, objectives, generation FROM pareto WHERE study = ? ORDER BY created", (study,))
+            return [{'params': json.loads(p), 'objectives': json.loads(o), 'generation': g}
+                    for p, o, g in cur.fetchall()]
+
+    def update_archive(self, study: str, candidates: list) -> int:
+        """
+        Merge feasible candidates ({'params', 'objectives', 'generation'}, all objectives minimized)
+        into the study's Pareto archive, dropping every entry that becomes dominated. Entries of
+        other objectives (the study was run before with other experiments or metrics) are
+        dropped: the archive holds the front of the objectives it was last updated with.
+
+        Returns:
+        - int: archive size after the update.
+        """
+        with self.cursor(transaction=True) as cur:
+            cur.execute("SELECT params, objectives, generation FROM pareto WHERE study = ?", (study,))
+            entries = [{'params': json.loads(p), 'objectives': json.loads(o), 'generation': g}
+                       for p, o, g in cur.fetchall()]
+            if candidates:
+                labels = set(candidates[0]['objectives'])
+                if any(set(c['objectives']) != labels for c in candidates):
+                    raise ValueError("Candidates of one archive update must have the same objectives.")
+                entries = [e for e in entries if set(e['objectives']) == labels]
+            known = {json.dumps(rounded(e['params']), sort_keys=True) for e in entries}
+            for c in candidates:
+                p = json.dumps(rounded(c['params']), sort_keys=True)
+                if p not in known:
+                    known.add(p)
+                    entries.append({'params': rounded(c['params']), 'objectives': c['objectives'],
+                                    'generation': c.get('generation')})
+            front = [e for e in entries if not any(dominates(o['objectives'], e['objectives']) for o in entries)]
+            cur.execute("DELETE FROM pareto WHERE study = ?", (study,))
+            now = time.time()
+            cur.executemany("INSERT INTO pareto VALUES (?, ?, ?, ?, ?)",
+                            [(study, json.dumps(e['params'], sort_keys=True), json.dumps(e['objectives']),
+                              e['generation'], now) for e in front])
+        return len(front)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_cached(backend, tasks: list, store: StudyStore = None, study: str = '', params: list = None) -> list:
+    """
+    Results of tasks in order, running on the backend only those without a stored
+    successful result (and each distinct task only once). New results are stored.
+
+    Each returned dict is a worker result with an extra 'key' and 'cached' flag.
+    """
+    params = params or [{} for _ in tasks]
+    keys = [task_key(task) for task in tasks]
+    found = store.get(keys) if store is not None else {}
+
+    todo = {}
+    for key, task, p in zip(keys, tasks, params):
+        if key not in found and key not in todo:
+            todo[key] = (task, p)
+    fresh = dict(zip(todo, backend.map([task for task, _ in todo.values()]))) if todo else {}
+
+    if store is not None:
+        for key, result in fresh.items():
+            task, p = todo[key]
+            store.put(key, study, p, task['reduce'], result, task.get('template'))
+    if damask_telemetry.enabled():
+        for key, result in fresh.items():
+            damask_telemetry.record_run(todo[key][0], result)
+        damask_telemetry.record('cache', hits=len(tasks) - len(todo), misses=len(todo))
+
+    results = []
+    for key, task in zip(keys, tasks):
+        if key in fresh:
+            results.append(dict(fresh[key], key=key, cached=False))
+        else:
+            row = found[key]
+            results.append({'name': task['name'], 'status': row['status'], 'message': row['message'],
+                            'reduced': row['reduced'], 'elapsed': row['elapsed'], 'host': row['host'],
+                            'key': key, 'cached': True})
+    return results
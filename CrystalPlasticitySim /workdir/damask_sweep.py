@@ -0,0 +1,231 @@
+"""
+Design-of-experiments sweeps over material and load parameters.
+
+A sweep enumerates candidate points (full factorial, Latin hypercube or Sobol), renders
+one task per point from the templates, skips points whose rendered task already has a
+result in the study store, runs the rest in parallel on an execution backend and writes
+one row per point to a columnar table (.npz, or .parquet when pandas/pyarrow are available).
+"""
+import os
+
+import damask
+import numpy as np
+from scipy.stats import qmc
+
+from damask_backends import ExecutionBackend, LocalBackend
+from damask_results import curve_error, read_experimental_data
+from damask_rotations import misorientation_angle
+from damask_store import StudyStore, run_cached
+from damask_worker import make_task
+from damask_yaml import MaterialTemplate, render_load
+
+# Parameters applied to the load file (dot_F components); all others go to the material's plastic section.
+LOAD_PARAMETERS = ('F12', 'F13', 'F23')
+
+
+def full_factorial(bounds: dict, levels=3) -> np.ndarray:
+    """Grid of `levels` equally spaced values per parameter (an int, or a dict per parameter)."""
+    axes = [np.linspace(lo, hi, levels[name] if isinstance(levels, dict) else levels)
+            for name, (lo, hi) in bounds.items()]
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+
+
+def _scale(unit: np.ndarray, bounds: dict) -> np.ndarray:
+    lo, hi = np.array(list(bounds.values()), dtype=float).T
+    return qmc.scale(unit, lo, hi)
+
+
+def latin_hypercube(bounds: dict, n: int, seed: int = None) -> np.ndarray:
+    return _scale(qmc.LatinHypercube(d=len(bounds), seed=seed).random(n), bounds)
+
+
+def sobol(bounds: dict, n: int, seed: int = None) -> np.ndarray:
+    """Scrambled Sobol points; n is rounded up to a power of two to keep the sequence balanced."""
+    m = int(np.ceil(np.log2(max(n, 1))))
+    return _scale(qmc.Sobol(d=len(bounds), seed=seed).random_base2(m), bounds)
+
+
+DESIGNS = {
+    'factorial': lambda bounds, n, levels, seed: full_factorial(bounds, levels),
+    'lhs': lambda bounds, n, levels, seed: latin_hypercube(bounds, n, seed),
+    'sobol': lambda bounds, n, levels, seed: sobol(bounds, n, seed),
+}
+
+
+def design(kind: str, bounds: dict, n: int = None, levels=3, seed: int = None) -> np.ndarray:
+    """Points of a design as an (n_points, n_parameters) array, columns in the order of bounds."""
+    if kind not in DESIGNS:
+        raise ValueError(f"Unknown design '{kind}', expected one of {list(DESIGNS)}.")
+    if kind != 'factorial' and not n:
+        raise ValueError(f"Design '{kind}' needs the number of points n.")
+    return DESIGNS[kind](bounds, n, levels, seed)
+
+
+class TaskRenderer:
+    """
+    Renders tasks for parameter dicts from templates that are parsed once.
+
+    Names in LOAD_PARAMETERS set dot_F components of every load step; all other names are
+    plastic parameters of `phase` (stresses in MPa, see damask_yaml.MPA_PARAMETERS).
+    """
+
+    def __init__(self, load_file: str, material_file: str, grid_file: str, reduce: str = 'stress_strain',
+                 phase: str = 'Ni3Al', ship_grid: bool = False, timeout: float = None):
+        self.load = damask.YAML.load(load_file)
+        self.material = damask.ConfigMaterial.load(material_file)
+        self.load_text = str(self.load)
+        self.material_text = str(self.material)
+        self.grid_file = os.path.abspath(grid_file)
+        self.reduce = reduce
+        self.phase = phase
+        self.ship_grid = ship_grid
+        self.timeout = timeout
+        self.template = None
+
+    def __call__(self, name: str, params: dict) -> dict:
+        load_values = {k: float(v) for k, v in params.items() if k in LOAD_PARAMETERS}
+        material_values = {k: float(v) for k, v in params.items() if k not in LOAD_PARAMETERS}
+        load = render_load(self.load, **load_values) if load_values else self.load_text
+        if material_values and self.template is None:
+            # Built on first use: load-only studies need no plastic section of `phase`.
+            self.template = MaterialTemplate(self.material, self.phase)
+        material = self.template.render(material_values) if material_values else self.material_text
+        return make_task(name, load, material, self.grid_file, self.reduce, ship_grid=self.ship_grid,
+                         timeout=self.timeout)
+
+
+def summarize(reduce: str, reduced: dict) -> dict:
+    """Scalar columns of one reduced result (NaN when the run failed)."""
+    if reduce == 'orientation':
+        q = reduced['quaternion'] if reduced else [np.nan] * 4
+        return dict(zip(('q_w', 'q_x', 'q_y', 'q_z'), q))
+    if reduced:
+        strain, stress = np.asarray(reduced['strain']), np.asarray(reduced['stress'])
+        return {'final_strain': strain[-1], 'final_stress': stress[-1], 'max_stress': stress.max()}
+    return {'final_strain': np.nan, 'final_stress': np.nan, 'max_stress': np.nan}
+
+
+def run_mape(exp_strain, exp_stress, reduced) -> float:
+    """
+    MAPE of one run's stress-strain curve; NaN for a failed run or a curve whose strains do
+    not overlap the experimental ones (damask_results.curve_error raises ValueError there).
+
+    >>> run_mape(np.array([0.1, 0.2]), np.array([1e8, 2e8]), {'strain': [0, .01], 'stress': [0, 1e8]})
+    nan
+    >>> run_mape(np.array([0.1, 0.2]), np.array([1e8, 2e8]), {'strain': [0, .2], 'stress': [0, 2e8]})
+    0.0
+    """
+    if not reduced:
+        return np.nan
+    try:
+        return curve_error(exp_strain, exp_stress, reduced['strain'], reduced['stress'])
+    except ValueError:
+        return np.nan
+
+
+def output_columns(reduce: str, results: list, experimental_file: str = None,
+                   target_quaternion: list = None) -> dict:
+    """
+    Scalar output columns of a list of worker results: the summarize() columns, plus 'mape'
+    against experimental_file (stress-strain) or 'deviation_angle' to target_quaternion
+    (orientation). Failed runs give NaN.
+    """
+    summaries = [summarize(reduce, r['reduced']) for r in results]
+    columns = {c: np.array([s[c] for s in summaries], dtype=float) for c in summaries[0]} if summaries else {}
+
+    if experimental_file and reduce == 'stress_strain':
+        exp_strain, exp_stress = read_experimental_data(experimental_file)
+        columns['mape'] = np.array([run_mape(exp_strain, exp_stress, r['reduced']) for r in results], dtype=float)
+    if target_quaternion is not None and reduce == 'orientation':
+        columns['deviation_angle'] = misorientation_angle(
+            [r['reduced']['quaternion'] if r['reduced'] else [np.nan] * 4 for r in results], target_quaternion)
+    return columns
+
+
+def write_table(table: dict, path: str) -> str:
+    """Write {column: array} as .npz (compressed) or .parquet (needs pandas with pyarrow)."""
+    if path.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(table).to_parquet(path, index=False)
+    else:
+        np.savez_compressed(path, **table)
+    return os.path.abspath(path)
+
+
+def read_table(path: str) -> dict:
+    """Read a table written by write_table back into {column: array}."""
+    if path.endswith('.parquet'):
+        import pandas as pd
+        return {k: v.to_numpy() for k, v in pd.read_parquet(path).items()}
+    with np.load(path, allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
+
+
+def run_points(render: TaskRenderer, params: list, study: str, backend: ExecutionBackend = None,
+               workers: int = 1, store=None) -> list:
+    """
+    Worker results for a list of parameter dicts (see damask_store.run_cached).
+
+    backend defaults to a LocalBackend(workers); store may be a StudyStore, a path to one,
+    or None for no caching. Backends and stores created here are closed again.
+    """
+    tasks = [render(f"{study}_{i:05d}", p) for i, p in enumerate(params)]
+    own_store = store is not None and not isinstance(store, StudyStore)
+    store = StudyStore(store) if own_store else store
+    own_backend = backend is None
+    backend = backend or LocalBackend(workers)
+    try:
+        return run_cached(backend, tasks, store, study, params)
+    finally:
+        if own_backend:
+            backend.close()
+        if own_store:
+            store.close()
+
+
+def run_sweep(bounds: dict, load_file: str, material_file: str, grid_file: str, kind: str = 'lhs',
+              n: int = None, levels=3, seed: int = None, reduce: str = 'stress_strain',
+              experimental_file: str = None, target_quaternion: list = None, phase: str = 'Ni3Al',
+              backend: ExecutionBackend = None, workers: int = 1, store=None, study: str = 'sweep',
+              output: str = None) -> dict:
+    """
+    Run a parameter sweep and write its results table.
+
+    Parameters:
+    - bounds (dict): Parameter name -> (low, high); F12/F13/F23 go to the load, others to the material.
+    - load_file, material_file, grid_file (str): DAMASK templates.
+    - kind (str): 'factorial' (levels per parameter), 'lhs' or 'sobol' (n points).
+    - reduce (str): 'stress_strain' or 'orientation' (see damask_worker.REDUCERS).
+    - experimental_file (str): Adds a 'mape' column for stress-strain sweeps.
+    - target_quaternion (list): Adds a 'deviation_angle' column for orientation sweeps.
+    - backend (ExecutionBackend): Where runs execute (default: LocalBackend(workers)).
+    - store (StudyStore | str): Result cache (default: study.sqlite next to the material file).
+    - study (str): Name recorded with every new result in the store.
+    - output (str): Table path, .npz or .parquet (default: <study>.npz next to the material file).
+
+    Returns:
+    - dict: table path, number of points, runs executed, cache hits and failures.
+    """
+    workdir = os.path.dirname(os.path.abspath(material_file))
+    names = list(bounds)
+    X = design(kind, bounds, n, levels, seed)
+    params = [dict(zip(names, (float(v) for v in x))) for x in X]
+
+    render = TaskRenderer(load_file, material_file, grid_file, reduce, phase)
+    results = run_points(render, params, study, backend, workers, store or os.path.join(workdir, 'study.sqlite'))
+
+    table = {name: X[:, i] for i, name in enumerate(names)}
+    table['key'] = np.array([r['key'] for r in results])
+    table['ok'] = np.array([r['status'] == 'ok' for r in results])
+    table['cached'] = np.array([r['cached'] for r in results])
+    table.update(output_columns(reduce, results, experimental_file, target_quaternion))
+
+    path = write_table(table, output or os.path.join(workdir, f"{study}.npz"))
+    executed = len({r['key'] for r in results if not r['cached']})
+    return {
+        'table': path,
+        'points': len(results),
+        'executed': executed,
+        'cached': sum(r['cached'] for r in results),
+        'failed': int((~table['ok']).sum()),
+    }
@@ -0,0 +1,230 @@
+"""
+Campaign telemetry as a JSON-lines time series.
+
+When a metrics file is configured (configure(path) or the DAMASK_METRICS_FILE environment
+variable) the runner appends one event per line, {'t': unix time, 'kind': ..., ...}:
+
+- 'run': a finished solver task (status, elapsed, cpu_s of the solver processes, threads,
+  attempts, increments, result_bytes of the HDF5 file written, host).
+- 'cache': one run_cached batch (hits, misses).
+- 'queue': backend queue depth (tasks submitted and not finished) and its capacity.
+- 'llm': one LLM completion (graph node, hop id, prompt/completion tokens, model).
+
+Nothing is written otherwise. summarize() turns the events into per-interval rows
+(evaluations/hour, mean queue depth, solver CPU utilization, cache hit rate, HDF5 bytes,
+LLM tokens per hop) and totals; plot() draws them. `python -m app.cli report` renders both.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+_lock = threading.Lock()
+_path = os.environ.get('DAMASK_METRICS_FILE') or None
+_depth = 0
+_hop = contextvars.ContextVar('damask_telemetry_hop', default=(None, None))
+
+
+def configure(path: str = None):
+    """Write events to path from now on (None switches telemetry off)."""
+    global _path
+    _path = os.path.abspath(path) if path else None
+    if _path:
+        os.makedirs(os.path.dirname(_path), exist_ok=True)
+
+
+def enabled() -> bool:
+    return _path is not None
+
+
+def record(kind: str, **fields):
+    """Append one event (no-op while telemetry is off)."""
+    if _path is None:
+        return
+    line = json.dumps(dict(t=time.time(), kind=kind, **fields), default=str)
+    with _lock:
+        with open(_path, 'a') as f:
+            f.write(line + '\n')
+
+
+def queue_change(delta: int, capacity: int = None):
+    """Track tasks in flight on the backends and record the new depth."""
+    global _depth
+    with _lock:
+        _depth += delta
+        depth = _depth
+    record('queue', depth=depth, capacity=capacity)
+
+
+def record_run(task: dict, result: dict):
+    record('run', status=result.get('status'), elapsed=result.get('elapsed'), cpu_s=result.get('cpu_s'),
+           threads=task.get('threads') or 1, attempts=result.get('attempts'), increments=result.get('increments'),
+           result_bytes=result.get('result_bytes'), host=result.get('host', ''))
+
+
+@contextmanager
+def hop(node: str):
+    """Label the LLM calls made inside (one graph node invocation) with the node and a hop id."""
+    token = _hop.set((node, uuid.uuid4().hex[:8]))
+    try:
+        yield
+    finally:
+        _hop.reset(token)
+
+
+def record_llm(prompt_tokens: int, completion_tokens: int, model: str = None):
+    node, hop_id = _hop.get()
+    record('llm', node=node, hop=hop_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+           model=model)
+
+
+def load(path: str) -> list:
+    """Events of a metrics file, oldest first (a truncated last line is skipped)."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return sorted(events, key=lambda e: e['t'])
+
+
+def _queue_mean(events: list, start: float, end: float) -> float:
+    """Time-weighted mean queue depth over [start, end)."""
+    depth, last, area = 0, start, 0.0
+    for e in events:
+        if e['t'] >= end:
+            break
+        if e['t'] > start:
+            area += depth * (e['t'] - last)
+            last = e['t']
+        depth = e['depth']
+    area += depth * (end - last)
+    return area / (end - start) if end > start else float(depth)
+
+
+def _metrics(events: list, queue: list, start: float, end: float) -> dict:
+    runs = [e for e in events if e['kind'] == 'run']
+    ok = [e for e in runs if e['status'] == 'ok']
+    hits = sum(e['hits'] for e in events if e['kind'] == 'cache')
+    misses = sum(e['misses'] for e in events if e['kind'] == 'cache')
+    timed = [e for e in runs if e.get('cpu_s') is not None and e.get('elapsed')]
+    wall = sum(e['elapsed'] * e['threads'] for e in timed)
+    llm = [e for e in events if e['kind'] == 'llm']
+    hops = {e['hop'] for e in llm}
+    tokens = sum(e['prompt_tokens'] + e['completion_tokens'] for e in llm)
+    hours = (end - start) / 3600
+    return {
+        'start': start,
+        'runs': len(runs),
+        'failed': len(runs) - len(ok),
+        'evaluations_per_hour': len(runs) / hours if hours > 0 else None,
+        'queue_depth': _queue_mean(queue, start, end) if queue else None,
+        'cpu_utilization': sum(e['cpu_s'] for e in timed) / wall if wall else None,
+        'cache_hit_rate': hits / (hits + misses) if hits + misses else None,
+        'hdf5_bytes': sum(e.get('result_bytes') or 0 for e in runs),
+        'llm_tokens': tokens,
+        'tokens_per_hop': tokens / len(hops) if hops else None,
+    }
+
+
+def summarize(events: list, interval: float = None) -> dict:
+    """
+    Per-interval metric rows and campaign totals.
+
+    Parameters:
+    - interval (float): Row length in seconds (default: about 24 rows over the campaign).
+
+    Returns:
+    - dict: 'interval', 'rows' (see the module docstring, one per interval) and 'total'
+      (the same metrics over the whole campaign, plus tokens by node).
+    """
+    if not events:
+        return {'interval': interval, 'rows': [], 'total': {}}
+    start, end = events[0]['t'], events[-1]['t']
+    interval = interval or max((end - start) / 24, 1.0)
+    # Rows are [lo, hi); the last one is closed so that it keeps the events at `end`.
+    edges = start + interval * np.arange(max(1, int(np.ceil((end - start) / interval))) + 1)
+    queue = [e for e in events if e['kind'] == 'queue']
+    times = np.array([e['t'] for e in events])
+    rows = []
+    for k, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        last = k == len(edges) - 2
+        chunk = events[np.searchsorted(times, lo):np.searchsorted(times, hi, side='right' if last else 'left')]
+        rows.append(_metrics(chunk, queue, lo, hi))
+    total = _metrics(events, queue, start, max(end, start + 1e-9))
+    by_node = {}
+    for e in events:
+        if e['kind'] == 'llm':
+            by_node[e['node']] = by_node.get(e['node'], 0) + e['prompt_tokens'] + e['completion_tokens']
+    total['tokens_by_node'] = by_node
+    total['duration_h'] = (end - start) / 3600
+    return {'interval': interval, 'rows': rows, 'total': total}
+
+
+COLUMNS = [
+    ('runs', 'runs', '{:>6}'),
+    ('evaluations_per_hour', 'evals/h', '{:>9.1f}'),
+    ('queue_depth', 'queue', '{:>7.2f}'),
+    ('cpu_utilization', 'cpu util', '{:>9.1%}'),
+    ('cache_hit_rate', 'cache hit', '{:>10.1%}'),
+    ('hdf5_bytes', 'HDF5 MB', '{:>9.1f}'),
+    ('tokens_per_hop', 'tok/hop', '{:>9.0f}'),
+]
+
+
+def table(summary: dict) -> str:
+    """Plain-text tables of a summary: totals, then one line per interval."""
+    def cell(row, key, fmt):
+        value = row.get(key)
+        if value is None:
+            return f"{'-':>{len(fmt.format(0))}}"
+        return fmt.format(value / 1e6 if key == 'hdf5_bytes' else value)
+
+    total = summary['total']
+    if not total:
+        return "No events."
+    lines = [f"campaign: {total['duration_h']:.2f} h, {total['runs']} runs ({total['failed']} failed), "
+             f"{total['llm_tokens']} LLM tokens"]
+    if total['tokens_by_node']:
+        lines.append("tokens by node: " + ", ".join(f"{k}={v}" for k, v in total['tokens_by_node'].items()))
+    header = f"{'interval':>9} " + " ".join(f"{label:>{len(fmt.format(0))}}" for _, label, fmt in COLUMNS)
+    lines += ["", header]
+    t0 = summary['rows'][0]['start'] if summary['rows'] else 0
+    for row in summary['rows'] + [dict(total, start=None)]:
+        if row['start'] is None:
+            label = 'total'
+        else:
+            minutes, seconds = divmod(int(row['start'] - t0), 60)
+            label = f"+{minutes // 60}:{minutes % 60:02d}:{seconds:02d}"
+        lines.append(f"{label:>9} " + " ".join(cell(row, key, fmt) for key, _, fmt in COLUMNS))
+    return "\n".join(lines)
+
+
+def plot(summary: dict, output_file: str) -> str:
+    """Save the per-interval metrics as a grid of time-series plots (needs matplotlib)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    rows = summary['rows']
+    t0 = rows[0]['start'] if rows else 0
+    hours = [(r['start'] - t0) / 3600 for r in rows]
+    fig, axes = plt.subplots(2, 3, figsize=(13, 6.5), sharex=True)
+    for ax, (key, label, _) in zip(axes.ravel(), COLUMNS[1:]):
+        values = [np.nan if r[key] is None else r[key] / 1e6 if key == 'hdf5_bytes' else r[key] for r in rows]
+        ax.step(hours, values, where='post')
+        ax.set_title(label)
+        ax.grid(alpha=0.3)
+    for ax in axes[-1]:
+        ax.set_xlabel('time [h]')
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=120)
+    plt.close(fig)
+    return os.path.abspath(output_file)
@@ -0,0 +1,287 @@
+"""
+Uncertainty of calibrated slip parameters.
+
+A calibration gives one parameter set. run_uq() runs an ensemble of solver runs around it,
+fits a surrogate of the simulated stress at the experimental strains and samples the
+parameters that remain compatible with the experiment:
+
+- 'mcmc': random-walk Metropolis on the surrogate likelihood (Gaussian relative residuals,
+  noise estimated from the residuals at the optimum, uniform prior on the ensemble box),
+  several chains with step sizes tuned during burn-in.
+- 'bootstrap': the experimental curve is resampled (the surrogate at the optimum plus
+  resampled residuals) and refitted on the surrogate for each replicate.
+
+The samples give confidence intervals of the parameters and bands of the predicted curve.
+A subset of the samples is run with DAMASK to give verified bands and the surrogate error.
+Ensemble and verification runs go in batches through damask_sweep.run_points, so they
+run in parallel on the backend and repeated analyses are served from the study store.
+"""
+import os
+
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.optimize import minimize
+
+from damask_backends import ExecutionBackend
+from damask_outputs import slim_outputs
+from damask_results import read_experimental_data
+from damask_sweep import TaskRenderer, latin_hypercube, run_points
+
+
+class CurveSurrogate:
+    """
+    Simulated stress at fixed strains as a function of the parameters: a thin-plate-spline
+    RBF fit of all stresses at once on inputs scaled to the unit box.
+    """
+
+    def __init__(self, bounds: dict, smoothing: float = 1e-9):
+        self.lo, self.hi = np.array(list(bounds.values()), dtype=float).T
+        self.smoothing = smoothing
+        self.model = None
+
+    def _unit(self, X) -> np.ndarray:
+        return (np.atleast_2d(X) - self.lo) / (self.hi - self.lo)
+
+    def fit(self, X, Y) -> "CurveSurrogate":
+        self.scale = float(np.max(np.abs(Y)))
+        self.model = RBFInterpolator(self._unit(X), np.asarray(Y) / self.scale, kernel='thin_plate_spline',
+                                     smoothing=self.smoothing, degree=1)
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        return self.model(self._unit(X)) * self.scale
+
+
+def ensemble_box(best: dict, bounds: dict = None, spread: float = 0.2) -> dict:
+    """
+    Box around the optimum: +- spread of each parameter range (bounds) or of its value,
+    clipped to the bounds.
+    """
+    box = {}
+    for name, value in best.items():
+        lo, hi = bounds[name] if bounds and name in bounds else (-np.inf, np.inf)
+        width = spread * (hi - lo) if np.isfinite(hi - lo) else spread * abs(value)
+        box[name] = (float(max(lo, value - width)), float(min(hi, value + width)))
+    return box
+
+
+def _curves(results: list, exp_strain: np.ndarray, mask: np.ndarray = None) -> tuple:
+    """Simulated stresses at the experimental strains of every successful run, and the strain mask used."""
+    ok = [i for i, r in enumerate(results) if r['status'] == 'ok' and r['reduced']]
+    if mask is None:
+        # Experimental strains within the strain range of every run.
+        lo = max(min(results[i]['reduced']['strain']) for i in ok)
+        hi = min(max(results[i]['reduced']['strain']) for i in ok)
+        mask = (exp_strain >= lo) & (exp_strain <= hi)
+    Y = []
+    for i in ok:
+        strain, stress = np.asarray(results[i]['reduced']['strain']), np.asarray(results[i]['reduced']['stress'])
+        order = np.argsort(strain)
+        Y.append(np.interp(exp_strain[mask], strain[order], stress[order]))
+    return np.array(ok, dtype=int), np.array(Y).reshape(len(ok), int(mask.sum())), mask
+
+
+def metropolis(log_post, x0: np.ndarray, samples: int, chains: int = 8, burn: float = 0.5,
+               seed: int = None) -> dict:
+    """
+    Random-walk Metropolis in the unit box with `chains` chains started around x0. Step sizes
+    are tuned per chain during burn-in towards an acceptance of about 0.3.
+
+    log_post maps an (n, d) array of unit-box points to n log posterior densities (-inf outside).
+
+    Returns:
+    - dict: samples after burn-in (samples, d) and the acceptance rate after burn-in.
+    """
+    rng = np.random.default_rng(seed)
+    d = len(x0)
+    steps = int(np.ceil(samples / chains / (1 - burn)))
+    n_burn = int(burn * steps)
+    x = np.clip(x0 + 0.02 * rng.standard_normal((chains, d)), 0, 1)
+    lp = log_post(x)
+    scale = np.full(chains, 0.1)
+    kept, accepted = [], 0
+    for step in range(steps):
+        proposal = x + scale[:, None] * rng.standard_normal((chains, d))
+        lp_new = log_post(proposal)
+        accept = np.log(rng.random(chains)) < lp_new - lp
+        x[accept], lp[accept] = proposal[accept], lp_new[accept]
+        if step < n_burn:
+            scale *= np.exp(np.where(accept, 0.7, -0.3) * 0.1)
+        else:
+            kept.append(x.copy())
+            accepted += int(accept.sum())
+    kept = np.concatenate(kept)[:samples] if kept else np.empty((0, d))
+    return {'samples': kept, 'acceptance': accepted / max(1, (steps - n_burn) * chains)}
+
+
+def bootstrap_refits(surrogate: CurveSurrogate, x_best: np.ndarray, exp_stress: np.ndarray, replicates: int,
+                     seed: int = None) -> np.ndarray:
+    """
+    Parameters refitted (L-BFGS-B on the surrogate, relative squared error) to `replicates`
+    residual-bootstrap copies of the experimental stresses.
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = surrogate.lo, surrogate.hi
+    fitted = surrogate.predict(x_best)[0]
+    residuals = exp_stress - fitted
+    u_best = (x_best - lo) / (hi - lo)
+    out = []
+    for _ in range(replicates):
+        y = fitted + rng.choice(residuals, size=len(residuals), replace=True)
+        # Fitted in the unit box, so weakly identified parameters are not left at their start value.
+        result = minimize(lambda u: float(np.mean(((surrogate.predict(lo + u * (hi - lo))[0] - y) / y) ** 2)),
+                          u_best, bounds=[(0, 1)] * len(lo), method='L-BFGS-B',
+                          options={'ftol': 1e-15, 'gtol': 1e-12})
+        out.append(lo + np.clip(result.x, 0, 1) * (hi - lo))
+    return np.array(out)
+
+
+def _band(Y: np.ndarray, strain: np.ndarray, confidence: float) -> dict:
+    alpha = 100 * (1 - confidence) / 2
+    return {'strain': strain.tolist(), 'median': np.median(Y, axis=0).tolist(),
+            'low': np.percentile(Y, alpha, axis=0).tolist(), 'high': np.percentile(Y, 100 - alpha, axis=0).tolist()}
+
+
+def run_uq(material_file: str, load_file: str, grid_file: str, experimental_file: str, best: dict,
+           bounds: dict = None, spread: float = 0.2, method: str = 'mcmc', ensemble: int = 32,
+           samples: int = 4000, chains: int = 8, replicates: int = 200, verify: int = 8,
+           confidence: float = 0.95, phase: str = 'Ni3Al', slim: bool = True, backend: ExecutionBackend = None,
+           workers: int = 1, store=None, study: str = 'uq', timeout: float = None, seed: int = None,
+           output: str = None) -> dict:
+    """
+    Confidence intervals of calibrated slip parameters and bands of the predicted curve.
+
+    Parameters:
+    - material_file, load_file, grid_file (str): DAMASK input files.
+    - experimental_file (str): Two-column text file (true_stress, true_strain) with a header line.
+    - best (dict): Calibrated parameters (best_parameters of calibrate_slip_parameters); stresses in MPa.
+    - bounds (dict): Calibration bounds; the ensemble box is +- spread of these ranges around
+      best (+- spread of the values without bounds), see ensemble_box.
+    - method (str): 'mcmc' or 'bootstrap' (see the module docstring).
+    - ensemble (int): Latin-hypercube solver runs in the box (plus one at the optimum).
+    - samples, chains: MCMC samples kept and chains.
+    - replicates (int): Bootstrap replicates.
+    - verify (int): Samples run with DAMASK for the verified band (0: none).
+    - confidence (float): Width of the intervals and bands.
+    - slim (bool): Let the runs write only F and P (see damask_outputs.slim_outputs).
+    - backend (ExecutionBackend): Where runs go (default: LocalBackend(workers)).
+    - store (StudyStore | str): Result cache (default: study.sqlite next to the material file).
+    - seed (int): Fixes the ensemble and the sampling, so a repeated analysis is served from the store.
+    - output (str): Optional .npz receiving the parameter samples.
+
+    Returns:
+    - dict: intervals per parameter (mean, std, low, high), correlation, the ensemble box,
+      the surrogate band and the verified band (MPa) with the surrogate error, the noise
+      estimate, the acceptance rate (mcmc) and run counts.
+    """
+    if method not in ('mcmc', 'bootstrap'):
+        raise ValueError(f"Unknown method '{method}', expected 'mcmc' or 'bootstrap'.")
+    names = list(best)
+    box = ensemble_box(best, bounds, spread)
+    workdir = os.path.dirname(os.path.abspath(material_file))
+    store = store or os.path.join(workdir, 'study.sqlite')
+    if slim:
+        slimmed = slim_outputs(load_file, material_file, 'stress_strain', grid_file=grid_file,
+                               output_dir=os.path.join(workdir, 'runs'))
+        load_file, material_file = slimmed['load_file'], slimmed['material_file']
+    render = TaskRenderer(load_file, material_file, grid_file, 'stress_strain', phase, timeout=timeout)
+    exp_strain, exp_stress = (np.asarray(v, dtype=float) for v in read_experimental_data(experimental_file))
+
+    X = np.vstack([[best[n] for n in names], latin_hypercube(box, ensemble, seed)])
+    results = run_points(render, [dict(zip(names, (float(v) for v in x))) for x in X], study, backend, workers,
+                         store)
+    ok, Y, mask = _curves(results, exp_strain)
+    if len(ok) < len(names) + 2 or results[0]['status'] != 'ok':
+        raise RuntimeError(f"{len(ok)} of {len(results)} ensemble runs succeeded (the optimum "
+                           f"{'did' if results[0]['status'] == 'ok' else 'did not'}); too few for a surrogate.")
+    strain, target = exp_strain[mask], exp_stress[mask]
+    keep = target != 0
+    strain, target, Y = strain[keep], target[keep], Y[:, keep]
+    mask[mask] = keep
+    surrogate = CurveSurrogate(box).fit(X[ok], Y)
+
+    # Noise of the relative residuals at the optimum (degrees of freedom: points - parameters).
+    relative = (Y[0] - target) / target
+    sigma = float(np.sqrt(np.sum(relative ** 2) / max(1, len(target) - len(names))))
+    x_best = np.array([best[n] for n in names], dtype=float)
+    lo, hi = surrogate.lo, surrogate.hi
+    acceptance = None
+    if method == 'mcmc':
+        def log_post(U):
+            inside = np.all((U >= 0) & (U <= 1), axis=1)
+            lp = np.full(len(U), -np.inf)
+            if inside.any():
+                r = (surrogate.predict(lo + U[inside] * (hi - lo)) - target) / target
+                lp[inside] = -0.5 * np.sum(r ** 2, axis=1) / sigma ** 2
+            return lp
+
+        chain = metropolis(log_post, (x_best - lo) / (hi - lo), samples, chains, seed=seed)
+        theta, acceptance = lo + chain['samples'] * (hi - lo), chain['acceptance']
+    else:
+        theta = bootstrap_refits(surrogate, x_best, target, replicates, seed)
+
+    alpha = 100 * (1 - confidence) / 2
+    intervals = {n: {'mean': float(np.mean(theta[:, i])), 'std': float(np.std(theta[:, i])),
+                     'low': float(np.percentile(theta[:, i], alpha)),
+                     'high': float(np.percentile(theta[:, i], 100 - alpha)),
+                     'at_box_edge': bool(np.isclose(np.percentile(theta[:, i], alpha), lo[i])
+                                         or np.isclose(np.percentile(theta[:, i], 100 - alpha), hi[i]))}
+                 for i, n in enumerate(names)}
+    band = _band(surrogate.predict(theta) / 1e6, strain, confidence)
+
+    verified = None
+    if verify:
+        rng = np.random.default_rng(seed)
+        picked = theta[rng.choice(len(theta), size=min(verify, len(theta)), replace=False)]
+        checks = run_points(render, [dict(zip(names, (float(v) for v in x))) for x in picked], f"{study}_verify",
+                            backend, workers, store)
+        results += checks
+        ok_v, Y_v, _ = _curves(checks, exp_strain, mask)
+        if len(ok_v):
+            error = np.abs(surrogate.predict(picked[ok_v]) - Y_v) / np.abs(target)
+            verified = dict(_band(Y_v / 1e6, strain, confidence), runs=int(len(ok_v)),
+                            model_error=float(np.mean(error)))
+    if output:
+        np.savez_compressed(output, names=np.array(names), samples=theta)
+
+    return {
+        'method': method,
+        'parameters': names,
+        'intervals': intervals,
+        'correlation': np.corrcoef(theta.T).reshape(len(names), len(names)).tolist(),
+        'box': box,
+        'noise': sigma,
+        'acceptance': acceptance,
+        'band': band,
+        'verified_band': verified,
+        'samples': int(len(theta)),
+        'samples_file': os.path.abspath(output) if output else None,
+        'runs': len(results),
+        'executed': len({r['key'] for r in results if not r['cached']}),
+        'cached': sum(r['cached'] for r in results),
+        'failed': sum(r['status'] != 'ok' for r in results),
+    }
+
+
+def plot_band(uq: dict, experimental_file: str, output_file: str) -> str:
+    """Save the predicted-curve band (and the verified one) over the experimental curve."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    exp_strain, exp_stress = read_experimental_data(experimental_file)
+    band, verified = uq['band'], uq.get('verified_band')
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot(exp_strain, np.asarray(exp_stress) / 1e6, 'o', ms=3, label='experiment')
+    ax.fill_between(band['strain'], band['low'], band['high'], alpha=0.3, label='surrogate band')
+    ax.plot(band['strain'], band['median'], '-', label='surrogate median')
+    if verified:
+        ax.plot(verified['strain'], verified['low'], 'k--', lw=1, label=f"verified band ({verified['runs']} runs)")
+        ax.plot(verified['strain'], verified['high'], 'k--', lw=1)
+    ax.set_xlabel('true strain')
+    ax.set_ylabel('true stress [MPa]')
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=120)
+    plt.close(fig)
+    return os.path.abspath(output_file)
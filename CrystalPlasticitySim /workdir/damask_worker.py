@@ -0,0 +1,201 @@
+"""
+Solver-side execution of one rendered DAMASK task.
+
+A task is a plain dict that can be pickled or sent as JSON to another machine:
+
+    {'name': str, 'load': YAML text, 'material': YAML text, 'grid': path on a shared
+     filesystem, 'grid_text': optional .vti content for non-shared nodes,
+     'reduce': key of REDUCERS, 'threads': optional OMP_NUM_THREADS,
+     'timeout': optional wall-time limit (s), 'retries': convergence retries,
+     'refine': increment multiplier per retry, 'scale': increment multiplier of the
+     first attempt (see damask_stepping), 'template': optional fingerprint of the inputs
+     that stay fixed in a study (see damask_store.template_key)}
+
+The worker writes the configs into a scratch directory, runs DAMASK_grid, reduces the
+result file to a small dict (curve or orientation) and deletes the scratch directory,
+so only the reduced result travels back. A run that fails to converge is retried with
+`refine` times more increments per load step, up to `retries` times. Like the retry
+settings, 'scale' is a solver setting: it is not part of the task's cache key.
+
+The result 'status' is 'ok' or the failure kind: one of damask_simulation.FAILURE_TYPES
+('config', 'convergence', 'timeout', 'launch', 'crash') or 'reduce' when the result file
+could not be post-processed.
+
+Run as a script it serves tasks for damask_backends:
+
+    python damask_worker.py --connect HOST:PORT --authkey KEY   # QueueBackend worker
+    python damask_worker.py --stdin                            # SSHBackend worker (JSON in/out)
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import damask
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from damask_results import reduce_simulation_results
+from damask_simulation import ConvergenceError, SolverError, solve
+from damask_yaml import refine_time_stepping, rescale_time_stepping, total_increments
+
+RETRIES = 2     # convergence retries per task
+REFINE = 2      # increment multiplier per retry
+
+
+def reduce_stress_strain(result_file: str) -> dict:
+    strain, stress = reduce_simulation_results(result_file)
+    return {'strain': strain.tolist(), 'stress': stress.tolist()}
+
+
+def reduce_orientation(result_file: str) -> dict:
+    quaternion = damask.Result(result_file).view(increments=-1).get('O')[0]
+    return {'quaternion': [float(q) for q in quaternion]}
+
+
+REDUCERS = {
+    'stress_strain': reduce_stress_strain,
+    'orientation': reduce_orientation,
+}
+
+
+def _children_cpu():
+    """User + system CPU seconds of the finished child processes (None where unsupported)."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def make_task(name: str, load: str, material: str, grid_file: str, reduce: str,
+              ship_grid: bool = False, threads: int = None, timeout: float = None,
+              retries: int = RETRIES, refine: int = REFINE, scale: float = 1.0, template: str = None) -> dict:
+    """Build a task from rendered load/material YAML text (see damask_yaml.render_*)."""
+    if reduce not in REDUCERS:
+        raise ValueError(f"Unknown reduction '{reduce}', expected one of {list(REDUCERS)}.")
+    task = {'name': name, 'load': load, 'material': material,
+            'grid': os.path.abspath(grid_file), 'reduce': reduce, 'threads': threads,
+            'timeout': timeout, 'retries': retries, 'refine': refine, 'scale': scale}
+    if template is not None:
+        task['template'] = template
+    if ship_grid:
+        with open(grid_file) as f:
+            task['grid_text'] = f.read()
+    return task
+
+
+def execute_task(task: dict, scratch: str = None, keep: bool = False) -> dict:
+    """
+    Run one task and return {'name', 'status', 'message', 'reduced', 'elapsed', 'attempts', 'host',
+    'increments', 'failed_increments', 'cpu_s', 'result_bytes'}: the total N of the last attempt
+    and of the last attempt that did not converge (None if none), the CPU time of the solver
+    processes and the size of the result file.
+    """
+    start = time.perf_counter()
+    cpu = _children_cpu()
+    run_dir = tempfile.mkdtemp(prefix=f"{task['name']}_", dir=scratch)
+    out = {'name': task['name'], 'status': 'crash', 'message': '', 'reduced': None, 'attempts': 0,
+           'host': os.uname().nodename if hasattr(os, 'uname') else '', 'increments': None,
+           'failed_increments': None, 'cpu_s': None, 'result_bytes': None}
+    try:
+        load_file = os.path.join(run_dir, 'load.yaml')
+        material_file = os.path.join(run_dir, 'material.yaml')
+        with open(material_file, 'w') as f:
+            f.write(task['material'])
+        grid_file = task['grid']
+        if task.get('grid_text') is not None:
+            grid_file = os.path.join(run_dir, os.path.basename(task['grid']))
+            with open(grid_file, 'w') as f:
+                f.write(task['grid_text'])
+
+        load = task['load']
+        if task.get('scale', 1.0) != 1.0:
+            load = rescale_time_stepping(load, task['scale'])
+        retries = task.get('retries', RETRIES)
+        while True:
+            out['attempts'] += 1
+            out['increments'] = total_increments(load)
+            with open(load_file, 'w') as f:
+                f.write(load)
+            try:
+                result = solve(load_file, grid_file, material_file, threads=task.get('threads'),
+                               timeout=task.get('timeout'))
+                break
+            except ConvergenceError:
+                out['failed_increments'] = out['increments']
+                if out['attempts'] > retries:
+                    raise
+                load = refine_time_stepping(load, task.get('refine', REFINE))
+
+        out['result_bytes'] = os.path.getsize(result.result_file)
+        try:
+            out['reduced'] = REDUCERS[task['reduce']](result.result_file)
+            out['status'] = 'ok'
+        except Exception as e:
+            out['status'], out['message'] = 'reduce', str(e)
+    except SolverError as e:
+        out['status'], out['message'] = e.kind, str(e)
+        if e.log_tail:
+            out['message'] += '\n' + e.log_tail[-1000:]
+    except Exception as e:
+        out['message'] = str(e)
+    finally:
+        if not keep:
+            shutil.rmtree(run_dir, ignore_errors=True)
+    out['elapsed'] = time.perf_counter() - start
+    if cpu is not None:
+        out['cpu_s'] = _children_cpu() - cpu
+    return out
+
+
+def serve_queue(address: tuple, authkey: bytes, scratch: str = None):
+    """Pull tasks from a QueueBackend until it sends None or goes away."""
+    from damask_backends import connect_queue
+    tasks, results = connect_queue(address, authkey)
+    while True:
+        try:
+            item = tasks.get()
+        except (EOFError, ConnectionError, OSError):
+            return
+        if item is None:
+            return
+        task_id, task = item
+        try:
+            # Lets the backend fail the task if this process dies before it returns a result.
+            results.put(('started', task_id, {'host': os.uname().nodename if hasattr(os, 'uname') else '',
+                                              'pid': os.getpid()}))
+        except (EOFError, ConnectionError, OSError):
+            return
+        result = execute_task(task, scratch)
+        try:
+            results.put((task_id, result))
+        except (EOFError, ConnectionError, OSError):
+            return
+
+
+def serve_stdin(scratch: str = None):
+    """Read a JSON list of tasks from stdin and write a JSON list of results to stdout."""
+    tasks = json.load(sys.stdin)
+    json.dump([execute_task(task, scratch) for task in tasks], sys.stdout)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DAMASK task worker.')
+    parser.add_argument('--connect', help='HOST:PORT of a QueueBackend.')
+    parser.add_argument('--authkey', default=os.environ.get('DAMASK_QUEUE_AUTHKEY', ''))
+    parser.add_argument('--stdin', action='store_true', help='Run JSON tasks from stdin (SSH mode).')
+    parser.add_argument('--scratch', default=None, help='Scratch directory for run files.')
+    args = parser.parse_args()
+    if args.stdin:
+        serve_stdin(args.scratch)
+    elif args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        serve_queue((host, int(port)), args.authkey.encode(), args.scratch)
+    else:
+        parser.error('one of --connect or --stdin is required')
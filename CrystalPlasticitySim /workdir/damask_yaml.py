@@ -1,53 +1,155 @@
+import copy
 import damask
+import io
 import json
 import os
 
+# Plastic parameters given in MPa (converted to Pa for DAMASK); everything else is written as-is.
+MPA_PARAMETERS = {'xi_0_sl', 'xi_inf_sl', 'h_0_sl-sl', 'xi_0_tw', 'h_0_tw-sl', 'h_0_tw-tw'}
+
+
+def set_dot_F(config, F12: float, F13: float, F23: float):
+    """Set the off-diagonal dot_F components of every load step of a load config in place (None keeps a component)."""
+    for loadstep in config['loadstep']:
+        dot_F = loadstep['boundary_conditions']['mechanical']['dot_F']
+        for (i, j), value in (((0, 1), F12), ((0, 2), F13), ((1, 2), F23)):
+            if value is not None:
+                dot_F[i][j] = value
+    return config
+
+
+def set_plastic_parameters(material_config, new_values: dict, phase: str = 'Ni3Al'):
+    """Set plastic parameters (stresses in MPa, see MPA_PARAMETERS) of one phase in place."""
+    try:
+        plastic_props = material_config['phase'][phase]['mechanical']['plastic']
+    except KeyError as e:
+        raise KeyError(f"Missing expected key in material configuration: {e}")
+
+    for key, value in new_values.items():
+        if key in plastic_props:
+            # Convert MPa to Pascals (for DAMASK format)
+            plastic_props[key] = [value * 1e6 if key in MPA_PARAMETERS else value]
+        else:
+            raise KeyError(f"Property '{key}' not found in the 'plastic' section.")
+    return material_config
+
+
+def render_material(template, new_values: dict, phase: str = 'Ni3Al') -> str:
+    """YAML text of a material template with updated plastic parameters (template is not modified)."""
+    return str(set_plastic_parameters(copy.deepcopy(template), new_values, phase))
+
+
+class MaterialTemplate:
+    """
+    A material template whose YAML text is rendered once except for one phase.
+
+    render_material copies and dumps the whole config for every trial, which for a
+    polycrystal is mostly the material list (one entry per grain). render() copies and dumps
+    only the phase and splices it into the text of the rest, giving the same text.
+    """
+    MARKER = '__rendered_per_trial__'
+
+    def __init__(self, template, phase: str = 'Ni3Al'):
+        config = copy.deepcopy(template)
+        set_plastic_parameters(config, {}, phase)  # raises for a missing phase/plastic section
+        self.phase = phase
+        self.section = config['phase'][phase]
+        # A nested placeholder keeps the phase in block style: '  <phase>:' and one marker line.
+        config['phase'][phase] = {self.MARKER: {self.MARKER: 0}}
+        lines = str(config).splitlines(keepends=True)
+        at = next(i for i, line in enumerate(lines) if self.MARKER in line)
+        self.head, self.tail = ''.join(lines[:at - 1]), ''.join(lines[at + 1:])
+        self._wrapper = type(config)
+
+    def render(self, new_values: dict) -> str:
+        """YAML text of the template with updated plastic parameters (see render_material)."""
+        config = self._wrapper({'phase': {self.phase: copy.deepcopy(self.section)}})
+        set_plastic_parameters(config, new_values, self.phase)
+        # Dumped at the same depth as in the full config; the first line is 'phase:'.
+        return self.head + str(config).split('\n', 1)[1] + self.tail
+
+
+def render_load(template, F12: float = None, F13: float = None, F23: float = None) -> str:
+    """YAML text of a load template, optionally with new dot_F components (template is not modified)."""
+    config = copy.deepcopy(template)
+    set_dot_F(config, F12, F13, F23)
+    return str(config)
+
+
+def refine_time_stepping(load_text: str, factor: int = 2) -> str:
+    """
+    YAML text of a load with `factor` times more increments in every load step; f_out is
+    scaled too, so the same increments are written.
+    """
+    config = damask.YAML.load(io.StringIO(load_text))
+    for loadstep in config['loadstep']:
+        loadstep['discretization']['N'] = int(loadstep['discretization']['N']) * factor
+        if 'f_out' in loadstep:
+            loadstep['f_out'] = int(loadstep['f_out']) * factor
+    return str(config)
+
+
+def total_increments(load_text: str) -> int:
+    """Sum of N over the load steps of a load's YAML text."""
+    return sum(int(step['discretization']['N']) for step in damask.YAML.load(io.StringIO(load_text))['loadstep'])
+
+
+def rescale_time_stepping(load_text: str, scale: float) -> str:
+    """
+    YAML text of a load with about `scale` times the increments in every load step. The
+    number of written increments (N // f_out) of each step is kept, and so are the strains
+    they are written at: N is rounded to a multiple of it.
+    """
+    config = damask.YAML.load(io.StringIO(load_text))
+    for loadstep in config['loadstep']:
+        N = int(loadstep['discretization']['N'])
+        written = N // int(loadstep.get('f_out', 1))
+        N = max(written, int(round(N * scale / written)) * written)
+        loadstep['discretization']['N'] = N
+        if 'f_out' in loadstep:
+            loadstep['f_out'] = N // written
+    return str(config)
+
+
+def update_load(load_file: str, F12: float, F13: float, F23: float, output_dir: str = None) -> str:
+    """
+    Update the deformation gradient tensor in a load YAML file.
+
+    Parameters:
+    - load_file (str): Path to the original load YAML file.
+    - F12, F13, F23 (float): New off-diagonal components of dot_F for every load step.
+    - output_dir (str): Directory for the updated file (default: next to the original).
+
+    Returns:
+    - str: Absolute path of the updated YAML file.
+    """
+    config = set_dot_F(damask.YAML.load(load_file), F12, F13, F23)
+
+    yaml_dir = output_dir or os.path.dirname(os.path.abspath(load_file))
+    updated_filename = f"load_F12_{F12:.6e}_F13_{F13:.6e}_F23_{F23:.6e}.yaml"
+    updated_filepath = os.path.join(yaml_dir, updated_filename)
+    config.save(updated_filepath)
+
+    return updated_filepath
+
+
 def update_load_yaml(json_input: str) -> str:
     """
     Update the deformation gradient tensor in a load YAML file and save it in the same folder.
-    
+
     Takes a JSON input with the following keys:
         - load_file: Name of the original load YAML file.
         - new_F12: New value for F12.
         - new_F13: New value for F13.
         - new_F23: New value for F23.
-    
+
     Returns:
         Absolute path of the updated YAML file.
     """
     try:
         # Parse JSON input
         params = json.loads(json_input)
-        yaml_file = params["load_file"]
-        new_F12 = params["new_F12"]
-        new_F13 = params["new_F13"]
-        new_F23 = params["new_F23"]
-
-        # Load the YAML file
-        config = damask.YAML.load(yaml_file)
-
-        # Update the deformation gradient values
-        for loadstep in config['loadstep']:
-            dot_F = loadstep['boundary_conditions']['mechanical']['dot_F']
-            dot_F[0][1] = new_F12
-            dot_F[0][2] = new_F13
-            dot_F[1][2] = new_F23
-
-        # Get the absolute directory of the original YAML file
-        yaml_dir = os.path.dirname(os.path.abspath(yaml_file))
-
-        # Generate the updated file name
-        updated_filename = (
-            f"load_F12_{new_F12:.6e}_F13_{new_F13:.6e}_F23_{new_F23:.6e}.yaml"
-        )
-
-        # Absolute path of the new YAML file
-        updated_filepath = os.path.join(yaml_dir, updated_filename)
-
-        # Save the updated YAML file in the same directory as the original
-        config.save(updated_filepath)
-
-        return updated_filepath  # Return the absolute path of the updated YAML file
+        return update_load(params["load_file"], params["new_F12"], params["new_F13"], params["new_F23"])
 
     except KeyError as e:
         return f"Missing required key in JSON input: {e}"
@@ -55,7 +157,7 @@ def update_load_yaml(json_input: str) -> str:
         return f"An error occurred: {e}"
 
 
-def update_material_properties(file_path, new_values):
+def update_material_properties(file_path, new_values, output_dir=None):
     """
     Update specified material properties in a DAMASK material configuration file.
 
@@ -66,6 +168,8 @@ def update_material_properties(file_path, new_values):
         - 'xi_0_sl' (integer): Initial critical shear stress for slip, in MPa.
         - 'xi_inf_sl' (integer): Maximum critical shear stress for slip, in MPa.
         - 'h_0_sl-sl' (integer): Initial hardening modulus for slip-slip interactions, in MPa.
+        - 'n_sl' (float): Stress exponent for slip (dimensionless).
+    - output_dir (str): Directory for the updated file (default: next to the original).
 
     Returns:
     - str: Path to the newly created updated material configuration file.
@@ -73,33 +177,21 @@ def update_material_properties(file_path, new_values):
     # Load the existing material configuration
     material_config = damask.ConfigMaterial.load(file_path)
 
-    # Navigate to the 'plastic' properties of the 'Ni3Al' phase
-    try:
-        plastic_props = material_config['phase']['Ni3Al']['mechanical']['plastic']
-    except KeyError as e:
-        raise KeyError(f"Missing expected key in material configuration: {e}")
-
-    # Update the specified properties
-    for key, value in new_values.items():
-        if key in plastic_props:
-            # Convert MPa to Pascals (for DAMASK format)
-            plastic_props[key] = [value * 1e6]  
-        else:
-            raise KeyError(f"Property '{key}' not found in the 'plastic' section.")
+    # Update the 'plastic' properties of the 'Ni3Al' phase
+    set_plastic_parameters(material_config, new_values, 'Ni3Al')
 
     # Map full keys to short labels for filename
     label_map = {
         'xi_0_sl': 'xi0',
         'xi_inf_sl': 'xiInf',
-        'h_0_sl-sl': 'h0'
+        'h_0_sl-sl': 'h0',
+        'n_sl': 'n'
     }
-    short_labels = [f"{label_map[key]}{int(value)}" for key, value in new_values.items()]
+    short_labels = [f"{label_map.get(key, key)}{value:g}" for key, value in new_values.items()]
     base_name = os.path.splitext(os.path.basename(file_path))[0]
     new_file_name = f"{base_name}_" + "_".join(short_labels) + ".yaml"
 
-    output_path = os.path.join(os.path.dirname(file_path), new_file_name)
+    output_path = os.path.join(output_dir or os.path.dirname(file_path), new_file_name)
     material_config.save(output_path)
 
     return output_path
-
-